@@ -0,0 +1,29 @@
+"""add text to file_sections
+
+Revision ID: 5f2c8e1a9d47
+Revises: bd01f37689db
+Create Date: 2026-10-16 10:12:05.318204
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f2c8e1a9d47"
+down_revision: str | Sequence[str] | None = "bd01f37689db"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Texto de cada sección, extraído una sola vez al seccionar el PDF."""
+    op.add_column("file_sections", sa.Column("text", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Quita el texto persistido de las secciones."""
+    op.drop_column("file_sections", "text")
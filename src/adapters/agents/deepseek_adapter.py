@@ -14,12 +14,17 @@ from typing import TYPE_CHECKING
 import httpx
 
 from src.adapters.agents.circuit_breaker import CircuitBreaker
+from src.adapters.agents.openai_tools import complete_with_tools
 from src.adapters.agents.retry import retry_with_backoff
+from src.adapters.agents.sse import iter_sse_json, openai_delta
 from src.adapters.config.settings import settings
 from src.domain.ports.llm_port import LLMPort
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from src.domain.models import ChatMessage
+    from src.domain.ports.llm_port import ToolHandler, ToolSpec
 
 logger = logging.getLogger(__name__)
 
@@ -89,20 +94,18 @@ class DeepSeekAdapter(LLMPort):
             self._breaker.record_failure()
             raise
 
-    async def _call_api(
+    def _build_payload(
         self,
         system_prompt: str,
         messages: list[ChatMessage],
-        max_tokens: int | None = None,
-        temperature: float | None = None,
-    ) -> tuple[str, int | None]:
-        """Llamada directa a la API de DeepSeek (sin retry)."""
+        max_tokens: int | None,
+        temperature: float | None,
+    ) -> dict:
         api_messages = [
             {"role": "system", "content": system_prompt},
             *[{"role": msg.role.value, "content": msg.content} for msg in messages],
         ]
-
-        payload: dict = {
+        return {
             "model": self.model,
             "messages": api_messages,
             "temperature": temperature
@@ -111,18 +114,14 @@ class DeepSeekAdapter(LLMPort):
             "max_tokens": max_tokens or settings.max_tokens,
         }
 
-        headers = {
+    @property
+    def _headers(self) -> dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
-        response = await self.client.post(
-            f"{self.base_url}/chat/completions",
-            json=payload,
-            headers=headers,
-            timeout=httpx.Timeout(connect=10.0, read=120.0, write=10.0, pool=10.0),
-        )
-
+    def _raise_for_auth(self, response: httpx.Response) -> None:
         if response.status_code in (401, 403):
             logger.error(
                 f"DeepSeek AUTH error ({response.status_code}): API key inválida."
@@ -131,32 +130,106 @@ class DeepSeekAdapter(LLMPort):
                 f"DeepSeek API auth failed ({response.status_code})"
             )
 
-        response.raise_for_status()
-
-        data = response.json()
+    async def _call_api(
+        self,
+        system_prompt: str,
+        messages: list[ChatMessage],
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+    ) -> tuple[str, int | None]:
+        """Llamada directa a la API de DeepSeek (sin retry)."""
+        data = await self._post_json(
+            self._build_payload(system_prompt, messages, max_tokens, temperature)
+        )
         content = data["choices"][0]["message"]["content"]
         usage = data.get("usage", {})
         tokens = usage.get("total_tokens")
 
         return content, tokens
 
-    async def get_chat_completion_stream(
+    async def _post_json(self, payload: dict) -> dict:
+        response = await self.client.post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            headers=self._headers,
+            timeout=httpx.Timeout(connect=10.0, read=120.0, write=10.0, pool=10.0),
+        )
+
+        self._raise_for_auth(response)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_chat_completion_with_tools(
         self,
         system_prompt: str,
         messages: list[ChatMessage],
         *,
+        tools: list[ToolSpec],
+        tool_handler: ToolHandler,
         max_tokens: int | None = None,
         temperature: float | None = None,
-    ) -> str:
-        """Streaming no implementado - retorna respuesta completa."""
-        response, _ = await self.get_chat_completion(
-            system_prompt=system_prompt,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            use_cache=False,
+        session_id: str | None = None,
+        agent_mode: str | None = None,
+    ) -> tuple[str, int | None]:
+        """Tool calling (formato OpenAI) con circuit breaker; cada POST con retry."""
+        if self._breaker.is_open:
+            raise RuntimeError(
+                f"DeepSeek circuit breaker open ({self._breaker.state}). "
+                f"Provider temporalmente deshabilitado."
+            )
+
+        try:
+            result = await complete_with_tools(
+                self._post_json_with_retry,
+                self._build_payload(system_prompt, messages, max_tokens, temperature),
+                tools,
+                tool_handler,
+            )
+            self._breaker.record_success()
+            return result
+        except Exception:
+            self._breaker.record_failure()
+            raise
+
+    async def _post_json_with_retry(self, payload: dict) -> dict:
+        return await retry_with_backoff(
+            self._post_json, payload, max_retries=3, base_delay=1.0
         )
-        return response
+
+    async def get_chat_completion_stream(
+        self,
+        system_prompt: str,
+        messages: list[ChatMessage],
+        *,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        """Streaming SSE. Sin retry: no se puede reintentar a mitad de respuesta."""
+        if self._breaker.is_open:
+            raise RuntimeError(
+                f"DeepSeek circuit breaker open ({self._breaker.state}). "
+                f"Provider temporalmente deshabilitado."
+            )
+
+        payload = self._build_payload(system_prompt, messages, max_tokens, temperature)
+        payload["stream"] = True
+        try:
+            async with self.client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                headers=self._headers,
+                timeout=httpx.Timeout(connect=10.0, read=120.0, write=10.0, pool=10.0),
+            ) as response:
+                self._raise_for_auth(response)
+                response.raise_for_status()
+                async for event in iter_sse_json(response):
+                    if delta := openai_delta(event):
+                        yield delta
+            self._breaker.record_success()
+        except Exception:
+            self._breaker.record_failure()
+            raise
 
     def estimate_tokens(self, text: str) -> int:
         """Estima tokens: ~4 caracteres = 1 token."""
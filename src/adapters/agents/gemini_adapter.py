@@ -12,10 +12,13 @@ import httpx
 
 from src.adapters.agents.circuit_breaker import CircuitBreaker
 from src.adapters.agents.retry import retry_with_backoff
+from src.adapters.agents.sse import iter_sse_json
 from src.adapters.config.settings import settings
 from src.domain.ports.llm_port import LLMPort
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from src.domain.models import ChatMessage
 
 import logging
@@ -92,18 +95,13 @@ class GeminiAdapter(LLMPort):
             self._breaker.record_failure()
             raise
 
-    async def _call_api(
+    def _build_payload(
         self,
         system_prompt: str,
         messages: list[ChatMessage],
-        max_tokens: int | None = None,
-        temperature: float | None = None,
-    ) -> tuple[str, int | None]:
-        url = (
-            f"https://generativelanguage.googleapis.com/v1beta/models/"
-            f"{self.model}:generateContent"
-        )
-
+        max_tokens: int | None,
+        temperature: float | None,
+    ) -> dict[str, Any]:
         payload = self._build_contents(system_prompt, messages)
 
         gen_cfg: dict[str, Any] = {}
@@ -114,6 +112,21 @@ class GeminiAdapter(LLMPort):
 
         if gen_cfg:
             payload["generationConfig"] = gen_cfg
+        return payload
+
+    async def _call_api(
+        self,
+        system_prompt: str,
+        messages: list[ChatMessage],
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+    ) -> tuple[str, int | None]:
+        url = (
+            f"https://generativelanguage.googleapis.com/v1beta/models/"
+            f"{self.model}:generateContent"
+        )
+
+        payload = self._build_payload(system_prompt, messages, max_tokens, temperature)
 
         headers = {"x-goog-api-key": self.api_key}
 
@@ -148,14 +161,42 @@ class GeminiAdapter(LLMPort):
         *,
         max_tokens: int | None = None,
         temperature: float | None = None,
-    ) -> str:
-        response, _ = await self.get_chat_completion(
-            system_prompt=system_prompt,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
+    ) -> AsyncIterator[str]:
+        """Streaming vía `streamGenerateContent?alt=sse` (sin retry a mitad de respuesta)."""
+        if not self.api_key:
+            raise RuntimeError("Gemini API key no configurada")
+
+        if self._breaker.is_open:
+            raise RuntimeError(
+                f"Gemini circuit breaker open ({self._breaker.state}). "
+                f"Provider temporalmente deshabilitado."
+            )
+
+        url = (
+            f"https://generativelanguage.googleapis.com/v1beta/models/"
+            f"{self.model}:streamGenerateContent"
         )
-        return response
+        try:
+            async with self.client.stream(
+                "POST",
+                url,
+                params={"alt": "sse"},
+                json=self._build_payload(
+                    system_prompt, messages, max_tokens, temperature
+                ),
+                headers={"x-goog-api-key": self.api_key},
+                timeout=httpx.Timeout(connect=10.0, read=90.0, write=90.0, pool=10.0),
+            ) as response:
+                response.raise_for_status()
+                async for event in iter_sse_json(response):
+                    for candidate in event.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if text := part.get("text"):
+                                yield text
+            self._breaker.record_success()
+        except Exception:
+            self._breaker.record_failure()
+            raise
 
     def estimate_tokens(self, text: str) -> int:
         return len(text) // 4
@@ -12,22 +12,31 @@ from typing import TYPE_CHECKING
 import httpx
 
 from src.adapters.agents.circuit_breaker import CircuitBreaker
+from src.adapters.agents.openai_tools import complete_with_tools
 from src.adapters.agents.prompt_manager import prompt_manager
 from src.adapters.agents.retry import retry_with_backoff
+from src.adapters.agents.sse import iter_sse_json, openai_delta
 from src.adapters.config.settings import settings
 from src.domain.ports.llm_port import LLMPort
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from src.domain.models import ChatMessage
+    from src.domain.ports.llm_port import ToolHandler, ToolSpec
 
 logger = logging.getLogger(__name__)
 
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+
 _groq_breaker = CircuitBreaker(name="groq", failure_threshold=3, recovery_seconds=60)
 
 
 class GroqAdapter(LLMPort):
     """Adaptador de Groq con retry, circuit breaker y caché de prompts."""
 
+    supports_tools = True
+
     def __init__(self, client: httpx.AsyncClient, model: str | None = None) -> None:
         self.client = client
         self.model = model or settings.groq_model_name
@@ -60,31 +69,9 @@ class GroqAdapter(LLMPort):
         tokens_consumed = None
 
         if use_cache and session_id and agent_mode:
-            from src.adapters.agents.prompts import AgentMode
-
-            try:
-                mode_enum = (
-                    AgentMode(agent_mode) if isinstance(agent_mode, str) else agent_mode
-                )
-            except ValueError:
-                mode_enum = None
-
-            if mode_enum:
-                optimized_prompt, is_cached = prompt_manager.get_prompt(
-                    session_id=session_id, agent_mode=mode_enum
-                )
-                limited_messages = prompt_manager.limit_history(messages)
-                user_msg = messages[-1].content if messages else ""
-                metrics = prompt_manager.record_metrics(
-                    session_id=session_id,
-                    system_prompt=optimized_prompt,
-                    history=limited_messages,
-                    user_message=user_msg,
-                    is_cached=is_cached,
-                )
-                system_prompt = optimized_prompt
-                messages = limited_messages
-                tokens_consumed = metrics.total_tokens if metrics else None
+            system_prompt, messages, tokens_consumed = self._apply_prompt_manager(
+                system_prompt, messages, session_id, agent_mode
+            )
 
         try:
             result = await retry_with_backoff(
@@ -103,64 +90,182 @@ class GroqAdapter(LLMPort):
             self._breaker.record_failure()
             raise
 
-    async def _call_api(
+    @staticmethod
+    def _apply_prompt_manager(
+        system_prompt: str,
+        messages: list[ChatMessage],
+        session_id: str,
+        agent_mode: str,
+    ) -> tuple[str, list[ChatMessage], int | None]:
+        """Prompt optimizado del modo, historial acotado y tokens registrados."""
+        from src.adapters.agents.prompts import AgentMode
+
+        try:
+            mode_enum = (
+                AgentMode(agent_mode) if isinstance(agent_mode, str) else agent_mode
+            )
+        except ValueError:
+            mode_enum = None
+
+        if not mode_enum:
+            return system_prompt, messages, None
+
+        optimized_prompt, is_cached = prompt_manager.get_prompt(
+            session_id=session_id, agent_mode=mode_enum
+        )
+        limited_messages = prompt_manager.limit_history(messages)
+        user_msg = messages[-1].content if messages else ""
+        metrics = prompt_manager.record_metrics(
+            session_id=session_id,
+            system_prompt=optimized_prompt,
+            history=limited_messages,
+            user_message=user_msg,
+            is_cached=is_cached,
+        )
+        return (
+            optimized_prompt,
+            limited_messages,
+            metrics.total_tokens if metrics else None,
+        )
+
+    def _build_payload(
         self,
         system_prompt: str,
         messages: list[ChatMessage],
-        max_tokens: int | None = None,
-        temperature: float | None = None,
-    ) -> tuple[str, int | None]:
+        max_tokens: int | None,
+        temperature: float | None,
+    ) -> dict:
         api_messages = [
             {"role": "system", "content": system_prompt},
             *[{"role": msg.role.value, "content": msg.content} for msg in messages],
         ]
+        return {
+            "messages": api_messages,
+            "model": self.model,
+            "temperature": temperature
+            if temperature is not None
+            else settings.temperature,
+            "max_tokens": max_tokens or settings.max_tokens,
+        }
 
-        response = await self.client.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "messages": api_messages,
-                "model": self.model,
-                "temperature": temperature
-                if temperature is not None
-                else settings.temperature,
-                "max_tokens": max_tokens or settings.max_tokens,
-            },
-            timeout=httpx.Timeout(connect=10.0, read=90.0, write=90.0, pool=10.0),
-        )
+    @property
+    def _headers(self) -> dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
 
+    def _raise_for_auth(self, response: httpx.Response) -> None:
         if response.status_code in (401, 403):
             logger.error(f"Groq AUTH error ({response.status_code}): API key inválida.")
             raise ConnectionRefusedError(
                 f"Groq API auth failed ({response.status_code})"
             )
 
-        response.raise_for_status()
-
-        data = response.json()
+    async def _call_api(
+        self,
+        system_prompt: str,
+        messages: list[ChatMessage],
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+    ) -> tuple[str, int | None]:
+        data = await self._post_json(
+            self._build_payload(system_prompt, messages, max_tokens, temperature)
+        )
         content = data["choices"][0]["message"]["content"]
 
         return content, None
 
-    async def get_chat_completion_stream(
+    async def _post_json(self, payload: dict) -> dict:
+        response = await self.client.post(
+            GROQ_CHAT_URL,
+            headers=self._headers,
+            json=payload,
+            timeout=httpx.Timeout(connect=10.0, read=90.0, write=90.0, pool=10.0),
+        )
+
+        self._raise_for_auth(response)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_chat_completion_with_tools(
         self,
         system_prompt: str,
         messages: list[ChatMessage],
         *,
+        tools: list[ToolSpec],
+        tool_handler: ToolHandler,
         max_tokens: int | None = None,
         temperature: float | None = None,
-    ) -> str:
-        response, _ = await self.get_chat_completion(
-            system_prompt=system_prompt,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            use_cache=False,
+        session_id: str | None = None,
+        agent_mode: str | None = None,
+    ) -> tuple[str, int | None]:
+        """Tool calling (formato OpenAI) con circuit breaker; cada POST con retry."""
+        if self._breaker.is_open:
+            raise RuntimeError(
+                f"Groq circuit breaker open ({self._breaker.state}). "
+                f"Provider temporalmente deshabilitado."
+            )
+
+        tokens_consumed = None
+        if session_id and agent_mode:
+            # Mismo prompt optimizado e historial acotado que get_chat_completion
+            system_prompt, messages, tokens_consumed = self._apply_prompt_manager(
+                system_prompt, messages, session_id, agent_mode
+            )
+
+        try:
+            content, tokens = await complete_with_tools(
+                self._post_json_with_retry,
+                self._build_payload(system_prompt, messages, max_tokens, temperature),
+                tools,
+                tool_handler,
+            )
+            self._breaker.record_success()
+            return content, tokens if tokens is not None else tokens_consumed
+        except Exception:
+            self._breaker.record_failure()
+            raise
+
+    async def _post_json_with_retry(self, payload: dict) -> dict:
+        return await retry_with_backoff(
+            self._post_json, payload, max_retries=3, base_delay=1.0
         )
-        return response
+
+    async def get_chat_completion_stream(
+        self,
+        system_prompt: str,
+        messages: list[ChatMessage],
+        *,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+    ) -> AsyncIterator[str]:
+        """Streaming SSE. Sin retry: no se puede reintentar a mitad de respuesta."""
+        if self._breaker.is_open:
+            raise RuntimeError(
+                f"Groq circuit breaker open ({self._breaker.state}). "
+                f"Provider temporalmente deshabilitado."
+            )
+
+        payload = self._build_payload(system_prompt, messages, max_tokens, temperature)
+        payload["stream"] = True
+        try:
+            async with self.client.stream(
+                "POST",
+                GROQ_CHAT_URL,
+                headers=self._headers,
+                json=payload,
+                timeout=httpx.Timeout(connect=10.0, read=90.0, write=90.0, pool=10.0),
+            ) as response:
+                self._raise_for_auth(response)
+                response.raise_for_status()
+                async for event in iter_sse_json(response):
+                    if delta := openai_delta(event):
+                        yield delta
+            self._breaker.record_success()
+        except Exception:
+            self._breaker.record_failure()
+            raise
 
     def estimate_tokens(self, text: str) -> int:
         return len(text) // 4
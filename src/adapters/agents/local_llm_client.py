@@ -8,6 +8,7 @@ Este cliente se conecta a Ollama local para usar modelos como:
 
 from __future__ import annotations
 
+import json
 import logging
 import time
 from typing import TYPE_CHECKING, Any
@@ -17,6 +18,8 @@ import httpx
 from src.domain.ports import LLMPort
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from src.domain.models import ChatMessage
 
 logger = logging.getLogger(__name__)
@@ -51,27 +54,15 @@ class LocalLLMClient(LLMPort):
 
         logger.info("LocalLLMClient inicializado: %s en %s", model_name, base_url)
 
-    async def get_chat_completion(
+    def _build_payload(
         self,
         system_prompt: str,
         messages: list[ChatMessage],
+        temperature: float | None,
         *,
-        max_tokens: int | None = None,  # Ignorado por Ollama, pero tipado
-        temperature: float | None = None,
-        **_: Any,
-    ) -> tuple[str, int]:
-        """
-        Obtiene una respuesta del modelo local.
-
-        Args:
-            system_prompt: Prompt del sistema.
-            messages: Lista de mensajes del chat.
-            max_tokens: Tokens máximos (no utilizado por Ollama).
-            temperature: Temperatura de generación.
-
-        Returns:
-            Tupla de (respuesta, tokens_estimados).
-        """
+        stream: bool = False,
+    ) -> dict[str, Any]:
+        """Construye el payload de /api/chat de Ollama."""
         ollama_messages: list[dict[str, str]] = [
             {"role": "system", "content": system_prompt}
         ]
@@ -90,11 +81,36 @@ class LocalLLMClient(LLMPort):
         payload: dict[str, Any] = {
             "model": self.model_name,
             "messages": ollama_messages,
-            "stream": False,
+            "stream": stream,
         }
 
         if temperature is not None:
             payload["options"] = {"temperature": temperature}
+        return payload
+
+    async def get_chat_completion(
+        self,
+        system_prompt: str,
+        messages: list[ChatMessage],
+        *,
+        max_tokens: int | None = None,  # Ignorado por Ollama, pero tipado
+        temperature: float | None = None,
+        **_: Any,
+    ) -> tuple[str, int]:
+        """
+        Obtiene una respuesta del modelo local.
+
+        Args:
+            system_prompt: Prompt del sistema.
+            messages: Lista de mensajes del chat.
+            max_tokens: Tokens máximos (no utilizado por Ollama).
+            temperature: Temperatura de generación.
+
+        Returns:
+            Tupla de (respuesta, tokens_estimados).
+        """
+        payload = self._build_payload(system_prompt, messages, temperature)
+        ollama_messages = payload["messages"]
 
         logger.debug(
             "Enviando a %s: %d mensajes",
@@ -148,18 +164,37 @@ class LocalLLMClient(LLMPort):
         *,
         max_tokens: int | None = None,
         temperature: float | None = None,
-    ) -> str:
+    ) -> AsyncIterator[str]:
         """
         Obtiene una respuesta del modelo en modo streaming.
-        Por ahora, implementado como no-streaming para cumplir con la interfaz.
+
+        Ollama responde con una línea JSON por fragmento (NDJSON) hasta `done`.
         """
-        response, _ = await self.get_chat_completion(
-            system_prompt=system_prompt,
-            messages=messages,
-            max_tokens=max_tokens,
-            temperature=temperature,
-        )
-        return response
+        payload = self._build_payload(system_prompt, messages, temperature, stream=True)
+
+        try:
+            async with self.client.stream(
+                "POST", f"{self.base_url}/api/chat", json=payload
+            ) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode(errors="replace")
+                    error_msg = f"Error {response.status_code}: {body}"
+                    logger.error("Error en %s: %s", self.model_name, error_msg)
+                    raise RuntimeError(error_msg)
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if text := chunk.get("message", {}).get("content"):
+                        yield text
+                    if chunk.get("done"):
+                        break
+
+        except httpx.ConnectError as exc:
+            error_msg = f"No se puede conectar a Ollama en {self.base_url}"
+            logger.error("Error de conexión: %s", error_msg)
+            raise RuntimeError(error_msg) from exc
 
     def estimate_tokens(self, text: str) -> int:
         """Estima tokens (aprox 4 chars por token)."""
@@ -0,0 +1,109 @@
+"""
+Tool calling en el formato de chat completions compatible con OpenAI.
+
+Groq (Kimi) y DeepSeek exponen el mismo contrato: el modelo responde con
+`tool_calls`, el cliente ejecuta cada herramienta y reenvía los resultados
+como mensajes `role: "tool"` para obtener la respuesta final.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from src.domain.ports.llm_port import ToolHandler, ToolSpec
+
+logger = logging.getLogger(__name__)
+
+type PostJson = Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]
+
+
+def openai_tools(tools: list[ToolSpec]) -> list[dict[str, Any]]:
+    """Convierte las herramientas del puerto al esquema `tools` de OpenAI."""
+    return [
+        {
+            "type": "function",
+            "function": {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters,
+            },
+        }
+        for tool in tools
+    ]
+
+
+def _usage_tokens(data: dict[str, Any]) -> int | None:
+    """Tokens totales que informa el proveedor, si los informa."""
+    usage = data.get("usage") or {}
+    return usage.get("total_tokens")
+
+
+async def _run_tool_call(call: dict[str, Any], tool_handler: ToolHandler) -> str:
+    """Decodifica los argumentos de un `tool_call` y ejecuta la herramienta."""
+    function = call["function"]
+    try:
+        arguments = json.loads(function.get("arguments") or "{}")
+    except json.JSONDecodeError:
+        logger.warning(f"⚠️ Argumentos inválidos para {function['name']}: {function.get('arguments')!r}")
+        arguments = {}
+    logger.info(f"🛠️ El modelo invocó {function['name']}({arguments})")
+    return await tool_handler(function["name"], arguments)
+
+
+async def complete_with_tools(
+    post_json: PostJson,
+    payload: dict[str, Any],
+    tools: list[ToolSpec],
+    tool_handler: ToolHandler,
+) -> tuple[str, int | None]:
+    """
+    Una ronda de tool calling sobre un payload de chat completions.
+
+    Si el modelo no pide herramientas, su respuesta es la final (un solo
+    round trip). Si las pide, se ejecutan y una segunda llamada, sin permitir
+    más herramientas, produce la respuesta con sus resultados.
+    """
+    first = await post_json(
+        {**payload, "tools": openai_tools(tools), "tool_choice": "auto"}
+    )
+    message = first["choices"][0]["message"]
+    tool_calls = message.get("tool_calls")
+    if not tool_calls:
+        return message.get("content") or "", _usage_tokens(first)
+
+    # Varias herramientas pedidas en la misma respuesta corren en paralelo:
+    # la latencia es la de la más lenta, no la suma
+    outputs = await asyncio.gather(
+        *(_run_tool_call(call, tool_handler) for call in tool_calls)
+    )
+    followup = [
+        *payload["messages"],
+        {
+            "role": "assistant",
+            "content": message.get("content"),
+            "tool_calls": tool_calls,
+        },
+        *(
+            {"role": "tool", "tool_call_id": call["id"], "content": output}
+            for call, output in zip(tool_calls, outputs, strict=True)
+        ),
+    ]
+
+    second = await post_json(
+        {
+            **payload,
+            "messages": followup,
+            "tools": openai_tools(tools),
+            "tool_choice": "none",
+        }
+    )
+    tokens = [t for t in (_usage_tokens(first), _usage_tokens(second)) if t is not None]
+    return (
+        second["choices"][0]["message"].get("content") or "",
+        sum(tokens) if tokens else None,
+    )
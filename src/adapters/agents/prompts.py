@@ -135,20 +135,26 @@ SYSTEM_PROMPTS: Final[dict[AgentMode, str]] = {
 # --- Funciones de Validación y Acceso ---
 
 
+# Clave en minúsculas (valor o nombre del enum) -> modo. Se arma una vez al
+# importar; setdefault conserva la prioridad del orden de declaración.
+_MODE_BY_KEY: Final[dict[str, AgentMode]] = {}
+for _mode in AgentMode:
+    _MODE_BY_KEY.setdefault(_mode.value.lower(), _mode)
+    _MODE_BY_KEY.setdefault(_mode.name.lower(), _mode)
+# Fallback para claves simples como 'architect'
+_MODE_BY_KEY.setdefault("architect", AgentMode.PYTHON_ARCHITECT)
+del _mode
+
+
 def get_system_prompt(mode: AgentMode | str) -> str:
     """Construye el prompt del sistema final, aceptando enum o string."""
+    if isinstance(mode, AgentMode):
+        return SYSTEM_PROMPTS[mode]
     if isinstance(mode, str):
-        # Buscar el enum correspondiente al string
-        for agent_mode in AgentMode:
-            if (
-                agent_mode.value.lower() == mode.lower()
-                or agent_mode.name.lower() == mode.lower()
-            ):
-                return SYSTEM_PROMPTS[agent_mode]
-        # Fallback para claves simples como 'architect'
-        if mode.lower() == "architect":
-            return SYSTEM_PROMPTS[AgentMode.PYTHON_ARCHITECT]
-        raise KeyError(f"No se encontró un prompt para el modo: '{mode}'")
+        agent_mode = _MODE_BY_KEY.get(mode.lower())
+        if agent_mode is None:
+            raise KeyError(f"No se encontró un prompt para el modo: '{mode}'")
+        return SYSTEM_PROMPTS[agent_mode]
     return SYSTEM_PROMPTS[mode]
 
 
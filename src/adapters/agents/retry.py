@@ -10,7 +10,10 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import random
 from collections.abc import Callable
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 from typing import Any, TypeVar
 
 import httpx
@@ -36,6 +39,23 @@ def is_retryable_error(error: Exception) -> bool:
     return False
 
 
+def retry_after_seconds(error: Exception) -> float | None:
+    """Espera pedida por el servidor en `Retry-After` (segundos o fecha HTTP)."""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
 async def retry_with_backoff(
     fn: Callable[..., Any],
     *args: Any,
@@ -47,6 +67,11 @@ async def retry_with_backoff(
     """
     Ejecuta una función async con reintentos y exponential backoff.
 
+    El delay lleva jitter para que los requests que fallaron juntos (p. ej.
+    un 429 a varios usuarios) no reintenten todos en el mismo instante. Si
+    el servidor indica `Retry-After` se respeta; si pide esperar más que
+    `max_delay`, no se reintenta: el llamador pasa antes al fallback.
+
     Args:
         fn: Función async a ejecutar
         max_retries: Máximo de reintentos (default 3)
@@ -71,8 +96,21 @@ async def retry_with_backoff(
 
             last_error = e
 
+            retry_after = retry_after_seconds(e)
+            if retry_after is not None and retry_after > max_delay:
+                logger.error(
+                    f"Retry-After {retry_after:.0f}s exceeds {max_delay:.0f}s, not retrying: {e}"
+                )
+                raise
+
             if attempt < max_retries:
-                delay = min(base_delay * (2**attempt), max_delay)
+                if retry_after is not None:
+                    delay = retry_after
+                else:
+                    delay = min(
+                        base_delay * (2**attempt) + random.uniform(0, base_delay),
+                        max_delay,
+                    )
                 provider = getattr(fn, "__qualname__", str(fn))
                 logger.warning(
                     f"Retry {attempt + 1}/{max_retries} for {provider} "
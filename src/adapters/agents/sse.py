@@ -0,0 +1,34 @@
+"""
+Lectura de respuestas en streaming de los proveedores LLM.
+
+Groq, DeepSeek y Gemini (`alt=sse`) emiten Server-Sent Events: líneas
+`data: {json}` separadas por líneas vacías. Las APIs compatibles con OpenAI
+terminan el stream con `data: [DONE]`.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+
+
+async def iter_sse_json(response: httpx.Response) -> AsyncIterator[dict[str, Any]]:
+    """Itera los eventos `data:` de una respuesta SSE ya decodificados como JSON."""
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue  # Comentarios, `event:`, `id:` y separadores
+        data = line[5:].strip()
+        if not data:
+            continue
+        if data == "[DONE]":
+            return
+        yield json.loads(data)
+
+
+def openai_delta(event: dict[str, Any]) -> str:
+    """Texto incremental de un chunk `chat.completion.chunk` (formato OpenAI)."""
+    choices = event.get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or ""
@@ -8,6 +8,7 @@ dependencias de FastAPI para verificar tokens JWT en el header Authorization.
 from __future__ import annotations
 
 import logging
+from functools import cache
 from typing import Annotated
 
 from fastapi import Depends, HTTPException, status
@@ -22,7 +23,9 @@ bearer_scheme = HTTPBearer(auto_error=True)
 bearer_scheme_optional = HTTPBearer(auto_error=False)
 
 
+@cache
 def _get_token_service() -> JWTTokenService:
+    """Singleton: conserva el caché de tokens verificados entre requests."""
     return JWTTokenService(
         secret_key=settings.jwt_secret_key,
         algorithm="HS256",
@@ -42,16 +42,16 @@ async def register(
         Token de acceso y datos del usuario creado
     """
     try:
-        result = auth_service.register_user(
+        result = await auth_service.register_user(
             email=user_data.email,
             password=user_data.password,
             full_name=user_data.full_name,
         )
 
         return TokenResponse(
-            access_token=result["access_token"],
-            token_type=result["token_type"],
-            user=UserResponse(**result["user"]),
+            access_token=result.access_token,
+            token_type=result.token_type,
+            user=UserResponse.model_validate(result.user),
         )
     except ValueError as e:
         logger.warning(f"Error de validación en registro: {e}")
@@ -81,14 +81,14 @@ async def login(
         Token de acceso y datos del usuario
     """
     try:
-        result = auth_service.login_user(
+        result = await auth_service.login_user(
             email=credentials.email, password=credentials.password
         )
 
         return TokenResponse(
-            access_token=result["access_token"],
-            token_type=result["token_type"],
-            user=UserResponse(**result["user"]),
+            access_token=result.access_token,
+            token_type=result.token_type,
+            user=UserResponse.model_validate(result.user),
         )
     except ValueError as e:
         logger.warning(f"Intento de login fallido para {credentials.email}: {e}")
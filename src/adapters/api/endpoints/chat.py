@@ -5,8 +5,10 @@ MIGRADO: Usa ChatServiceV2 con arquitectura hexagonal
 """
 
 import logging
+from collections.abc import AsyncIterator
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -68,29 +70,9 @@ def create_new_session(
         ) from None
 
 
-@router.post("/chat", response_model=ChatResponse)
-@limiter.limit("10/minute")
-async def handle_chat(
-    request: Request,
-    chat_request: ChatRequest,
-    user: dict | None = Depends(get_current_user_optional),
-    service: ChatServiceV2 = Depends(get_chat_service_dependency),
-):
-    """Maneja un mensaje de chat y devuelve la respuesta de la IA."""
-    try:
-        logger.info(f"Request de chat recibida para sesión {chat_request.session_id}")
-        logger.debug(f"Detalles del request: {chat_request.model_dump_json()}")
-
-        reply = await service.handle_message(
-            session_id=str(chat_request.session_id),
-            user_message=chat_request.message,
-            agent_mode=chat_request.mode.value,
-            file_id=chat_request.file_id,
-            use_internet=True,
-        )
-        return ChatResponse(reply=reply)
-
-    except ConnectionRefusedError as e:
+def _to_http_error(e: Exception) -> HTTPException:
+    """Traduce los errores del servicio de chat a respuestas HTTP tipadas."""
+    if isinstance(e, ConnectionRefusedError):
         error_str = str(e)
         provider = (
             "deepseek"
@@ -100,7 +82,7 @@ async def handle_chat(
             else "gemini"
         )
         logger.error(f"Auth error from {provider}: {e}")
-        raise HTTPException(
+        return HTTPException(
             status_code=503,
             detail=ChatErrorResponse(
                 error="provider_auth_error",
@@ -108,9 +90,9 @@ async def handle_chat(
                 provider=provider,
                 retryable=False,
             ).model_dump(),
-        ) from None
+        )
 
-    except RuntimeError as e:
+    if isinstance(e, RuntimeError):
         error_str = str(e)
         if "circuit breaker" in error_str.lower():
             provider = (
@@ -121,7 +103,7 @@ async def handle_chat(
                 else "gemini"
             )
             logger.warning(f"Circuit breaker open for {provider}: {e}")
-            raise HTTPException(
+            return HTTPException(
                 status_code=503,
                 detail=ChatErrorResponse(
                     error="provider_unavailable",
@@ -129,38 +111,94 @@ async def handle_chat(
                     provider=provider,
                     retryable=True,
                 ).model_dump(),
-            ) from None
+            )
         logger.error(f"Runtime error en handle_chat: {e}", exc_info=True)
-        raise HTTPException(
+        return HTTPException(
             status_code=500,
             detail=ChatErrorResponse(
                 error="runtime_error",
                 detail="Internal error processing message.",
                 retryable=True,
             ).model_dump(),
-        ) from None
+        )
 
-    except ValueError as e:
+    if isinstance(e, ValueError):
         logger.warning(f"Validation error en handle_chat: {e}")
-        raise HTTPException(
+        return HTTPException(
             status_code=400,
             detail=ChatErrorResponse(
                 error="validation_error",
                 detail=str(e),
                 retryable=False,
             ).model_dump(),
-        ) from None
+        )
+
+    logger.error(f"Error en handle_chat: {e}", exc_info=True)
+    return HTTPException(
+        status_code=500,
+        detail=ChatErrorResponse(
+            error="internal_error",
+            detail="Error interno al procesar el mensaje.",
+            retryable=True,
+        ).model_dump(),
+    )
+
+
+@router.post("/chat", response_model=ChatResponse)
+@limiter.limit("10/minute")
+async def handle_chat(
+    request: Request,
+    chat_request: ChatRequest,
+    user: dict | None = Depends(get_current_user_optional),
+    service: ChatServiceV2 = Depends(get_chat_service_dependency),
+):
+    """Maneja un mensaje de chat y devuelve la respuesta de la IA."""
+    try:
+        logger.info(f"Request de chat recibida para sesión {chat_request.session_id}")
+        logger.debug(f"Detalles del request: {chat_request.model_dump_json()}")
+
+        reply = await service.handle_message(
+            session_id=str(chat_request.session_id),
+            user_message=chat_request.message,
+            agent_mode=chat_request.mode.value,
+            file_id=chat_request.file_id,
+            use_internet=True,
+        )
+        return ChatResponse(reply=reply)
 
     except Exception as e:
-        logger.error(f"Error en handle_chat: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=ChatErrorResponse(
-                error="internal_error",
-                detail="Error interno al procesar el mensaje.",
-                retryable=True,
-            ).model_dump(),
-        ) from None
+        raise _to_http_error(e) from None
+
+
+@router.post("/chat/stream")
+@limiter.limit("10/minute")
+async def handle_chat_stream(
+    request: Request,
+    chat_request: ChatRequest,
+    user: dict | None = Depends(get_current_user_optional),
+    service: ChatServiceV2 = Depends(get_chat_service_dependency),
+):
+    """Como /chat, pero envía la respuesta como texto a medida que se genera."""
+    logger.info(f"Request de chat (stream) recibida para sesión {chat_request.session_id}")
+    chunks = service.handle_message_stream(
+        session_id=str(chat_request.session_id),
+        user_message=chat_request.message,
+        agent_mode=chat_request.mode.value,
+        file_id=chat_request.file_id,
+    )
+    # Esperar el primer fragmento antes de responder: así los errores de
+    # sesión/proveedor todavía se devuelven con su código HTTP
+    try:
+        first = await anext(chunks, "")
+    except Exception as e:
+        raise _to_http_error(e) from None
+
+    async def body() -> AsyncIterator[str]:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
 
 
 class ChatMessageDTO(BaseModel):
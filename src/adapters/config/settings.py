@@ -110,6 +110,14 @@ class Settings(BaseSettings):
         4096,
         description="Máximo de tokens a generar en la respuesta (ajustado para respuestas concisas)",
     )
+    chat_history_window: int = Field(
+        20,
+        description="Mensajes previos de la sesión que se envían al LLM en cada turno",
+    )
+    chat_history_window_rag: int = Field(
+        12,
+        description="Ventana de historial en turnos con contexto RAG (el system prompt ya es grande)",
+    )
 
     # --- DeepSeek Config ---
     deepseek_base_url: str = Field(
@@ -187,6 +195,10 @@ class Settings(BaseSettings):
         3600,
         description="Tiempo de vida del caché en segundos (1 hora por defecto)",
     )
+    bear_cache_path: str | None = Field(
+        None,
+        description="Ruta SQLite para persistir el caché de Bear entre reinicios (None = solo memoria)",
+    )
     max_search_results: int = Field(
         10,
         description="Máximo de resultados de búsqueda a incluir en el contexto (aumentado para mejor cobertura)",
@@ -207,15 +219,66 @@ class Settings(BaseSettings):
     )
     rag_simple_limit: int = Field(
         4000,
-        description="Límite de caracteres de contexto para preguntas simples",
+        description="Límite de contexto RAG en bytes UTF-8 (≈ caracteres en texto latino) para preguntas simples",
     )
     rag_normal_limit: int = Field(
         8000,
-        description="Límite de caracteres de contexto para preguntas normales",
+        description="Límite de contexto RAG en bytes UTF-8 (≈ caracteres en texto latino) para preguntas normales",
     )
     rag_complex_limit: int = Field(
         15000,
-        description="Límite de caracteres de contexto para preguntas complejas",
+        description="Límite de contexto RAG en bytes UTF-8 (≈ caracteres en texto latino) para preguntas complejas",
+    )
+    rag_candidate_pool: int = Field(
+        30,
+        description="Chunks candidatos que se recuperan antes del rerank MMR",
+    )
+    rag_mmr_lambda: float = Field(
+        0.7,
+        description="Peso de la relevancia frente a la diversidad en el rerank MMR (0-1)",
+    )
+    rag_semantic_cache_threshold: float = Field(
+        0.95,
+        description="Similitud coseno mínima para reutilizar chunks de una consulta previa (misma sesión y documento)",
+    )
+    rag_semantic_cache_ttl: int = Field(
+        600,
+        description="TTL en segundos del caché semántico de recuperaciones RAG",
+    )
+    rag_context_cache_ttl: int = Field(
+        600,
+        description="TTL en segundos del caché exacto de contexto RAG por (archivo, consulta normalizada)",
+    )
+    rag_context_cache_max_entries: int = Field(
+        256,
+        description="Entradas máximas del caché exacto de contexto RAG",
+    )
+    llm_response_cache_enabled: bool = Field(
+        False,
+        description="Reutilizar respuestas del LLM para primeros mensajes casi idénticos (cuesta un embedding por turno)",
+    )
+    llm_response_cache_threshold: float = Field(
+        0.92,
+        description="Similitud coseno mínima entre mensajes para reutilizar una respuesta del LLM",
+    )
+    llm_response_cache_ttl: int = Field(
+        3600,
+        description="TTL en segundos del caché semántico de respuestas del LLM",
+    )
+    llm_http_max_connections: int = Field(
+        100,
+        description="Conexiones simultáneas del cliente HTTP compartido por los proveedores LLM",
+    )
+    llm_http_max_keepalive: int = Field(
+        100,
+        description="Conexiones que se mantienen abiertas entre turnos (evita handshakes TLS con usuarios concurrentes)",
+    )
+    llm_tool_calling_enabled: bool = Field(
+        False,
+        description=(
+            "Ofrecer la búsqueda web como herramienta a proveedores con tool calling "
+            "(el modelo decide si buscar). Desactivado: respuesta inicial y detección heurística"
+        ),
     )
 
     # --- Guardian (Qwen2.5-1.5B Security) ---
@@ -251,6 +314,14 @@ class Settings(BaseSettings):
         20,
         description="Longitud mínima de mensaje para activar Guardian (caracteres)",
     )
+    guardian_batch_max_size: int = Field(
+        8,
+        description="Máximo de mensajes agrupados en una sola llamada al Guardian (1 = sin batching)",
+    )
+    guardian_batch_max_wait_ms: float = Field(
+        20.0,
+        description="Ventana de espera (ms) para acumular mensajes concurrentes en un batch",
+    )
 
     def validate_api_keys(self) -> list[str]:
         """Valida las API keys al arrancar. Retorna lista de problemas encontrados."""
@@ -116,7 +116,7 @@ class SQLChatRepositoryAdapter(ChatRepositoryPort):
         statement = (
             select(ChatSessionDB)
             .where(message_count > 0)  # Solo sesiones con mensajes
-            .order_by(ChatSessionDB.updated_at.desc())  # type: ignore[arg-defined]
+            .order_by(ChatSessionDB.updated_at.desc())  # type: ignore[attr-defined]
             .limit(limit)
             .offset(offset)
         )
@@ -124,6 +124,39 @@ class SQLChatRepositoryAdapter(ChatRepositoryPort):
         db_sessions = self.session.exec(statement).all()
         return [self._db_session_to_domain(s) for s in db_sessions]
 
+    def list_sessions_with_counts(
+        self,
+        user_id: str,
+        *,
+        limit: int = 50,
+    ) -> list[tuple[ChatSession, int]]:
+        """
+        Lista las sesiones con mensajes de un usuario junto a su conteo.
+
+        Una sola consulta: el JOIN con los mensajes descarta las sesiones
+        vacías y el GROUP BY cuenta por sesión; la BD devuelve como máximo
+        `limit` filas ya ordenadas.
+
+        Args:
+            user_id: ID del usuario
+            limit: Número máximo de sesiones
+
+        Returns:
+            Pares (sesión, número de mensajes), más recientes primero
+        """
+        message_count = func.count(ChatMessageDB.id)
+        statement = (
+            select(ChatSessionDB, message_count)
+            .join(ChatMessageDB, ChatMessageDB.session_id == ChatSessionDB.id)
+            .where(ChatSessionDB.user_id == user_id)
+            .group_by(ChatSessionDB.id)
+            .order_by(ChatSessionDB.updated_at.desc())  # type: ignore[attr-defined]
+            .limit(limit)
+        )
+
+        rows = self.session.exec(statement).all()
+        return [(self._db_session_to_domain(s), count) for s, count in rows]
+
     def count_session_messages(self, session_id: str) -> int:
         """
         Cuenta los mensajes de una sesión.
@@ -142,6 +175,28 @@ class SQLChatRepositoryAdapter(ChatRepositoryPort):
         count = self.session.exec(statement).first()
         return count or 0
 
+    def count_messages_for_sessions(self, session_ids: list[str]) -> dict[str, int]:
+        """
+        Cuenta los mensajes de varias sesiones con un solo GROUP BY.
+
+        Args:
+            session_ids: IDs de las sesiones
+
+        Returns:
+            Diccionario session_id -> número de mensajes (0 si no tiene)
+        """
+        if not session_ids:
+            return {}
+
+        ids = [int(sid) for sid in session_ids]
+        statement = (
+            select(ChatMessageDB.session_id, func.count())
+            .where(ChatMessageDB.session_id.in_(ids))  # type: ignore[union-attr]
+            .group_by(ChatMessageDB.session_id)
+        )
+        counts = {str(sid): count for sid, count in self.session.exec(statement)}
+        return {sid: counts.get(sid, 0) for sid in session_ids}
+
 
     def update_session(
         self,
@@ -244,6 +299,34 @@ class SQLChatRepositoryAdapter(ChatRepositoryPort):
 
         return [self._db_message_to_domain(m) for m in db_messages]
 
+    def get_recent_session_messages(
+        self, session_id: str, *, limit: int
+    ) -> list[ChatMessage]:
+        """
+        Obtiene la ventana de los últimos mensajes de una sesión.
+
+        La consulta lee como máximo `limit` filas (ORDER BY DESC + LIMIT) en
+        vez de toda la conversación; se invierten en Python para devolverlas
+        en orden cronológico.
+
+        Args:
+            session_id: ID de la sesión
+            limit: Número máximo de mensajes
+
+        Returns:
+            Lista de mensajes ordenados por índice
+        """
+        statement = (
+            select(ChatMessageDB)
+            .where(ChatMessageDB.session_id == int(session_id))
+            .order_by(ChatMessageDB.message_index.desc())  # type: ignore[attr-defined]
+            .limit(limit)
+        )
+
+        db_messages = self.session.exec(statement).all()
+
+        return [self._db_message_to_domain(m) for m in reversed(db_messages)]
+
     def get_message(self, message_id: int) -> ChatMessage | None:
         """
         Obtiene un mensaje por su ID.
@@ -15,7 +15,7 @@ from __future__ import annotations
 
 from collections.abc import Iterable, Sequence
 
-from sqlalchemy import text
+from sqlalchemy import Connection, TextClause, text
 
 from src.adapters.db.embeddings_models import EmbeddingChunk, SimilarChunk
 from src.adapters.db.pg_engine import get_pg_engine
@@ -25,6 +25,25 @@ EMBEDDING_DIM = (
 )
 TABLE_NAME = "document_chunks"
 
+# Candidatos que explora HNSW por consulta (default de pgvector: 40). Con el
+# filtro por file_id, HNSW filtra *después* de recorrer el grafo, así que un
+# ef_search bajo puede devolver menos de top_k chunks del documento.
+HNSW_EF_SEARCH = 100
+
+# Cuantización binaria (pgvector >= 0.7): un índice HNSW sobre
+# binary_quantize(embedding) ocupa 1 bit por dimensión (32x menos que float32)
+# y se recorre con distancia de Hamming. Los candidatos se re-rankean luego con
+# el coseno exacto sobre los float32 de la tabla.
+BINARY_QUANTIZATION_MIN_VERSION = (0, 7)
+BINARY_RERANK_CANDIDATES = 200
+
+# pgvector >= 0.8 soporta iterative scans: sigue recorriendo el grafo hasta
+# completar top_k filas que pasen el WHERE.
+ITERATIVE_SCAN_MIN_VERSION = (0, 8)
+
+# Versión de pgvector (major, minor), detectada una vez por proceso
+_pgvector_version: tuple[int, int] | None = None
+
 
 class EmbeddingsRepository:
     def __init__(self) -> None:
@@ -60,6 +79,14 @@ class EmbeddingsRepository:
             # Ensure extension exists (noop if already enabled)
             conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
             conn.execute(text(ddl))
+            if _get_pgvector_version(conn) >= BINARY_QUANTIZATION_MIN_VERSION:
+                conn.execute(
+                    text(
+                        f"CREATE INDEX IF NOT EXISTS idx_{TABLE_NAME}_embedding_bq "
+                        f"ON {TABLE_NAME} USING hnsw "
+                        f"((binary_quantize(embedding)::bit({EMBEDDING_DIM})) bit_hamming_ops)"
+                    )
+                )
 
     def delete_file_chunks(self, file_id: int) -> int:
         """Delete all chunks for a given file_id. Returns number of deleted rows."""
@@ -138,6 +165,8 @@ class EmbeddingsRepository:
 
         IMPORTANTE: Usar <=> (coseno) para que match con el índice HNSW
         creado con vector_cosine_ops. Usar <-> (L2) ignoraría el índice.
+        Con pgvector >= 0.7 la preselección usa el índice binario (Hamming)
+        y el coseno exacto solo se calcula para esos candidatos.
         """
         query_list = list(query_embedding)
         if len(query_list) != EMBEDDING_DIM:
@@ -152,33 +181,20 @@ class EmbeddingsRepository:
             "embedding_vec": embedding_str,
         }
 
-        filter_parts: list[str] = []
         if file_id is not None:
-            filter_parts.append("file_id = :fid")
             params["fid"] = file_id
 
-        max_distance: float | None = None
         if min_similarity > 0.0:
-            max_distance = 1.0 - min_similarity
-            filter_parts.append(
-                "(embedding <=> CAST(:embedding_vec AS vector)) <= :max_distance"
-            )
-            params["max_distance"] = max_distance
-
-        where_clause = f"WHERE {' AND '.join(filter_parts)}" if filter_parts else ""
+            params["max_distance"] = 1.0 - min_similarity
 
-        sql = text(
-            f"""
-            SELECT id, file_id, section_id, chunk_index, content,
-                   (embedding <=> CAST(:embedding_vec AS vector)) AS distance,
-                   page_number, section_type, file_name
-            FROM {TABLE_NAME}
-            {where_clause}
-            ORDER BY embedding <=> CAST(:embedding_vec AS vector)
-            LIMIT :k
-            """
-        )
         with self.engine.begin() as conn:
+            if _get_pgvector_version(conn) >= BINARY_QUANTIZATION_MIN_VERSION:
+                params["candidates"] = max(BINARY_RERANK_CANDIDATES, top_k)
+                sql = self._binary_rerank_sql("fid" in params, "max_distance" in params)
+            else:
+                sql = self._exact_sql("fid" in params, "max_distance" in params)
+
+            self._configure_hnsw_scan(conn, params.get("candidates", top_k))
             res = conn.execute(sql, params)
             out: list[SimilarChunk] = []
             for row in res.mappings():
@@ -196,3 +212,80 @@ class EmbeddingsRepository:
                     )
                 )
             return out
+
+    @staticmethod
+    def _exact_sql(with_file_id: bool, with_max_distance: bool) -> TextClause:
+        """Búsqueda directa sobre el índice HNSW float32 (vector_cosine_ops)."""
+        filter_parts = ["file_id = :fid"] if with_file_id else []
+        if with_max_distance:
+            filter_parts.append(
+                "(embedding <=> CAST(:embedding_vec AS vector)) <= :max_distance"
+            )
+        where_clause = f"WHERE {' AND '.join(filter_parts)}" if filter_parts else ""
+
+        return text(
+            f"""
+            SELECT id, file_id, section_id, chunk_index, content,
+                   (embedding <=> CAST(:embedding_vec AS vector)) AS distance,
+                   page_number, section_type, file_name
+            FROM {TABLE_NAME}
+            {where_clause}
+            ORDER BY embedding <=> CAST(:embedding_vec AS vector)
+            LIMIT :k
+            """
+        )
+
+    @staticmethod
+    def _binary_rerank_sql(with_file_id: bool, with_max_distance: bool) -> TextClause:
+        """Top-N por Hamming en el índice binario y re-rank con coseno exacto."""
+        file_filter = "WHERE file_id = :fid" if with_file_id else ""
+        distance_filter = "WHERE distance <= :max_distance" if with_max_distance else ""
+
+        return text(
+            f"""
+            SELECT * FROM (
+                SELECT id, file_id, section_id, chunk_index, content,
+                       (embedding <=> CAST(:embedding_vec AS vector)) AS distance,
+                       page_number, section_type, file_name
+                FROM (
+                    SELECT * FROM {TABLE_NAME}
+                    {file_filter}
+                    ORDER BY binary_quantize(embedding)::bit({EMBEDDING_DIM})
+                             <~> binary_quantize(CAST(:embedding_vec AS vector))
+                    LIMIT :candidates
+                ) AS candidates
+            ) AS scored
+            {distance_filter}
+            ORDER BY distance
+            LIMIT :k
+            """
+        )
+
+    @staticmethod
+    def _configure_hnsw_scan(conn: Connection, limit: int) -> None:
+        """Ajusta el recorrido HNSW solo para la transacción actual (SET LOCAL).
+
+        Garantiza ef_search >= limit y, si pgvector lo soporta, activa el
+        iterative scan en orden estricto para que el filtro por file_id no
+        deje la consulta con menos resultados que un escaneo exacto.
+        """
+        conn.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef, true)"),
+            {"ef": str(max(HNSW_EF_SEARCH, limit))},
+        )
+        if _get_pgvector_version(conn) >= ITERATIVE_SCAN_MIN_VERSION:
+            conn.execute(
+                text("SELECT set_config('hnsw.iterative_scan', 'strict_order', true)")
+            )
+
+
+def _get_pgvector_version(conn: Connection) -> tuple[int, int]:
+    """Versión (major, minor) de la extensión vector, cacheada por proceso."""
+    global _pgvector_version
+    if _pgvector_version is None:
+        version = conn.execute(
+            text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        ).scalar()
+        major, minor = (int(part) for part in (version or "0.0").split(".")[:2])
+        _pgvector_version = (major, minor)
+    return _pgvector_version
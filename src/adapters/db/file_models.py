@@ -45,5 +45,7 @@ class FileSection(SQLModel, table=True):
     start_page: int
     end_page: int
     char_count: int = 0
+    # Texto extraído al seccionar: indexar no vuelve a parsear el PDF (None en filas antiguas)
+    text: str | None = None
 
     # Relación ORM omitida; se accede vía consultas por file_id.
@@ -7,7 +7,7 @@ import uuid
 from datetime import UTC, datetime
 
 from sqlmodel import Session as SQLSession
-from sqlmodel import select
+from sqlmodel import delete, select
 
 from src.adapters.db.database import engine as sqlite_engine
 from src.adapters.db.file_models import FileSection, FileUpload
@@ -74,8 +74,8 @@ class SQLFileRepository(FileRepositoryPort):
             ).all()
             return [
                 DomainSection(
-                    id=sec.id, file_id=str(sec.file_id), text="",
-                    page_number=sec.start_page, chunk_index=0
+                    id=sec.id, file_id=str(sec.file_id), text=sec.text or "",
+                    page_number=sec.start_page, chunk_index=0, char_count=sec.char_count or 0
                 )
                 for sec in db_sections
             ]
@@ -111,12 +111,9 @@ class SQLFileRepository(FileRepositoryPort):
             True si se eliminó correctamente, False si no existía
         """
         with SQLSession(sqlite_engine) as session:
-            # Eliminar secciones primero (FK constraint)
-            sections = session.exec(
-                select(FileSection).where(FileSection.file_id == file_id)
-            ).all()
-            for section in sections:
-                session.delete(section)
+            # Eliminar secciones primero (FK constraint): un solo DELETE, sin
+            # cargar las filas (con su texto) ni emitir un DELETE por sección
+            session.exec(delete(FileSection).where(FileSection.file_id == file_id))
 
             # Eliminar archivo
             db_file = session.get(FileUpload, file_id)
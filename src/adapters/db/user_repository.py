@@ -6,6 +6,7 @@ Implementa el puerto UserRepositoryPort usando SQLModel.
 
 from datetime import UTC, datetime
 
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from src.domain.models.user import User
@@ -27,6 +28,16 @@ class SQLModelUserRepository(UserRepositoryPort):
         self.session.refresh(user)
         return user
 
+    def create_if_absent(
+        self, email: str, hashed_password: str, full_name: str | None = None
+    ) -> User | None:
+        # El índice único de email resuelve el conflicto en un solo INSERT (sin TOCTOU)
+        try:
+            return self.create(email, hashed_password, full_name)
+        except IntegrityError:
+            self.session.rollback()
+            return None
+
     def get_by_id(self, user_id: int) -> User | None:
         return self.session.get(User, user_id)
 
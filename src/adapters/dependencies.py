@@ -45,6 +45,10 @@ from src.application.services.embeddings_service import EmbeddingsServiceV2
 from src.application.services.file_processing_service import FileProcessingService
 from src.application.services.guardian_service import GuardianService
 from src.application.services.metrics_service import MetricsService
+from src.application.services.rag.semantic_cache import (
+    SemanticCache,
+    SemanticRetrievalCache,
+)
 from src.domain.ports import (
     ChatRepositoryPort,
     EmbeddingsPort,
@@ -63,7 +67,14 @@ def get_http_client() -> httpx.Client:
 
 @cache
 def get_async_http_client() -> httpx.AsyncClient:
-    return httpx.AsyncClient()
+    # Turnos concurrentes de distintos usuarios comparten este cliente: con el
+    # keep-alive al tamaño del pool, cada llamada reutiliza una conexión caliente
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_http_max_connections,
+            max_keepalive_connections=settings.llm_http_max_keepalive,
+        )
+    )
 
 
 # --- Logging de routing ---
@@ -103,11 +114,13 @@ def get_gemini_embeddings_adapter() -> EmbeddingsPort:
     return GeminiEmbeddingsAdapter(client=get_async_http_client())
 
 
+@cache
 def get_python_search_tool() -> PythonSearchPort:
-    # BearPythonTool(api_key, base_url) según su firma
+    """Factory para la búsqueda Python (singleton: comparte pool HTTP y caché)."""
     return BearPythonTool(
         api_key=settings.bear_api_key,
         base_url=settings.bear_base_url,
+        cache_path=settings.bear_cache_path,
     )
 
 
@@ -118,6 +131,26 @@ def get_metrics_service() -> MetricsService:
     return MetricsService(repository=metrics_repository)
 
 
+@cache
+def get_semantic_retrieval_cache() -> SemanticRetrievalCache:
+    """Factory para el caché semántico de recuperaciones RAG (singleton)."""
+    return SemanticRetrievalCache(
+        threshold=settings.rag_semantic_cache_threshold,
+        ttl=settings.rag_semantic_cache_ttl,
+    )
+
+
+@cache
+def get_llm_response_cache() -> SemanticCache[str] | None:
+    """Factory para el caché semántico de respuestas del LLM (singleton, opcional)."""
+    if not settings.llm_response_cache_enabled:
+        return None
+    return SemanticCache(
+        threshold=settings.llm_response_cache_threshold,
+        ttl=settings.llm_response_cache_ttl,
+    )
+
+
 # --- Servicios de Aplicación ---
 def get_embeddings_service() -> EmbeddingsServiceV2:
     return EmbeddingsServiceV2(embeddings_client=get_gemini_embeddings_adapter())
@@ -126,9 +159,13 @@ def get_embeddings_service() -> EmbeddingsServiceV2:
 def get_file_processing_service(
     file_repo: FileRepositoryPort = Depends(get_file_repository),
     embeddings_service: EmbeddingsServiceV2 = Depends(get_embeddings_service),
+    semantic_cache: SemanticRetrievalCache = Depends(get_semantic_retrieval_cache),
 ) -> FileProcessingService:
     return FileProcessingService(
-        file_repo, embeddings_service, max_pdf_size_mb=settings.file_max_pdf_size_mb
+        file_repo,
+        embeddings_service,
+        max_pdf_size_mb=settings.file_max_pdf_size_mb,
+        semantic_cache=semantic_cache,
     )
 
 
@@ -140,6 +177,8 @@ def get_chat_service(
     python_search: PythonSearchPort = Depends(get_python_search_tool),
     metrics_service: MetricsService = Depends(get_metrics_service),
     file_repository: FileRepositoryPort = Depends(get_file_repository),
+    semantic_cache: SemanticRetrievalCache = Depends(get_semantic_retrieval_cache),
+    response_cache: SemanticCache[str] | None = Depends(get_llm_response_cache),
 ) -> ChatServiceV2:
     document_mapper = DocumentMapper(file_repository)
     return ChatServiceV2(
@@ -151,6 +190,8 @@ def get_chat_service(
         metrics_service=metrics_service,
         file_repository=file_repository,
         document_mapper=document_mapper,
+        semantic_cache=semantic_cache,
+        response_cache=response_cache,
     )
 
 
@@ -162,6 +203,7 @@ def get_chat_service_hibrido_mejorado(
     python_search: PythonSearchPort = Depends(get_python_search_tool),
     metrics_service: MetricsService = Depends(get_metrics_service),
     file_repository: FileRepositoryPort = Depends(get_file_repository),
+    semantic_cache: SemanticRetrievalCache = Depends(get_semantic_retrieval_cache),
 ) -> ChatServiceHibridoRefactorizado:
     """
     Factory para el servicio de chat HÍBRIDO MEJORADO.
@@ -181,6 +223,7 @@ def get_chat_service_hibrido_mejorado(
         file_repository=file_repository,
         document_mapper=document_mapper,
         embeddings_repo=embeddings_repo,
+        semantic_cache=semantic_cache,
     )
 
 
@@ -195,6 +238,8 @@ def get_chat_service_dependency(
     python_search: PythonSearchPort = Depends(get_python_search_tool),
     metrics_service: MetricsService = Depends(get_metrics_service),
     file_repository: FileRepositoryPort = Depends(get_file_repository),
+    semantic_cache: SemanticRetrievalCache = Depends(get_semantic_retrieval_cache),
+    response_cache: SemanticCache[str] | None = Depends(get_llm_response_cache),
 ) -> ChatServiceV2:
     document_mapper = DocumentMapper(file_repository)
     return ChatServiceV2(
@@ -206,6 +251,8 @@ def get_chat_service_dependency(
         metrics_service=metrics_service,
         file_repository=file_repository,
         document_mapper=document_mapper,
+        semantic_cache=semantic_cache,
+        response_cache=response_cache,
     )
 
 
@@ -217,6 +264,7 @@ def get_chat_service_hibrido_dependency(
     python_search: PythonSearchPort = Depends(get_python_search_tool),
     metrics_service: MetricsService = Depends(get_metrics_service),
     file_repository: FileRepositoryPort = Depends(get_file_repository),
+    semantic_cache: SemanticRetrievalCache = Depends(get_semantic_retrieval_cache),
 ) -> ChatServiceHibridoRefactorizado:
     """
     Dependencia para endpoints que usan el servicio HÍBRIDO MEJORADO.
@@ -235,6 +283,7 @@ def get_chat_service_hibrido_dependency(
         file_repository=file_repository,
         document_mapper=document_mapper,
         embeddings_repo=embeddings_repo,
+        semantic_cache=semantic_cache,
     )
 
 
@@ -245,10 +294,14 @@ def get_embeddings_service_dependency() -> EmbeddingsServiceV2:
 def get_file_processing_service_dependency(
     file_repo: FileRepositoryPort = Depends(get_file_repository),
     embeddings_service: EmbeddingsServiceV2 = Depends(get_embeddings_service),
+    semantic_cache: SemanticRetrievalCache = Depends(get_semantic_retrieval_cache),
 ) -> FileProcessingService:
     # Igual que con chat_service: no invocar directamente a una función con Depends.
     return FileProcessingService(
-        file_repo, embeddings_service, max_pdf_size_mb=settings.file_max_pdf_size_mb
+        file_repo,
+        embeddings_service,
+        max_pdf_size_mb=settings.file_max_pdf_size_mb,
+        semantic_cache=semantic_cache,
     )
 
 
@@ -300,6 +353,8 @@ def get_guardian_client() -> GuardianPort:
         api_key=settings.guardian_api_key,
         timeout=settings.guardian_timeout,
         enabled=settings.guardian_enabled,
+        batch_max_size=settings.guardian_batch_max_size,
+        batch_max_wait_ms=settings.guardian_batch_max_wait_ms,
     )
 
 
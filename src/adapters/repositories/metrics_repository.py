@@ -70,6 +70,12 @@ class SQLModelMetricsRepository(MetricsRepositoryPort):
             session.refresh(metric)
         return metric
 
+    def save_metrics_bulk(self, metrics: list[dict[str, Any]]) -> None:
+        """Guardar varias métricas en una sola transacción (INSERT por lotes)."""
+        with Session(engine) as session:
+            session.add_all(AgentMetrics(**fields) for fields in metrics)
+            session.commit()
+
     def create_and_save_error(
         self,
         error_type: str,
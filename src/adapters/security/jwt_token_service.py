@@ -3,6 +3,9 @@ Implementación del puerto TokenServicePort usando JWT.
 
 Adaptador que gestiona tokens de autenticación con JSON Web Tokens.
 """
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import UTC, datetime, timedelta
 
 from jose import JWTError, jwt
@@ -15,8 +18,14 @@ class JWTTokenService(TokenServicePort):
     Implementación de TokenServicePort usando JWT (JSON Web Tokens).
 
     Utiliza el algoritmo HS256 para firmar tokens de forma segura.
+    Los tokens ya verificados se cachean brevemente para no repetir la
+    verificación de firma en cada request autenticada.
     """
 
+    # TTL máximo del caché de verificación (acotado además por el exp del token)
+    VERIFY_CACHE_TTL = 60.0
+    VERIFY_CACHE_MAX_ENTRIES = 10_000
+
     def __init__(
         self,
         secret_key: str,
@@ -34,6 +43,8 @@ class JWTTokenService(TokenServicePort):
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.expire_minutes = expire_minutes
+        # Clave: blake2b del token (no se retienen tokens en claro en memoria)
+        self._verified: OrderedDict[bytes, tuple[dict[str, str], float]] = OrderedDict()
 
     def create_access_token(self, user_id: str, email: str) -> str:
         """
@@ -68,6 +79,15 @@ class JWTTokenService(TokenServicePort):
         Returns:
             Diccionario con user_id y email si es válido, None en caso contrario
         """
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        entry = self._verified.get(key)
+        if entry is not None:
+            claims, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._verified.move_to_end(key)
+                return claims
+            del self._verified[key]
+
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
             user_id: str = payload.get("sub")
@@ -76,9 +96,19 @@ class JWTTokenService(TokenServicePort):
             if user_id is None or email is None:
                 return None
 
-            return {
+            claims = {
                 "user_id": user_id,
                 "email": email
             }
         except JWTError:
             return None
+
+        # Nunca cachear más allá de la expiración del propio token
+        ttl = self.VERIFY_CACHE_TTL
+        if (exp := payload.get("exp")) is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            self._verified[key] = (claims, time.monotonic() + ttl)
+            if len(self._verified) > self.VERIFY_CACHE_MAX_ENTRIES:
+                self._verified.popitem(last=False)
+        return claims
@@ -14,7 +14,7 @@ import streamlit as st
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.chat_models import AgentMode, ChatRequest
-from services.backend_client import BackendClient
+from services.backend_client import BackendClient, ChatStreamError
 from services.session_service import SessionService
 
 
@@ -87,24 +87,37 @@ class ChatInterface:
             )
 
             with st.chat_message("assistant"):
-                with st.spinner("Pensando..."):
-                    response = self.backend.send_chat_message(request)
-
-                if response.success:
-                    st.markdown(response.content)
-                    st.session_state.messages.append(
-                        {
-                            "role": "assistant",
-                            "content": response.content,
-                        }
-                    )
-
+                if file_id is not None:
+                    # Con RAG no hay búsqueda web: la respuesta se muestra
+                    # mientras se genera en vez de esperar a que termine
                     try:
-                        self.session_service.load_session_messages(session_id)
-                    except Exception:
-                        pass
+                        content = st.write_stream(
+                            self.backend.stream_chat_message(request)
+                        )
+                    except ChatStreamError as e:
+                        st.error(f"Error: {e}")
+                        return
                 else:
-                    st.error(f"Error: {response.error}")
+                    with st.spinner("Pensando..."):
+                        response = self.backend.send_chat_message(request)
+
+                    if not response.success:
+                        st.error(f"Error: {response.error}")
+                        return
+                    content = response.content
+                    st.markdown(content)
+
+                st.session_state.messages.append(
+                    {
+                        "role": "assistant",
+                        "content": content,
+                    }
+                )
+
+                try:
+                    self.session_service.load_session_messages(session_id)
+                except Exception:
+                    pass
 
     def _generate_markdown_content(self) -> str:
         """Genera contenido Markdown del chat."""
@@ -4,6 +4,7 @@ Adaptador que encapsula todas las llamadas HTTP.
 """
 import os
 import sys
+from collections.abc import Iterator
 from typing import Any
 
 import httpx
@@ -20,6 +21,10 @@ from models.file_models import (
 )
 
 
+class ChatStreamError(Exception):
+    """Error al recibir una respuesta de chat en streaming."""
+
+
 class BackendClient:
     """Cliente para comunicación con el backend API."""
 
@@ -123,22 +128,45 @@ class BackendClient:
             st.error(f"Error eliminando sesión {session_id}: {e}")
             return False
 
+    @staticmethod
+    def _chat_payload(request: ChatRequest) -> dict[str, Any]:
+        """Cuerpo JSON común a /chat y /chat/stream."""
+        payload = {
+            "session_id": request.session_id,
+            "message": request.message,
+            "mode": request.mode.value
+        }
+        if request.file_id is not None:
+            payload["file_id"] = request.file_id
+        if request.selected_section_ids:
+            payload["selected_section_ids"] = request.selected_section_ids
+        return payload
+
+    @staticmethod
+    def _chat_error_message(e: httpx.HTTPStatusError) -> str:
+        """Mensaje user-friendly a partir del JSON de error del backend."""
+        error_msg = f"Error del servidor: {e.response.status_code}"
+        try:
+            error_data = e.response.json()
+            # Si el Guardian bloqueó el mensaje (403)
+            if e.response.status_code == 403 and error_data.get("error") == "message_blocked":
+                user_message = error_data.get("message", "Tu mensaje ha sido bloqueado por razones de seguridad.")
+                reason = error_data.get("reason", "")
+                error_msg = f"🛡️ {user_message}\n\n💡 **Motivo:** {reason}"
+            else:
+                # Otros errores del servidor
+                error_msg = error_data.get("detail", error_msg)
+        except Exception:
+            # Si no se puede parsear el JSON, usar mensaje genérico
+            pass
+        return error_msg
+
     def send_chat_message(self, request: ChatRequest) -> ChatResponse:
         """Envía un mensaje de chat al backend."""
         try:
-            payload = {
-                "session_id": request.session_id,
-                "message": request.message,
-                "mode": request.mode.value
-            }
-            if request.file_id is not None:
-                payload["file_id"] = request.file_id
-            if request.selected_section_ids:
-                payload["selected_section_ids"] = request.selected_section_ids
-
             response = httpx.post(
                 f"{self.base_url}/chat",
-                json=payload,
+                json=self._chat_payload(request),
                 timeout=120
             )
             response.raise_for_status()
@@ -155,26 +183,10 @@ class BackendClient:
                 error="Timeout: El agente tardó demasiado en responder"
             )
         except httpx.HTTPStatusError as e:
-            # Intentar extraer mensaje user-friendly del JSON de error
-            error_msg = f"Error del servidor: {e.response.status_code}"
-            try:
-                error_data = e.response.json()
-                # Si el Guardian bloqueó el mensaje (403)
-                if e.response.status_code == 403 and error_data.get("error") == "message_blocked":
-                    user_message = error_data.get("message", "Tu mensaje ha sido bloqueado por razones de seguridad.")
-                    reason = error_data.get("reason", "")
-                    error_msg = f"🛡️ {user_message}\n\n💡 **Motivo:** {reason}"
-                else:
-                    # Otros errores del servidor
-                    error_msg = error_data.get("detail", error_msg)
-            except Exception:
-                # Si no se puede parsear el JSON, usar mensaje genérico
-                pass
-
             return ChatResponse(
                 content="",
                 success=False,
-                error=error_msg
+                error=self._chat_error_message(e)
             )
         except Exception:
             return ChatResponse(
@@ -182,6 +194,34 @@ class BackendClient:
                 success=False,
             )
 
+    def stream_chat_message(self, request: ChatRequest) -> Iterator[str]:
+        """
+        Envía un mensaje de chat y emite la respuesta a medida que se genera.
+
+        Usa /chat/stream: el primer fragmento llega tras el primer token en vez
+        de tras la generación completa.
+
+        Raises:
+            ChatStreamError: Si el backend rechaza el mensaje o no responde
+        """
+        try:
+            with httpx.stream(
+                "POST",
+                f"{self.base_url}/chat/stream",
+                json=self._chat_payload(request),
+                timeout=httpx.Timeout(120, read=120),
+            ) as response:
+                if response.is_error:
+                    response.read()  # El cuerpo de error se necesita completo
+                    response.raise_for_status()
+                yield from response.iter_text()
+        except httpx.TimeoutException:
+            raise ChatStreamError("Timeout: El agente tardó demasiado en responder") from None
+        except httpx.HTTPStatusError as e:
+            raise ChatStreamError(self._chat_error_message(e)) from None
+        except httpx.HTTPError as e:
+            raise ChatStreamError(f"Error de conexión: {e}") from None
+
     # === Gestión de Archivos ===
 
     def list_files(self, limit: int = 30) -> list[FileUploadInfo]:
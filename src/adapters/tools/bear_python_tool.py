@@ -1,13 +1,30 @@
 """Implementación de búsqueda Python con Bear API y filtros estrictos."""
-import hashlib
+import asyncio
+import heapq
+import json
+import logging
 import re
+import sqlite3
+import threading
 import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict
 from typing import Any
 
 import httpx
 
+try:
+    # Parser en C, más rápido para respuestas grandes
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+from src.adapters.config.settings import settings
 from src.domain.ports.python_search_port import PythonSearchPort, PythonSource
 
+logger = logging.getLogger(__name__)
+
 PYTHON_DOMAINS = {
     "github.com",
     "docs.python.org",
@@ -30,15 +47,157 @@ PYTHON_DOMAINS = {
     "uv.astral.sh",    # UV documentación
 }
 
+# (source_type, reliability) para dominios conocidos: una sola búsqueda en dict.
+# Los dominios que no estén aquí caen en los checks por substring.
+_DOMAIN_META: dict[str, tuple[str, int]] = {
+    **dict.fromkeys(PYTHON_DOMAINS, ("blog", 6)),
+    "github.com": ("github", 9),
+    "docs.python.org": ("official_docs", 10),
+    "peps.python.org": ("peps", 10),
+    "docs.pydantic.dev": ("official_docs", 6),
+    "stackoverflow.com": ("qa", 8),
+    "realpython.com": ("blog", 7),
+    "medium.com": ("blog", 7),
+}
+
+# Limpieza de queries: prefijos del modelo, frases meta y keywords automáticas
+# fusionados en una sola alternancia (una pasada en vez de tres).
+_RE_CLEAN = re.compile(
+    r"^(?:kimi-k2[:\?]\s*|kimi[:\?]\s*)"
+    r"|\b(?:puedes buscar|busca información sobre|busca sobre|buscar información|buscar sobre|información sobre)\b\s*"
+    r"|\b(?:best practices pep-8 guide|pep-8 guide|best practices guide)\b",
+    re.IGNORECASE,
+)
+# "esto"/"eso" y signos de interrogación que quedan en los bordes tras la limpieza
+_RE_EDGES = re.compile(r"^(?:(?:esto|eso)\s+)?[¿?]*|[¿?]+$", re.IGNORECASE)
+_RE_SPACES = re.compile(r"\s+")
+
+# Acentos y signos del español -> ASCII en una sola pasada (str.translate)
+_ACCENT_TABLE = str.maketrans({
+    "á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n",
+    "Á": "A", "É": "E", "Í": "I", "Ó": "O", "Ú": "U", "Ü": "U", "Ñ": "N",
+    "¿": "", "¡": "",
+})
+
+# Keywords para detectar contenido Python y consultas generales (no Python)
+PYTHON_KEYWORDS = frozenset({
+    "python",
+    "def ",
+    "import ",
+    "class ",
+    "pip ",
+    "pytest",
+    "fastapi",
+    "pydantic",
+    "typing",
+    "async def",
+    "pep ",
+    "traceback",
+    "error",
+    "exception",
+    "raise ",
+    "python3",
+    "pip3",
+    "venv",
+    "virtualenv",
+    "requirements.txt",
+    "pyproject.toml",
+    "poetry",
+    "conda",
+    "jupyter",
+    "numpy",
+    "pandas",
+    "matplotlib",
+    "scipy",
+    "sklearn",
+    "tensorflow",
+    "torch",
+    "django",
+    "flask",
+    "sqlalchemy",
+    "asyncio",
+    "threading",
+    "multiprocessing",
+})
+
+GENERAL_KEYWORDS = frozenset({
+    "clima",
+    "temperatura",
+    "weather",
+    "montevideo",
+    "uruguay",
+    "buenos aires",
+    "argentina",
+    "hora",
+    "time now",
+    "fecha",
+    "dollar",
+    "peso",
+    "cambio",
+    "dólar",
+    "euro",
+    "real",
+    "bitcoin",
+    "cripto",
+    "noticias",
+    "news",
+    "deportes",
+    "fútbol",
+    "política",
+    "economía",
+    "recetas",
+    "cocina",
+    "moda",
+    "belleza",
+    "viajes",
+    "turismo",
+})
+
+
+def _keyword_pattern(keywords: frozenset[str]) -> re.Pattern[str]:
+    """Compila las keywords en una única alternancia (las más largas primero)."""
+    return re.compile("|".join(map(re.escape, sorted(keywords, key=len, reverse=True))))
+
+
+# Clave del caché de búsquedas: (search_type, query)
+CacheKey = tuple[str, str]
+
+_PY_KW_RE = _keyword_pattern(PYTHON_KEYWORDS)
+_GENERAL_KW_RE = _keyword_pattern(GENERAL_KEYWORDS)
+
+
+def _extract_domain(url: str) -> str:
+    """Extrae el host de la URL con dos find() en vez de partir toda la URL."""
+    start = url.find("//")
+    if start == -1:
+        return ""
+    start += 2
+    end = url.find("/", start)
+    return url[start:end] if end != -1 else url[start:]
+
 
 class BearPythonTool(PythonSearchPort):
     """Herramienta de búsqueda Python con filtros inteligentes y caché."""
 
-    def __init__(self, api_key: str, base_url: str = "https://api.search.brave.com/res/v1/web/search"):
+    CACHE_MAX_ENTRIES = 1024  # Límite LRU para acotar memoria en procesos largos
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.search.brave.com/res/v1/web/search",
+        cache_path: str | None = None,
+    ):
         self.api_key = api_key
         self.base_url = base_url
+        # Cliente de larga vida: las búsquedas concurrentes reutilizan conexiones
+        # keep-alive. pool=None: no limitar la espera por una conexión del pool.
         self.client = httpx.AsyncClient(
-            timeout=30,
+            timeout=httpx.Timeout(30.0, connect=5.0, pool=None),
+            limits=httpx.Limits(
+                max_keepalive_connections=20,
+                max_connections=100,
+                keepalive_expiry=30.0,
+            ),
             headers={
                 "Accept": "application/json",
                 "X-Subscription-Token": api_key
@@ -46,41 +205,119 @@ class BearPythonTool(PythonSearchPort):
         )
 
         # Configuración de caché
-        from src.adapters.config.settings import settings
         self.cache_ttl = settings.bear_cache_ttl or 3600  # 1 hora por defecto
         self.cache_enabled = settings.bear_search_enabled or True
-        self._cache: dict[str, dict[str, Any]] = {}
-
-    def _get_cache_key(self, query: str, search_type: str) -> str:
-        """Genera una clave única para el caché."""
-        content = f"{search_type}:{query}"
-        return hashlib.md5(content.encode()).hexdigest()
+        self._cache: OrderedDict[CacheKey, dict[str, Any]] = OrderedDict()
+        self._inflight: dict[CacheKey, asyncio.Task[list[PythonSource]]] = {}
+
+        # Caché persistente opcional (SQLite) para sobrevivir reinicios del proceso.
+        # Una sola conexión, usada desde hilos de asyncio.to_thread: el lock
+        # serializa las consultas. El OrderedDict en memoria solo se toca en el loop.
+        self.cache_path = cache_path
+        self._disk: sqlite3.Connection | None = None
+        self._disk_lock = threading.Lock()
+        if self.cache_path:
+            self._init_disk_cache()
+
+    def _get_cache_key(self, query: str, search_type: str) -> CacheKey:
+        """Genera la clave del caché: la tupla se hashea en C sin copiar la query."""
+        return (search_type, query)
 
     def _is_cache_valid(self, timestamp: float) -> bool:
         """Verifica si el caché sigue válido."""
         return time.time() - timestamp < self.cache_ttl
 
-    def _get_from_cache(self, key: str) -> list[PythonSource] | None:
+    def _init_disk_cache(self) -> None:
+        """Abre la conexión SQLite del caché persistente y crea su tabla."""
+        conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bear_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+        self._disk = conn
+
+    def _get_from_disk(self, key: CacheKey) -> tuple[list[PythonSource], float] | None:
+        """Obtiene resultados y timestamp del caché persistente (bloqueante)."""
+        with self._disk_lock:
+            if self._disk is None:  # Cerrado por aclose()
+                return None
+            row = self._disk.execute(
+                "SELECT data, created_at FROM bear_cache WHERE cache_key = ?",
+                ("\0".join(key),),
+            ).fetchone()
+        if row is None:
+            return None
+        return [PythonSource(**item) for item in _json_loads(row[0])], row[1]
+
+    def _save_to_disk(self, key: CacheKey, data: list[PythonSource], timestamp: float) -> None:
+        """Guarda resultados en el caché persistente (bloqueante)."""
+        payload = json.dumps([asdict(source) for source in data])
+        with self._disk_lock:
+            if self._disk is None:
+                return
+            with self._disk:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO bear_cache (cache_key, data, created_at) VALUES (?, ?, ?)",
+                    ("\0".join(key), payload, timestamp),
+                )
+
+    def _clear_disk(self) -> None:
+        """Vacía el caché persistente (bloqueante)."""
+        with self._disk_lock:
+            if self._disk is None:
+                return
+            with self._disk:
+                self._disk.execute("DELETE FROM bear_cache")
+
+    def _store_in_memory(self, key: CacheKey, data: list[PythonSource], timestamp: float) -> None:
+        """Guarda en el caché LRU en memoria, evictando la entrada menos usada."""
+        self._cache[key] = {
+            'data': data,
+            'timestamp': timestamp
+        }
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)  # Evicta la menos usada
+
+    async def _get_from_cache(self, key: CacheKey) -> list[PythonSource] | None:
         """Obtiene resultados del caché si están disponibles y válidos."""
         if not self.cache_enabled:
             return None
 
         cached = self._cache.get(key)
-        if cached and self._is_cache_valid(cached['timestamp']):
-            print(f"🎯 Bear API: Caché hit para {key}")
-            return cached['data']
-        return None
+        if cached is None:
+            if not self.cache_path:
+                return None
+            # Solo la lectura de SQLite va a un hilo; el LRU se actualiza en el loop
+            stored = await asyncio.to_thread(self._get_from_disk, key)
+            if stored is None or not self._is_cache_valid(stored[1]):
+                return None
+            # Hidratar la memoria con la entrada persistida (conserva su timestamp)
+            self._store_in_memory(key, *stored)
+            logger.debug("🎯 Bear API: Caché hit (disco) para %r", key)
+            return stored[0]
+        if not self._is_cache_valid(cached['timestamp']):
+            self._cache.pop(key, None)  # Expirada: liberar la entrada
+            return None
 
-    def _set_cache(self, key: str, data: list[PythonSource]) -> None:
+        self._cache.move_to_end(key)
+        logger.debug("🎯 Bear API: Caché hit para %r", key)  # formateo diferido (hot path)
+        return cached['data']
+
+    async def _set_cache(self, key: CacheKey, data: list[PythonSource]) -> None:
         """Almacena resultados en caché."""
         if not self.cache_enabled:
             return
 
-        self._cache[key] = {
-            'data': data,
-            'timestamp': time.time()
-        }
-        print(f"🎯 Bear API: Caché set para {key}")
+        timestamp = time.time()
+        self._store_in_memory(key, data, timestamp)
+        if self.cache_path:
+            await asyncio.to_thread(self._save_to_disk, key, data, timestamp)
+        logger.debug("🎯 Bear API: Caché set para %r", key)
 
     # ---------- helpers ----------
     def _clean_query(self, raw_query: str) -> str:
@@ -95,131 +332,45 @@ class BearPythonTool(PythonSearchPort):
         - Espacios extras
         - Normaliza caracteres especiales para compatibilidad con API
         """
-        import unicodedata
-
         cleaned = raw_query
 
-        # 1. Eliminar prefijos del modelo
-        cleaned = re.sub(r"^(kimi-k2[:\?]\s*|kimi[:\?]\s*)", "", cleaned, flags=re.IGNORECASE)
-
-        # 2. Eliminar frases meta que no aportan a la búsqueda
-        cleaned = re.sub(
-            r"\b(puedes buscar|busca información sobre|busca sobre|buscar información|buscar sobre|información sobre)\b\s*",
-            "",
-            cleaned,
-            flags=re.IGNORECASE
-        )
-
-        # 3. Eliminar keywords agregadas automáticamente
-        cleaned = re.sub(
-            r"\b(best practices pep-8 guide|pep-8 guide|best practices guide)\b",
-            "",
-            cleaned,
-            flags=re.IGNORECASE
-        )
-
-        # 4. Eliminar "esto" o "eso" al inicio (quedan después de limpiar frases meta)
-        cleaned = re.sub(r"^(esto|eso)\s+", "", cleaned, flags=re.IGNORECASE)
+        # 1-3. Prefijos del modelo, frases meta y keywords automáticas (una pasada)
+        cleaned = _RE_CLEAN.sub("", cleaned)
 
-        # 5. Eliminar signos de interrogación iniciales/finales redundantes
-        cleaned = re.sub(r"^[¿?]+|[¿?]+$", "", cleaned)
+        # 4-5. "esto"/"eso" al inicio y signos de interrogación redundantes
+        cleaned = _RE_EDGES.sub("", cleaned)
 
         # 6. Normalizar caracteres especiales (acentos, ñ, etc.) para compatibilidad con API
         # Convertir "Qué" -> "Que", "características" -> "caracteristicas"
-        cleaned = unicodedata.normalize('NFKD', cleaned)
-        cleaned = cleaned.encode('ASCII', 'ignore').decode('ASCII')
+        cleaned = cleaned.translate(_ACCENT_TABLE)
+        if not cleaned.isascii():
+            # Fallback para caracteres fuera de la tabla (otros diacríticos, símbolos)
+            cleaned = unicodedata.normalize('NFKD', cleaned)
+            cleaned = cleaned.encode('ASCII', 'ignore').decode('ASCII')
 
         # 7. Limpiar espacios múltiples
-        cleaned = re.sub(r"\s+", " ", cleaned).strip()
+        cleaned = _RE_SPACES.sub(" ", cleaned).strip()
 
         return cleaned if cleaned else raw_query  # Fallback si queda vacío
 
     def _is_python_related(self, text: str) -> bool:
         """Detecta si el contenido es sobre Python."""
-        python_kw = {
-            "python",
-            "def ",
-            "import ",
-            "class ",
-            "pip ",
-            "pytest",
-            "fastapi",
-            "pydantic",
-            "typing",
-            "async def",
-            "pep ",
-            "traceback",
-            "error",
-            "exception",
-            "raise ",
-            "python3",
-            "pip3",
-            "venv",
-            "virtualenv",
-            "requirements.txt",
-            "pyproject.toml",
-            "poetry",
-            "conda",
-            "jupyter",
-            "numpy",
-            "pandas",
-            "matplotlib",
-            "scipy",
-            "sklearn",
-            "tensorflow",
-            "torch",
-            "django",
-            "flask",
-            "sqlalchemy",
-            "asyncio",
-            "threading",
-            "multiprocessing",
-        }
-        return any(kw in text.lower() for kw in python_kw)
+        # Las keywords ya están en minúsculas: evitar la copia si el texto también
+        lowered = text if text.islower() else text.lower()
+        return _PY_KW_RE.search(lowered) is not None
 
     def _is_general_query(self, query: str) -> bool:
         """Evita consultas generales no relacionadas con Python."""
-        general_kw = {
-            "clima",
-            "temperatura",
-            "weather",
-            "montevideo",
-            "uruguay",
-            "buenos aires",
-            "argentina",
-            "hora",
-            "time now",
-            "fecha",
-            "dollar",
-            "peso",
-            "cambio",
-            "dólar",
-            "euro",
-            "real",
-            "bitcoin",
-            "cripto",
-            "noticias",
-            "news",
-            "deportes",
-            "fútbol",
-            "política",
-            "economía",
-            "recetas",
-            "cocina",
-            "moda",
-            "belleza",
-            "viajes",
-            "turismo",
-        }
-        return any(kw in query.lower() for kw in general_kw)
+        lowered = query if query.islower() else query.lower()
+        return _GENERAL_KW_RE.search(lowered) is not None
 
     def _filter_sources(self, raw_results: list[dict]) -> list[PythonSource]:
         """Aplica whitelist y score de confiabilidad (modo relajado)."""
         filtered = []
         for result in raw_results:
             url = result.get("url", "")
-            snippet = result.get("snippet", "")
-            domain = url.split("/")[2] if "/" in url else ""
+            snippet = result.get("snippet") or result.get("description", "")
+            domain = _extract_domain(url)
 
             # Filtrar por dominio (si está en whitelist, priorizar)
             in_whitelist = domain in PYTHON_DOMAINS
@@ -247,12 +398,14 @@ class BearPythonTool(PythonSearchPort):
                 )
             )
 
-        # Ordenar por confiabilidad y retornar top 5
-        filtered.sort(key=lambda x: x.reliability, reverse=True)
-        return filtered[:5]
+        # Top 5 por confiabilidad (selección parcial, sin ordenar toda la lista)
+        return heapq.nlargest(5, filtered, key=lambda x: x.reliability)
 
     def _calculate_reliability(self, domain: str, url: str) -> int:
         """Calcula score de confiabilidad basado en dominio y URL."""
+        meta = _DOMAIN_META.get(domain)
+        if meta is not None:
+            return meta[1]
         if "github.com" in domain:
             return 9
         elif any(doc in domain for doc in ["docs.python.org", "peps.python.org"]):
@@ -266,6 +419,9 @@ class BearPythonTool(PythonSearchPort):
 
     def _classify_source(self, domain: str) -> str:
         """Clasifica el tipo de fuente."""
+        meta = _DOMAIN_META.get(domain)
+        if meta is not None:
+            return meta[0]
         if "github.com" in domain:
             return "github"
         if any(doc in domain for doc in ["docs.python.org", "docs.pydantic.dev"]):
@@ -295,9 +451,8 @@ class BearPythonTool(PythonSearchPort):
         # Limpiar la query antes de agregar keywords
         clean_topic = self._clean_query(topic)
 
-        # Log para debugging
         if clean_topic != topic:
-            print(f"🧹 Query limpiada: '{topic}' → '{clean_topic}'")
+            logger.debug("🧹 Query limpiada: %r → %r", topic, clean_topic)
 
         # Solo agregar keywords si la query es corta (< 50 chars)
         if len(clean_topic) < 50:
@@ -311,54 +466,62 @@ class BearPythonTool(PythonSearchPort):
     async def _execute_search(self, query: str, num_results: int, search_type: str) -> list[PythonSource]:
         """Ejecuta la búsqueda con Brave API y la filtra."""
         cache_key = self._get_cache_key(query, search_type)
-        cached = self._get_from_cache(cache_key)
+        cached = await self._get_from_cache(cache_key)
         if cached is not None:
             return cached
 
+        # Coalescing: búsquedas idénticas concurrentes comparten una sola llamada HTTP
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._search_brave(query, num_results, cache_key))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        # shield: cancelar a un llamador no cancela la búsqueda de los demás
+        return await asyncio.shield(task)
+
+    async def _search_brave(self, query: str, num_results: int, cache_key: CacheKey) -> list[PythonSource]:
+        """Llama a Brave API, filtra y cachea; usa el fallback ante errores."""
         params = {
             "q": query,
             "count": num_results * 2,  # Brave usa 'count' en lugar de 'limit'
         }
 
         try:
-            print(f"🔍 Brave Search API: Búsqueda para '{query}'")
-            response = await self.client.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            logger.info("🔍 Brave Search API: Búsqueda para %r", query)
+            async with self.client.stream("GET", self.base_url, params=params) as response:
+                # Chequear el status antes de leer: los errores se cierran sin bajar el body
+                response.raise_for_status()
+                body = await response.aread()
+            data = _json_loads(body)
 
             # Brave devuelve resultados en data['web']['results']
             raw_results = data.get("web", {}).get("results", [])
 
-            # Adaptar formato de Brave a nuestro formato
-            adapted_results = []
-            for result in raw_results:
-                adapted_results.append({
-                    "url": result.get("url", ""),
-                    "title": result.get("title", ""),
-                    "snippet": result.get("description", ""),
-                })
+            # _filter_sources lee el formato de Brave directamente ("description")
+            filtered_results = self._filter_sources(raw_results)
 
-            filtered_results = self._filter_sources(adapted_results)
-
-            self._set_cache(cache_key, filtered_results)
-            print(f"✅ Brave Search: {len(filtered_results)} resultados filtrados")
+            await self._set_cache(cache_key, filtered_results)
+            logger.info("✅ Brave Search: %d resultados filtrados", len(filtered_results))
             return filtered_results
 
         except Exception as e:
-            print(f"⚠️ Brave Search API Error: {e}")
+            logger.warning("⚠️ Brave Search API Error: %s", e)
             return await self._fallback_search(query, num_results)
 
-    def clear_cache(self) -> None:
+    async def clear_cache(self) -> None:
         """Limpia el caché manualmente."""
         self._cache.clear()
-        print("🎯 Bear API: Caché limpiado")
+        if self.cache_path:
+            await asyncio.to_thread(self._clear_disk)
+        logger.info("🎯 Bear API: Caché limpiado")
 
     async def _fallback_search(self, query: str, num_results: int) -> list[PythonSource]:
         """Búsqueda de fechas y versiones actuales usando web scraping."""
-        print(f"🔍 Web Scraping: Búsqueda actual para '{query}'")
+        logger.info("🔍 Web Scraping: Búsqueda actual para %r", query)
 
         # Búsqueda específica de fechas actuales
-        if "última versión" in query.lower() or "fecha actual" in query.lower():
+        lowered = query.lower()
+        if "última versión" in lowered or "fecha actual" in lowered:
             # Resultados actualizados manualmente
             current_results = [
                 PythonSource(
@@ -403,13 +566,22 @@ class BearPythonTool(PythonSearchPort):
         return {
             'total_entries': len(self._cache),
             'valid_entries': valid_entries,
-            'expired_entries': len(self._cache) - valid_entries
+            'expired_entries': len(self._cache) - valid_entries,
+            'max_entries': self.CACHE_MAX_ENTRIES,
         }
 
+    async def aclose(self) -> None:
+        """Cierra el cliente HTTP compartido y la conexión del caché persistente."""
+        await self.client.aclose()
+        with self._disk_lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
     async def __aenter__(self):
         """Context manager para cleanup."""
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Cleanup de recursos."""
-        await self.client.aclose()
+        await self.aclose()
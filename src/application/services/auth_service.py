@@ -4,13 +4,18 @@ Servicio de aplicación para autenticación.
 Orquesta los puertos de seguridad siguiendo arquitectura hexagonal.
 """
 
-from src.domain.models.user import User
+import asyncio
+import logging
+
+from src.domain.models.user import AuthResponseDTO, AuthUserDTO, User
 from src.domain.ports.auth_port import (
     PasswordHasherPort,
     TokenServicePort,
     UserRepositoryPort,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class AuthService:
     """
@@ -20,6 +25,9 @@ class AuthService:
     para implementar los casos de uso de registro y login.
     """
 
+    # Hash de referencia para igualar el tiempo de login con emails inexistentes
+    _dummy_hash: str | None = None
+
     def __init__(
         self,
         password_hasher: PasswordHasherPort,
@@ -30,9 +38,9 @@ class AuthService:
         self.token_service = token_service
         self.user_repository = user_repository
 
-    def register_user(
+    async def register_user(
         self, email: str, password: str, full_name: str | None = None
-    ) -> dict:
+    ) -> AuthResponseDTO:
         """
         Registra un nuevo usuario en el sistema.
 
@@ -42,40 +50,36 @@ class AuthService:
             full_name: Nombre completo (opcional)
 
         Returns:
-            Diccionario con usuario creado y token de acceso
+            Usuario creado y token de acceso
 
         Raises:
-            ValueError: Si el email ya existe o la contraseña es débil
+            ValueError: Si el email es inválido o ya existe, o la contraseña es débil
         """
-        if self.user_repository.exists_by_email(email):
-            raise ValueError("El email ya está registrado")
+        # Validaciones baratas antes de cualquier hashing o acceso a BD
+        if not email or "@" not in email:
+            raise ValueError("El email no es válido")
 
         if len(password) < 8:
             raise ValueError("La contraseña debe tener al menos 8 caracteres")
 
-        hashed_password = self.password_hasher.hash_password(password)
+        # El hashing es CPU-bound: se ejecuta en un hilo para no bloquear el event loop
+        hashed_password = await asyncio.to_thread(
+            self.password_hasher.hash_password, password
+        )
 
-        user = self.user_repository.create(
+        user = self.user_repository.create_if_absent(
             email=email, hashed_password=hashed_password, full_name=full_name
         )
+        if user is None:
+            raise ValueError("El email ya está registrado")
 
         token = self.token_service.create_access_token(
             user_id=str(user.id), email=user.email
         )
 
-        return {
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-            },
-            "access_token": token,
-            "token_type": "bearer",
-        }
-
-    def login_user(self, email: str, password: str) -> dict:
+        return AuthResponseDTO(user=AuthUserDTO.from_user(user), access_token=token)
+
+    async def login_user(self, email: str, password: str) -> AuthResponseDTO:
         """
         Autentica un usuario y genera un token de acceso.
 
@@ -84,41 +88,55 @@ class AuthService:
             password: Contraseña en texto plano
 
         Returns:
-            Diccionario con usuario y token de acceso
+            Usuario y token de acceso
 
         Raises:
             ValueError: Si las credenciales son inválidas
         """
         user = self.user_repository.get_by_email(email)
         if not user:
+            # Verificación ficticia: el tiempo de respuesta no revela si el email existe
+            await asyncio.to_thread(self._verify_dummy, password)
             raise ValueError("Credenciales inválidas")
 
-        if not self.password_hasher.verify_password(password, user.hashed_password):
+        if not await asyncio.to_thread(
+            self.password_hasher.verify_password, password, user.hashed_password
+        ):
             raise ValueError("Credenciales inválidas")
 
         if not user.is_active:
             raise ValueError("Usuario inactivo")
 
         if self.password_hasher.needs_rehash(user.hashed_password):
-            new_hash = self.password_hasher.hash_password(password)
-            user.hashed_password = new_hash
-            self.user_repository.update(user)
+            # Se espera dentro del request: el repositorio usa la sesión de BD
+            # del request, que se cierra al enviar la respuesta
+            await self._rehash(user, password)
 
         token = self.token_service.create_access_token(
             user_id=str(user.id), email=user.email
         )
 
-        return {
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "is_active": user.is_active,
-                "is_superuser": user.is_superuser,
-            },
-            "access_token": token,
-            "token_type": "bearer",
-        }
+        return AuthResponseDTO(user=AuthUserDTO.from_user(user), access_token=token)
+
+    def _verify_dummy(self, password: str) -> None:
+        """Verifica contra el hash de referencia (se llama desde un hilo)."""
+        # Calcularlo aquí, y no en el llamador, deja también el primer hash
+        # fuera del event loop
+        if AuthService._dummy_hash is None:
+            AuthService._dummy_hash = self.password_hasher.hash_password(
+                "dummy-for-timing"
+            )
+        self.password_hasher.verify_password(password, AuthService._dummy_hash)
+
+    async def _rehash(self, user: User, password: str) -> None:
+        """Regenera el hash con los parámetros actuales y lo persiste."""
+        try:
+            user.hashed_password = await asyncio.to_thread(
+                self.password_hasher.hash_password, password
+            )
+            self.user_repository.update(user)
+        except Exception as e:
+            logger.warning(f"No se pudo regenerar el hash del usuario {user.id}: {e}")
 
     def verify_token(self, token: str) -> dict[str, str] | None:
         """Verifica un token de acceso."""
@@ -9,26 +9,349 @@ Tipado estricto para mypy --strict con Python 3.12+
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
 import re
 import time
-import traceback
+from bisect import bisect_left
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
+from functools import lru_cache
+from itertools import accumulate
 from typing import TYPE_CHECKING, Any
 
 from src.application.services.metrics_service import MetricsService
+from src.application.services.rag.context_cache import (
+    get_cached_rag_context,
+    rag_context_key,
+    store_rag_context,
+)
+from src.application.services.rag.mmr import rerank_mmr
 from src.application.services.rag_context_service import RagContextService
-from src.domain.models import ChatMessageCreate, ChatSessionCreate, MessageRole
+from src.domain.models import (
+    ChatMessage,
+    ChatMessageCreate,
+    ChatSessionCreate,
+    MessageRole,
+)
+from src.domain.ports.llm_port import ToolSpec
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Callable, Coroutine
+
     from src.application.services.embeddings_service_v2 import EmbeddingsServiceV2
-    from src.domain.models import ChatMessage, ChatSession
+    from src.application.services.rag.semantic_cache import (
+        SemanticCache,
+        SemanticRetrievalCache,
+    )
+    from src.domain.models import ChatSession
     from src.domain.ports import ChatRepositoryPort, FileRepositoryPort, LLMPort
     from src.domain.ports.python_search_port import PythonSearchPort, PythonSource
 
 
 logger = logging.getLogger(__name__)
 
+# Señales de incertidumbre de Kimi fusionadas en una sola alternación:
+# un único escaneo del texto en vez de uno por patrón. Las frases que ya
+# cubre un prefijo más corto ("no tengo acceso", "no puedo navegar", ...)
+# no se listan aparte: no cambian el resultado y alargan la alternación.
+_UNCERTAINTY_PATTERNS = (
+    r"\bno (?:tengo|puedo|dispongo|encuentro|cuento con)\b",
+    r"\bno disponible\b",
+    r"\b(?:desconozco|ignoro|no estoy seguro)\b",
+    r"\bpodrías (?:consultar|buscar)\b",
+    r"\berror.*desconocido\b",
+    r"\bcomo modelo de lenguaje\b",
+)
+# Frases con las que Kimi anuncia explícitamente que hace falta buscar
+_SEARCH_INTENT_PATTERN = (
+    r"voy a buscar información actualizada sobre esto|voy a buscarlo en internet"
+)
+_SEARCH_INTENT_RE = re.compile(_SEARCH_INTENT_PATTERN, re.IGNORECASE)
+# Intención explícita o incertidumbre: un solo escaneo de la respuesta
+_RESPONSE_SIGNAL_RE = re.compile(
+    "|".join(rf"(?:{p})" for p in (_SEARCH_INTENT_PATTERN, *_UNCERTAINTY_PATTERNS)),
+    re.IGNORECASE,
+)
+_TRACEBACK_RE = re.compile(r"Traceback|Error|Exception", re.IGNORECASE)
+_GENERAL_QUERY_RE = re.compile(
+    r"\b(clima|temperatura|hora|dólar|euro|noticias|recetas)\b", re.IGNORECASE
+)
+
+# Enrutado de _search_python_sources: se prueban en orden (traceback > API >
+# versión). El segundo patrón extrae módulo/atributo cuando aplica la rama API.
+_API_USAGE_RE = re.compile(
+    r"\b(cómo usar|ejemplo|funciona)\b.*\w+\.\w+", re.IGNORECASE
+)
+_API_NAME_RE = re.compile(r"(\w+)\.(\w+)")
+_VERSION_QUERY_RE = re.compile(
+    r"\b(nueva versión|última versión|actualización|lanzamiento|release)\b.*\bpython\b",
+    re.IGNORECASE,
+)
+
+# Palabras clave de preguntas complejas (búsqueda RAG adaptativa).
+# Se construyen una sola vez al importar, no en cada llamada a handle_message.
+_COMPLEX_KEYWORDS = frozenset((
+    # Análisis y comparación
+    "compara",
+    "diferencia",
+    "diferencias",
+    "relación",
+    "relaciona",
+    "contrasta",
+    "versus",
+    "vs",
+    "frente a",
+    "comparación",
+    # Explicación profunda
+    "explica detalladamente",
+    "explica en detalle",
+    "profundiza",
+    "desarrolla",
+    "elabora",
+    "detalla",
+    "describe en profundidad",
+    "extiende",
+    "amplía",
+    "expande",
+    # Análisis técnico
+    "analiza",
+    "evalúa",
+    "examina",
+    "investiga",
+    "estudia",
+    "revisa",
+    "inspecciona",
+    "diagnostica",
+    # Enumeración y listado
+    "enumera",
+    "lista",
+    "identifica",
+    "menciona todos",
+    "cuáles son",
+    "qué tipos",
+    "qué clases",
+    # Síntesis y conexión
+    "sintetiza",
+    "resume extensamente",
+    "conecta",
+    "vincula",
+    "integra",
+    "unifica",
+    "combina",
+    # Ejemplos y casos
+    "ejemplos",
+    "ejemplo práctico",
+    "casos de uso",
+    "casos prácticos",
+    "demuestra",
+    "ilustra",
+    "muestra cómo",
+    # Procedimientos y pasos
+    "paso a paso",
+    "procedimiento",
+    "proceso completo",
+    "cómo hacer",
+    "implementar",
+    "aplicar en la práctica",
+    # Conceptos avanzados
+    "ventajas y desventajas",
+    "pros y contras",
+    "beneficios y limitaciones",
+    "implicaciones",
+    "consecuencias",
+    "impacto",
+    # Contexto técnico (SQL, programación)
+    "optimización",
+    "rendimiento",
+    "mejor práctica",
+    "mejores prácticas",
+    "arquitectura",
+    "diseño",
+    "patrones",
+    "estrategias",
+))
+# Alternación precompilada: un solo escaneo del mensaje sin importar cuántas
+# palabras clave haya (el motor de re recorre el texto una vez en C).
+_COMPLEX_RE = re.compile(
+    "|".join(map(re.escape, sorted(_COMPLEX_KEYWORDS, key=lambda k: (-len(k), k)))),
+    re.IGNORECASE,
+)
+
+
+def _select_rag_snippets(results: list[dict[str, Any]], limit: int) -> list[str]:
+    """
+    Formatea los chunks RAG que entran en `limit` bytes UTF-8.
+
+    El presupuesto se mide en bytes y no en caracteres: sigue mejor a los
+    tokens que se facturan (texto CJK o fórmulas: ~3 bytes y ~1 token por
+    carácter; texto latino: casi 1 byte por carácter, como antes). Los
+    offsets de inicio salen de un solo `accumulate`; el corte es el primer
+    chunk cuyo espacio restante sería <= 100 bytes (no vale la pena).
+    """
+    # EmbeddingsServiceV2 garantiza 'text' (no vacío), 'chunk_index' y 'similarity'
+    encoded = [r["text"].encode() for r in results]
+    starts = list(accumulate(map(len, encoded), initial=0))
+    cutoff = bisect_left(starts, limit - 100, hi=len(results))
+    return [
+        f"[chunk {r['chunk_index']}, score={r['similarity']:.3f}]\n"
+        f"{_truncate_utf8(r['text'], data, limit - start)}"
+        for r, data, start in zip(results[:cutoff], encoded, starts, strict=False)
+    ]
+
+
+def _truncate_utf8(text: str, data: bytes, budget: int) -> str:
+    """`text` recortado a `budget` bytes (`data` es su UTF-8 ya codificado)."""
+    if len(data) <= budget:
+        return text
+    # Un carácter multibyte cortado al final se descarta
+    return data[:budget].decode(errors="ignore")
+
+
+def _format_source(source: PythonSource) -> str:
+    """Bloque de una fuente para el contexto web (termina en salto de línea)."""
+    return (
+        f"📚 **{source.title}** ({source.source_type}, confiabilidad: {source.reliability}/10)\n"
+        f"🔗 {source.url}\n"
+        f"💡 {source.snippet}\n"
+    )
+
+
+# Instrucción común sobre limitaciones de conocimiento (específica para Kimi-K2)
+_KNOWLEDGE_CUTOFF = (
+    "\n\n**CONOCIMIENTO:** Cubres hasta Python 3.13 y enero 2025.\n"
+    "Para preguntas técnicas de Python, responde con conocimiento experto.\n"
+    "Si necesitas info más actual (Python 3.14+, releases recientes, noticias), responde: "
+    "'Voy a buscar información actualizada sobre esto.'\n"
+    "**REGLA DE BREVEDAD:** Responde DIRECTO. Máximo 3-4 párrafos. "
+    "1 ejemplo de código. Si el usuario quiere más, lo pide."
+)
+
+
+# Plantillas de prompt: el texto fijo se define una vez. Se parten en su único
+# hueco al cargar el módulo (y por modo de agente, ver `_web_prompt_parts`), así
+# cada turno solo concatena prefijo + contexto + sufijo.
+_RAG_PROMPT_TEMPLATE = (
+    "Eres un asistente experto en análisis técnico de documentos.\n\n"
+    "REGLAS OBLIGATORIAS:\n"
+    "1. Responde en español, DIRECTO al punto. Máximo 3-4 párrafos.\n"
+    "2. NO menciones 'Chunk', 'fragmento' ni números de referencia interna.\n"
+    "3. 1 ejemplo de código máximo. Si hacen falta más, pregunta.\n"
+    "4. Si el usuario quiere más detalle, lo pide explícitamente.\n"
+    "5. NUNCA inventes información que no esté en el documento.\n\n"
+    "--- DOCUMENTO ---\n\n"
+    "{rag_context}\n\n"
+    "--- FIN ---\n\n"
+    "Responde basándote únicamente en este contenido. Sé BREVE."
+)
+_WEB_CONTEXT_TEMPLATE = (
+    "{system_prompt}\n\n"
+    "--- INFORMACIÓN ACTUALIZADA DE INTERNET ---\n"
+    "{context}\n"
+    "--- FIN DE INFORMACIÓN ACTUALIZADA ---\n\n"
+    "INSTRUCCIÓN CRÍTICA: Acabas de recibir información actualizada de fuentes confiables. "
+    "Usa ESTA información para responder la pregunta del usuario. "
+    "NO digas que no tienes información. "
+    "Proporciona una respuesta completa basándote en el contexto actualizado que acabas de recibir."
+)
+_RAG_PROMPT_HEAD, _RAG_PROMPT_TAIL = _RAG_PROMPT_TEMPLATE.split("{rag_context}")
+
+
+@lru_cache(maxsize=16)
+def _build_system_prompt(agent_mode: str) -> str:
+    """
+    Prompt base del modo + reglas de conocimiento, memoizado por modo.
+
+    Los prompts son constantes, así que la concatenación se hace una sola vez
+    por modo en lugar de en cada mensaje.
+    """
+    # Importar get_system_prompt de prompts.py
+    from src.adapters.agents.prompts import AgentMode, get_system_prompt
+
+    try:
+        # get_system_prompt acepta tanto enum como string
+        return get_system_prompt(agent_mode) + _KNOWLEDGE_CUTOFF
+    except (KeyError, ValueError) as e:
+        # Fallback: usar prompt por defecto del arquitecto
+        logger.warning(
+            f"⚠️ No se encontró prompt para modo '{agent_mode}', usando Arquitecto por defecto. Error: {e}"
+        )
+        return get_system_prompt(AgentMode.PYTHON_ARCHITECT) + _KNOWLEDGE_CUTOFF
+
+
+@lru_cache(maxsize=16)
+def _web_prompt_parts(agent_mode: str) -> tuple[str, str]:
+    """Prefijo (prompt del modo + cabecera) y sufijo del prompt con contexto web."""
+    head, tail = _WEB_CONTEXT_TEMPLATE.split("{context}")
+    return head.format(system_prompt=_build_system_prompt(agent_mode)), tail
+
+
+# Herramienta de búsqueda para proveedores con tool calling: el modelo decide
+# en la misma llamada si necesita fuentes actualizadas, en vez de responder,
+# inspeccionar la respuesta con heurísticas y volver a llamarlo con contexto
+_SEARCH_TOOL = ToolSpec(
+    name="search_python_sources",
+    description=(
+        "Busca documentación oficial, PEPs, issues y discusiones actuales sobre "
+        "Python. Úsala solo si la pregunta necesita información posterior a tu "
+        "entrenamiento (versiones, releases, cambios recientes) o un error que no "
+        "puedes resolver con certeza."
+    ),
+    parameters={
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Consulta de búsqueda (puede ser el mensaje del usuario)",
+            }
+        },
+        "required": ["query"],
+    },
+)
+
+# Llamadas al LLM en curso por contenido (single-flight): un doble clic o un
+# reintento con el mismo prompt espera la llamada ya lanzada en vez de repetirla.
+# A nivel de módulo porque ChatServiceV2 se instancia por request.
+_INFLIGHT_LLM_CALLS: dict[str, asyncio.Task[tuple[str, Any]]] = {}
+
+
+def _llm_call_key(
+    system_prompt: str,
+    history: list[ChatMessage],
+    max_tokens: int | None,
+    temperature: float | None,
+    agent_mode: str,
+    has_rag: bool,
+) -> str:
+    """Hash del contenido completo de una llamada al LLM."""
+    digest = hashlib.sha256()
+    for part in (system_prompt, repr((max_tokens, temperature, agent_mode, has_rag))):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    for message in history:
+        digest.update(f"{message.role}:{message.content}".encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass(slots=True)
+class _Turn:
+    """Estado de un turno compartido entre `handle_message` y su variante streaming."""
+
+    session_id: str
+    user_message: str
+    file_id: int | None
+    history_task: asyncio.Task[list[ChatMessage]]
+    persist_user: asyncio.Task[ChatMessage]
+    start_time: float
+    message_length: int
+    history: list[ChatMessage] = field(default_factory=list)
+    system_prompt: str = ""
+    rag_context: str = ""
+    rag_chunks_count: int = 0
+    model_used: str = "kimi-k2"  # Default
+
 
 class ChatServiceV2:
     """
@@ -55,6 +378,8 @@ class ChatServiceV2:
         metrics_service: MetricsService | None = None,
         file_repository: FileRepositoryPort | None = None,
         document_mapper: Any | None = None,
+        semantic_cache: SemanticRetrievalCache | None = None,
+        response_cache: SemanticCache[str] | None = None,
     ) -> None:
         """
         Inicializa el servicio de chat.
@@ -68,11 +393,15 @@ class ChatServiceV2:
             metrics_service: Servicio de métricas (opcional)
             file_repository: Repositorio de archivos (opcional, para RAG context)
             document_mapper: Mapper de documentos (opcional, inyectado desde afuera)
+            semantic_cache: Caché semántico de recuperaciones RAG (opcional)
+            response_cache: Caché semántico de respuestas del LLM (opcional)
         """
         self.llm = llm_client
         self.repo = repository
         self.fallback_llm = fallback_llm
         self.embeddings = embeddings_service
+        self.semantic_cache = semantic_cache
+        self.response_cache = response_cache
         self.python_search = python_search
 
         self.context_service = None
@@ -143,23 +472,18 @@ class ChatServiceV2:
 
     def list_sessions_for_user(self, user_id: str, limit: int = 50) -> list[dict]:
         """Lista las sesiones de un usuario con el conteo de mensajes."""
-        all_sessions = self.repo.list_sessions(limit=limit * 2)
-        user_sessions = [s for s in all_sessions if s.user_id == user_id]
-
-        detailed_sessions = []
-        for s in user_sessions[:limit]:
-            message_count = self.repo.count_session_messages(str(s.id))
-            detailed_sessions.append(
-                {
-                    "id": int(s.id),
-                    "user_id": s.user_id,
-                    "session_name": s.title if hasattr(s, "title") else None,
-                    "message_count": message_count,
-                    "created_at": s.created_at.isoformat() if s.created_at else None,
-                    "updated_at": s.updated_at.isoformat() if s.updated_at else None,
-                }
-            )
-        return detailed_sessions
+        # Una sola consulta por página: sesiones del usuario con su conteo
+        return [
+            {
+                "id": int(s.id),
+                "user_id": s.user_id,
+                "session_name": s.title if hasattr(s, "title") else None,
+                "message_count": count,
+                "created_at": s.created_at.isoformat() if s.created_at else None,
+                "updated_at": s.updated_at.isoformat() if s.updated_at else None,
+            }
+            for s, count in self.repo.list_sessions_with_counts(user_id, limit=limit)
+        ]
 
     def _resolve_target_file_id(
         self, session_id: str, user_message: str, provided_file_id: int | None
@@ -232,6 +556,151 @@ class ChatServiceV2:
         Raises:
             ValueError: Si la sesión no existe
         """
+        turn = self._start_turn(session_id, user_message, file_id)
+
+        try:
+            # 4-5. Contexto RAG y system prompt
+            await self._build_turn_prompt(turn, user_message, agent_mode)
+
+            used_bear = False  # Inicializar variables antes del bloque condicional
+            bear_sources_count = 0
+            search_enabled = bool(
+                use_internet and self.python_search and not turn.rag_context
+            )
+
+            # 6. Con tool calling el modelo decide si buscar en la misma llamada
+            if search_enabled and self._search_tool_enabled():
+                response, tokens, sources = await self._get_response_with_search_tool(
+                    turn,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    agent_mode=agent_mode,
+                    use_fallback_on_error=use_fallback_on_error,
+                )
+                used_bear = bool(sources)
+                bear_sources_count = len(sources)
+                search_enabled = False  # La búsqueda ya se resolvió (o no hizo falta)
+            else:
+                # Obtener respuesta inicial del LLM (o del caché semántico)
+                initial_response, tokens = await self._get_initial_response(
+                    turn,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    agent_mode=agent_mode,
+                    use_fallback_on_error=use_fallback_on_error,
+                )
+                response = initial_response
+
+            # 7. Verificar si necesita búsqueda en Internet (proveedores sin tools)
+            if search_enabled:
+                logger.info("🔍 Verificando si necesita búsqueda web...")
+                if self._should_search_internet(user_message, initial_response):
+                    logger.info("✅ Kimi solicitó búsqueda web. Activando Brave Search...")
+                    sources = await self._search_python_sources(user_message)
+                    if sources:
+                        used_bear = True  # Marcar uso de Bear API
+                        bear_sources_count = len(sources)  # Contar fuentes
+                        self.last_search_sources = sources
+                        context = self._build_internet_context(sources)
+
+                        logger.info(
+                            f"📚 Contexto web construido: {len(context)} caracteres de {len(sources)} fuentes"
+                        )
+
+                        # Re-llamar al LLM con contexto adicional
+                        # IMPORTANTE: Incluir el contexto DENTRO del system prompt para que Kimi lo vea como conocimiento base
+                        # (la búsqueda web solo corre sin RAG: el prompt base es el del modo)
+                        head, tail = _web_prompt_parts(agent_mode)
+                        enriched_prompt = f"{head}{context}{tail}"
+
+                        logger.info("🤖 Re-llamando a Kimi con contexto web...")
+
+                        # Usar el historial completo (el LLM verá el contexto actualizado en el system prompt)
+                        response, tokens = await self._get_llm_response(
+                            system_prompt=enriched_prompt,
+                            history=turn.history,  # Usar historial completo
+                            max_tokens=max_tokens,
+                            temperature=temperature,
+                            session_id=turn.session_id,
+                            agent_mode=agent_mode,
+                            use_fallback_on_error=use_fallback_on_error,
+                            has_rag=bool(turn.rag_context),
+                        )
+                        logger.info(
+                            f"✅ Respuesta con contexto web generada: {len(response)} caracteres"
+                        )
+        finally:
+            # La sesión de BD no admite uso concurrente: la escritura debe
+            # terminar (y propagar sus errores) antes de volver a usar el repo
+            await turn.persist_user
+
+        # 8-9. Guardar respuesta y registrar métricas
+        await self._finish_turn(
+            turn,
+            response,
+            tokens,
+            agent_mode=agent_mode,
+            used_bear=used_bear,
+            bear_sources_count=bear_sources_count,
+        )
+        return response
+
+    async def handle_message_stream(
+        self,
+        session_id: str,
+        user_message: str,
+        *,
+        agent_mode: str = "architect",
+        file_id: int | None = None,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        use_fallback_on_error: bool = True,
+    ) -> AsyncIterator[str]:
+        """
+        Variante de `handle_message` que emite la respuesta a medida que llega.
+
+        Comparte la preparación (sesión, historial, RAG, prompt) y el cierre
+        (persistencia y métricas) con `handle_message`. No hace la búsqueda en
+        Internet: esa decisión necesita la respuesta completa, y lo ya emitido
+        no se puede retirar. Por la misma razón, el LLM de respaldo solo se usa
+        si el principal falla antes de emitir el primer fragmento.
+
+        Yields:
+            Fragmentos de la respuesta del LLM
+
+        Raises:
+            ValueError: Si la sesión no existe
+        """
+        turn = self._start_turn(session_id, user_message, file_id)
+
+        chunks: list[str] = []
+        try:
+            await self._build_turn_prompt(turn, user_message, agent_mode)
+            async for chunk in self._stream_llm_response(
+                turn,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                use_fallback_on_error=use_fallback_on_error,
+            ):
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            await turn.persist_user
+
+        # Sin conteo del proveedor en streaming: se estima por longitud
+        await self._finish_turn(
+            turn,
+            "".join(chunks),
+            None,
+            agent_mode=agent_mode,
+            used_bear=False,
+            bear_sources_count=0,
+        )
+
+    def _start_turn(
+        self, session_id: str, user_message: str, file_id: int | None
+    ) -> _Turn:
+        """Pasos 1-3: resuelve el archivo, valida la sesión y lanza historial y guardado."""
         # Iniciar timer para métricas
         start_time = time.time()
 
@@ -249,10 +718,6 @@ class ChatServiceV2:
             file_id = resolved_file_id
         # ----------------------------------
 
-        rag_chunks_count = 0
-        used_bear = False
-        bear_sources_count = 0
-        model_used = "kimi-k2"  # Default
         # 1. Validar o crear sesión
         if session_id == "0" or not session_id:
             # Crear nueva sesión si no existe
@@ -262,122 +727,99 @@ class ChatServiceV2:
             )
             new_session = self.repo.create_session(session_data)
             session_id = str(new_session.id)
+            is_new_session = True
         else:
             # Validar que la sesión existe
             session = self.repo.get_session(session_id)
             if not session:
                 raise ValueError(f"Sesión {session_id} no encontrada")
+            is_new_session = False
 
-        # 2. Guardar mensaje del usuario
+        # 2-3. Leer el historial y guardar el mensaje del usuario en un hilo,
+        # solapados con la búsqueda RAG (y la escritura, con la llamada al LLM).
+        # La sesión de BD no admite uso concurrente: van en serie entre sí.
         user_msg_data = ChatMessageCreate(
             session_id=session_id,
             role=MessageRole.USER,
             content=user_message,
         )
-        self.repo.add_message(user_msg_data)
+        history_task = asyncio.create_task(
+            self._load_recent_history(session_id, is_new_session)
+        )
+        persist_user = asyncio.create_task(
+            self._persist_after(history_task, user_msg_data)
+        )
+
+        return _Turn(
+            session_id=session_id,
+            user_message=user_message,
+            file_id=file_id,
+            history_task=history_task,
+            persist_user=persist_user,
+            start_time=start_time,
+            # Longitud del mensaje: se calcula una vez (complejidad RAG y estimación de tokens)
+            message_length=len(user_message),
+        )
+
+    async def _load_recent_history(
+        self, session_id: str, is_new_session: bool
+    ) -> list[ChatMessage]:
+        """Ventana reciente del historial (lectura y prompt acotados por turno)."""
+        if is_new_session:
+            return []
+        from src.adapters.config.settings import settings
+
+        return list(
+            await asyncio.to_thread(
+                self.repo.get_recent_session_messages,
+                session_id,
+                limit=settings.chat_history_window,
+            )
+        )
 
-        # 3. Obtener historial de mensajes
-        history = self.repo.get_session_messages(session_id)
+    async def _persist_after(
+        self,
+        history_task: asyncio.Task[list[ChatMessage]],
+        user_msg_data: ChatMessageCreate,
+    ) -> ChatMessage:
+        """Guarda el mensaje del usuario cuando termina la lectura del historial."""
+        await history_task
+        return await asyncio.to_thread(self.repo.add_message, user_msg_data)
+
+    async def _await_history(self, turn: _Turn) -> list[ChatMessage]:
+        """Historial del turno con el mensaje actual añadido en memoria (sin releer la BD)."""
+        history = await turn.history_task
+        history.append(
+            ChatMessage(
+                session_id=int(turn.session_id),
+                role=MessageRole.USER,
+                content=turn.user_message,
+                timestamp=datetime.now(UTC),
+                message_index=history[-1].message_index + 1 if history else 0,
+            )
+        )
+        return history
 
+    async def _build_turn_prompt(
+        self, turn: _Turn, user_message: str, agent_mode: str
+    ) -> None:
+        """Pasos 4-5: busca contexto RAG y construye el system prompt del turno."""
         # 4. Buscar contexto RAG si hay file_id
-        rag_context = ""
-        if file_id and self.embeddings:
+        if turn.file_id and self.embeddings:
             try:
                 # 🎯 BÚSQUEDA ADAPTATIVA: Ajustar top_k según complejidad de la pregunta
                 # Preguntas complejas necesitan más contexto para aprovechar ventana de Gemini
                 from src.adapters.config.settings import settings
 
-                question_length = len(user_message)
-                is_complex = any(
-                    word in user_message.lower()
-                    for word in [
-                        # Análisis y comparación
-                        "compara",
-                        "diferencia",
-                        "diferencias",
-                        "relación",
-                        "relaciona",
-                        "contrasta",
-                        "versus",
-                        "vs",
-                        "frente a",
-                        "comparación",
-                        # Explicación profunda
-                        "explica detalladamente",
-                        "explica en detalle",
-                        "profundiza",
-                        "desarrolla",
-                        "elabora",
-                        "detalla",
-                        "describe en profundidad",
-                        "extiende",
-                        "amplía",
-                        "expande",
-                        # Análisis técnico
-                        "analiza",
-                        "evalúa",
-                        "examina",
-                        "investiga",
-                        "estudia",
-                        "revisa",
-                        "inspecciona",
-                        "diagnostica",
-                        # Enumeración y listado
-                        "enumera",
-                        "lista",
-                        "identifica",
-                        "menciona todos",
-                        "cuáles son",
-                        "qué tipos",
-                        "qué clases",
-                        # Síntesis y conexión
-                        "sintetiza",
-                        "resume extensamente",
-                        "conecta",
-                        "vincula",
-                        "integra",
-                        "unifica",
-                        "combina",
-                        # Ejemplos y casos
-                        "ejemplos",
-                        "ejemplo práctico",
-                        "casos de uso",
-                        "casos prácticos",
-                        "demuestra",
-                        "ilustra",
-                        "muestra cómo",
-                        # Procedimientos y pasos
-                        "paso a paso",
-                        "procedimiento",
-                        "proceso completo",
-                        "cómo hacer",
-                        "implementar",
-                        "aplicar en la práctica",
-                        # Conceptos avanzados
-                        "ventajas y desventajas",
-                        "pros y contras",
-                        "beneficios y limitaciones",
-                        "implicaciones",
-                        "consecuencias",
-                        "impacto",
-                        # Contexto técnico (SQL, programación)
-                        "optimización",
-                        "rendimiento",
-                        "mejor práctica",
-                        "mejores prácticas",
-                        "arquitectura",
-                        "diseño",
-                        "patrones",
-                        "estrategias",
-                    ]
-                )
+                # Una sola pasada del regex precompilado (sin .lower() ni N escaneos)
+                is_complex = _COMPLEX_RE.search(user_message) is not None
 
                 # Ajustar top_k dinámicamente usando configuración
-                if is_complex or question_length > 100:
+                if is_complex or turn.message_length > 100:
                     top_k = settings.rag_complex_top_k  # Preguntas complejas
                     limit = settings.rag_complex_limit
                     complexity = "compleja"
-                elif question_length > 50:
+                elif turn.message_length > 50:
                     top_k = settings.rag_normal_top_k  # Preguntas normales
                     limit = settings.rag_normal_limit
                     complexity = "normal"
@@ -390,287 +832,399 @@ class ChatServiceV2:
                     f"🎯 Búsqueda adaptativa ({complexity}): top_k={top_k}, limit={limit} chars"
                 )
 
-                # Buscar chunks relevantes
-                # Búsqueda más precisa para definiciones técnicas
-                results = await self.embeddings.search_similar(
-                    query=user_message,
-                    file_id=str(file_id),
-                    top_k=8,  # Más chunks para mejor contexto
-                    min_similarity=0.65,  # Umbral más estricto
-                )
-
-                if results:
-                    logger.info(
-                        f"✅ RAG: {len(results)} chunks encontrados para file_id={file_id}"
-                    )
-                    acc = 0
-                    parts: list[str] = []
-
-                    for r in results:
-                        remaining = limit - acc
-                        if remaining <= 100:  # Mínimo para que valga la pena
-                            break
-
-                        # EmbeddingsServiceV2 retorna 'text', no 'content'
-                        content = r.get("text", "")
-                        chunk_idx = r.get("chunk_index", 0)
-                        similarity = r.get("similarity", 0.0)
-
-                        if not content:
-                            logger.warning(
-                                f"⚠️ Chunk {chunk_idx} sin contenido: {r.keys()}"
-                            )
-                            continue
-
-                        snippet = content[:remaining]
-                        parts.append(
-                            f"[chunk {chunk_idx}, score={similarity:.3f}]\n{snippet}"
+                cache_key = rag_context_key(turn.file_id, user_message, top_k, limit)
+                cached = get_cached_rag_context(cache_key, settings.rag_context_cache_ttl)
+                if cached is not None:
+                    logger.info("♻️ RAG: contexto reutilizado (caché exacto por archivo y consulta)")
+                else:
+                    cached = await self._search_rag_context(turn, user_message, top_k, limit)
+                    if cached is not None:
+                        store_rag_context(
+                            cache_key, *cached, settings.rag_context_cache_max_entries
                         )
-                        acc += len(snippet)
 
-                    rag_context = "\n\n".join(parts)
-                    rag_chunks_count = len(parts)  # Guardar para métricas
-                    model_used = "gemini-2.5-flash"  # RAG usa Gemini
+                if cached is not None:
+                    turn.rag_context, turn.rag_chunks_count = cached  # Conteo para métricas
+                    turn.model_used = "gemini-2.5-flash"  # RAG usa Gemini
                     logger.info(
-                        f"📄 Contexto RAG: {acc} caracteres de {rag_chunks_count} chunks"
+                        f"📄 Contexto RAG: {len(turn.rag_context)} caracteres de {turn.rag_chunks_count} chunks"
                     )
-                    logger.debug(f"🔍 Preview contexto: {rag_context[:300]}...")
+                    # El preview copia 300 caracteres: solo si el nivel DEBUG está activo
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"🔍 Preview contexto: {turn.rag_context[:300]}...")
                 else:
                     logger.warning(
-                        f"⚠️ RAG: No se encontraron chunks para file_id={file_id}"
+                        f"⚠️ RAG: No se encontraron chunks para file_id={turn.file_id}"
                     )
             except Exception as e:
-                logger.error(f"❌ Error en búsqueda RAG: {e}")
-                logger.error(traceback.format_exc())
-
-        # 5. Construir system prompt
-        system_prompt = self._get_system_prompt(agent_mode)
-
-        # Si hay contexto RAG, PRIORIZAR el contexto del PDF
-        if rag_context:
-            system_prompt = (
-                f"Eres un asistente experto en análisis técnico de documentos.\n\n"
-                "REGLAS OBLIGATORIAS:\n"
-                "1. Responde en español, DIRECTO al punto. Máximo 3-4 párrafos.\n"
-                "2. NO menciones 'Chunk', 'fragmento' ni números de referencia interna.\n"
-                "3. 1 ejemplo de código máximo. Si hacen falta más, pregunta.\n"
-                "4. Si el usuario quiere más detalle, lo pide explícitamente.\n"
-                "5. NUNCA inventes información que no esté en el documento.\n\n"
-                f"--- DOCUMENTO ---\n\n"
-                f"{rag_context}\n\n"
-                "--- FIN ---\n\n"
-                "Responde basándote únicamente en este contenido. Sé BREVE."
-            )
-            logger.debug(f"🎯 System prompt RAG: {len(system_prompt)} caracteres")
-
-        # 6. Obtener respuesta inicial del LLM
-        initial_response, tokens = await self._get_llm_response(
-            system_prompt=system_prompt,
-            history=history,
-            max_tokens=max_tokens,
-            temperature=temperature,
-            session_id=session_id,
-            agent_mode=agent_mode,
-            use_fallback_on_error=use_fallback_on_error,
-            has_rag=bool(rag_context),
-        )
-
-        # 7. Verificar si necesita búsqueda en Internet
-        used_bear = False  # Inicializar variables antes del bloque condicional
-        bear_sources_count = 0
-        if use_internet and self.python_search and not rag_context:
-            logger.info("🔍 Verificando si necesita búsqueda web...")
-            if self._should_search_internet(user_message, initial_response):
-                logger.info("✅ Kimi solicitó búsqueda web. Activando Brave Search...")
-                sources = await self._search_python_sources(user_message)
-                if sources:
-                    used_bear = True  # Marcar uso de Bear API
-                    bear_sources_count = len(sources)  # Contar fuentes
-                    self.last_search_sources = sources
-                    context = self._build_internet_context(sources)
-
-                    logger.info(
-                        f"📚 Contexto web construido: {len(context)} caracteres de {len(sources)} fuentes"
-                    )
+                logger.exception(f"❌ Error en búsqueda RAG: {e}")
 
-                    # Re-llamar al LLM con contexto adicional
-                    # IMPORTANTE: Incluir el contexto DENTRO del system prompt para que Kimi lo vea como conocimiento base
-                    enriched_prompt = (
-                        f"{system_prompt}\n\n"
-                        f"--- INFORMACIÓN ACTUALIZADA DE INTERNET ---\n"
-                        f"{context}\n"
-                        f"--- FIN DE INFORMACIÓN ACTUALIZADA ---\n\n"
-                        f"INSTRUCCIÓN CRÍTICA: Acabas de recibir información actualizada de fuentes confiables. "
-                        f"Usa ESTA información para responder la pregunta del usuario. "
-                        f"NO digas que no tienes información. "
-                        f"Proporciona una respuesta completa basándote en el contexto actualizado que acabas de recibir."
-                    )
+        # La lectura del historial corrió en paralelo con la búsqueda RAG
+        turn.history = await self._await_history(turn)
+        if turn.rag_context:
+            from src.adapters.config.settings import settings
 
-                    logger.info("🤖 Re-llamando a Kimi con contexto web...")
+            # El documento ocupa la ventana: menos historial (el último es el mensaje actual)
+            turn.history = turn.history[-settings.chat_history_window_rag :]
 
-                    # Usar el historial completo (el LLM verá el contexto actualizado en el system prompt)
-                    response, tokens = await self._get_llm_response(
-                        system_prompt=enriched_prompt,
-                        history=history,  # Usar historial completo
-                        max_tokens=max_tokens,
-                        temperature=temperature,
-                        session_id=session_id,
-                        agent_mode=agent_mode,
-                        use_fallback_on_error=use_fallback_on_error,
-                        has_rag=bool(rag_context),
-                    )
-                    logger.info(
-                        f"✅ Respuesta con contexto web generada: {len(response)} caracteres"
-                    )
-                else:
-                    response = initial_response
-            else:
-                response = initial_response
+        # 5. Construir system prompt
+        # Si hay contexto RAG, PRIORIZAR el contexto del PDF
+        if turn.rag_context:
+            turn.system_prompt = f"{_RAG_PROMPT_HEAD}{turn.rag_context}{_RAG_PROMPT_TAIL}"
+            logger.debug(f"🎯 System prompt RAG: {len(turn.system_prompt)} caracteres")
         else:
-            response = initial_response
+            turn.system_prompt = self._get_system_prompt(agent_mode)
 
+
+    async def _finish_turn(
+        self,
+        turn: _Turn,
+        response: str,
+        tokens: Any,
+        *,
+        agent_mode: str,
+        used_bear: bool,
+        bear_sources_count: int,
+    ) -> None:
+        """Pasos 8-9: guarda la respuesta del asistente y registra métricas."""
         # 8. Guardar respuesta del asistente
         assistant_msg_data = ChatMessageCreate(
-            session_id=session_id,
+            session_id=turn.session_id,
             role=MessageRole.ASSISTANT,
             content=response,
         )
-        self.repo.add_message(assistant_msg_data)
+        # Se solapa con el registro de métricas; se espera antes de terminar
+        persist_assistant = asyncio.create_task(
+            asyncio.to_thread(self.repo.add_message, assistant_msg_data)
+        )
 
         # 9. Registrar métricas
-        response_time = time.time() - start_time
+        response_time = time.time() - turn.start_time
         try:
             # Extraer tokens de la respuesta (manejar diferentes formatos)
-            prompt_tokens = 0
-            completion_tokens = 0
-
-            if isinstance(tokens, dict):
-                # Formato diccionario (algunos LLMs)
-                prompt_tokens = tokens.get("prompt_tokens", 0)
-                completion_tokens = tokens.get("completion_tokens", 0)
-            elif isinstance(tokens, int):
-                # Formato entero (Groq retorna total)
-                # Estimar: ~70% completion, 30% prompt
-                completion_tokens = int(tokens * 0.7)
-                prompt_tokens = tokens - completion_tokens
-            elif tokens is None:
-                # Gemini no retorna tokens, estimar basado en longitud
-                prompt_tokens = len(user_message) // 4  # ~4 chars por token
-                completion_tokens = len(response) // 4
-                logger.debug(
-                    f"⚠️ Tokens estimados (LLM no los proporciona): {prompt_tokens + completion_tokens}"
-                )
-            else:
-                # Caso inesperado, estimar
-                prompt_tokens = len(user_message) // 4
-                completion_tokens = len(response) // 4
-                logger.warning(f"⚠️ Tipo de tokens inesperado: {type(tokens)}")
+            match tokens:
+                case dict():
+                    # Formato diccionario (algunos LLMs)
+                    prompt_tokens = tokens.get("prompt_tokens", 0)
+                    completion_tokens = tokens.get("completion_tokens", 0)
+                case int():
+                    # Formato entero (Groq retorna total)
+                    # Estimar: ~70% completion, 30% prompt
+                    completion_tokens = int(tokens * 0.7)
+                    prompt_tokens = tokens - completion_tokens
+                case _:
+                    # Gemini/streaming no retornan tokens: estima el tokenizador del puerto
+                    prompt_tokens, completion_tokens = self._estimate_turn_tokens(
+                        turn, response
+                    )
+                    if tokens is None:
+                        logger.debug(
+                            f"⚠️ Tokens estimados (LLM no los proporciona): {prompt_tokens + completion_tokens}"
+                        )
+                    else:
+                        logger.warning(f"⚠️ Tipo de tokens inesperado: {type(tokens)}")
 
-            self.metrics.record_agent_usage(
-                session_id=session_id,
+            self.metrics.enqueue_agent_usage(
+                session_id=turn.session_id,
                 agent_mode=agent_mode,
                 prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
                 response_time=response_time,
-                model_name=model_used,
-                has_rag_context=bool(rag_context),
-                rag_chunks_used=rag_chunks_count,
-                file_id=str(file_id) if file_id else None,
+                model_name=turn.model_used,
+                has_rag_context=bool(turn.rag_context),
+                rag_chunks_used=turn.rag_chunks_count,
+                file_id=str(turn.file_id) if turn.file_id else None,
                 used_bear_search=used_bear,
                 bear_sources_count=bear_sources_count,
             )
             logger.info(
-                f"📊 Métricas registradas: {prompt_tokens + completion_tokens} tokens, {response_time:.2f}s, modelo={model_used}"
+                f"📊 Métricas encoladas: {prompt_tokens + completion_tokens} tokens, {response_time:.2f}s, modelo={turn.model_used}"
             )
         except Exception as e:
-            logger.error(f"❌ Error registrando métricas: {e}")
-            logger.error(traceback.format_exc())
+            logger.exception(f"❌ Error registrando métricas: {e}")
 
-        return response
+        await persist_assistant
 
-    def _get_system_prompt(self, agent_mode: str) -> str:
+    def _estimate_turn_tokens(self, turn: _Turn, response: str) -> tuple[int, int]:
+        """(prompt, completion) estimados con el tokenizador del LLM que respondió."""
+        llm = self.fallback_llm if turn.rag_context and self.fallback_llm else self.llm
+        return llm.estimate_tokens(turn.user_message), llm.estimate_tokens(response)
+
+    async def _stream_llm_response(
+        self,
+        turn: _Turn,
+        *,
+        max_tokens: int | None,
+        temperature: float | None,
+        use_fallback_on_error: bool,
+    ) -> AsyncIterator[str]:
+        """Streaming con la misma elección de LLM que `_get_llm_response`."""
+        if turn.rag_context and self.fallback_llm:
+            # RAG: Usar provider de fallback (configurable, default: Gemini)
+            logger.info("🤖 Usando LLM de fallback para RAG (streaming)")
+            async for chunk in self.fallback_llm.get_chat_completion_stream(
+                turn.system_prompt,
+                turn.history,
+                max_tokens=max_tokens or 8192,
+                temperature=temperature or 0.3,
+            ):
+                yield chunk
+            return
+
+        logger.info("🤖 Usando LLM principal para chat (streaming)")
+        emitted = False
+        try:
+            async for chunk in self.llm.get_chat_completion_stream(
+                turn.system_prompt,
+                turn.history,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            ):
+                emitted = True
+                yield chunk
+        except Exception as e:
+            # Lo ya emitido no se puede retirar: solo hay fallback antes del 1er fragmento
+            if emitted or not (use_fallback_on_error and self.fallback_llm):
+                raise
+            logger.warning(f"⚠️ LLM principal falló, usando fallback. Error: {e}")
+            async for chunk in self.fallback_llm.get_chat_completion_stream(
+                turn.system_prompt,
+                turn.history,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            ):
+                yield chunk
+
+    async def _search_rag_context(
+        self, turn: _Turn, user_message: str, top_k: int, limit: int
+    ) -> tuple[str, int] | None:
+        """Recupera, rerankea y formatea los chunks: (contexto, cantidad) o None."""
+        from src.adapters.config.settings import settings
+
+        # Buscar chunks relevantes: se recupera un conjunto amplio y el
+        # rerank MMR deja los top_k más relevantes sin casi-duplicados
+        results = await self._retrieve_chunks(
+            turn.session_id, user_message, str(turn.file_id)
+        )
+        results = rerank_mmr(results, final_k=top_k, lambda_=settings.rag_mmr_lambda)
+        if not results:
+            return None
+
+        logger.info(f"✅ RAG: {len(results)} chunks encontrados para file_id={turn.file_id}")
+        parts = _select_rag_snippets(results, limit)
+        return "\n\n".join(parts), len(parts)
+
+    async def _retrieve_chunks(
+        self, session_id: str, query: str, file_id: str
+    ) -> list[dict[str, Any]]:
         """
-        Obtiene el system prompt para un modo de agente.
+        Recupera los chunks RAG, reutilizando los de una consulta casi idéntica
+        de la misma sesión y documento si hay caché semántico.
+        """
+        from src.adapters.config.settings import settings
+
+        # Candidatos para el rerank MMR (el caché guarda el conjunto completo)
+        top_k = settings.rag_candidate_pool
+        if self.semantic_cache is None:
+            return await self.embeddings.search_similar(
+                query=query,
+                file_id=file_id,
+                top_k=top_k,
+                min_similarity=0.65,  # Umbral más estricto
+            )
 
-        Args:
-            agent_mode: Modo del agente (puede ser el valor del enum o el nombre)
+        query_embedding = await self.embeddings.embed_query(query)
+        cached = self.semantic_cache.get(session_id, file_id, query_embedding)
+        if cached is not None:
+            logger.info(f"♻️ RAG: reutilizando {len(cached)} chunks (caché semántico)")
+            return cached
 
-        Returns:
-            System prompt
+        results = await self.embeddings.search_by_embedding(
+            query_embedding, file_id, top_k=top_k, min_similarity=0.65
+        )
+        self.semantic_cache.put(session_id, file_id, query_embedding, results)
+        return results
+
+    async def _get_initial_response(
+        self,
+        turn: _Turn,
+        *,
+        max_tokens: int | None,
+        temperature: float | None,
+        agent_mode: str,
+        use_fallback_on_error: bool,
+    ) -> tuple[str, Any]:
         """
-        # Importar get_system_prompt de prompts.py
-        from src.adapters.agents.prompts import AgentMode, get_system_prompt
-
-        # Instrucción común sobre limitaciones de conocimiento (específica para Kimi-K2)
-        knowledge_cutoff = (
-            "\n\n**CONOCIMIENTO:** Cubres hasta Python 3.13 y enero 2025.\n"
-            "Para preguntas técnicas de Python, responde con conocimiento experto.\n"
-            "Si necesitas info más actual (Python 3.14+, releases recientes, noticias), responde: "
-            "'Voy a buscar información actualizada sobre esto.'\n"
-            "**REGLA DE BREVEDAD:** Responde DIRECTO. Máximo 3-4 párrafos. "
-            "1 ejemplo de código. Si el usuario quiere más, lo pide."
+        Respuesta inicial del turno, reutilizando la de un mensaje casi idéntico.
+
+        Solo se cachean primeros mensajes de sesión (sin historial que cambie el
+        sentido de la pregunta) con temperatura por defecto o 0. El ámbito es el
+        hash del system prompt completo (modo, contexto RAG) y `max_tokens`.
+        """
+        cache_key = await self._response_cache_key(turn, max_tokens, temperature)
+        if cache_key is not None:
+            prompt_hash, limit, embedding = cache_key
+            cached = self.response_cache.get(prompt_hash, limit, embedding)
+            if cached is not None:
+                logger.info("♻️ Respuesta reutilizada (caché semántico de respuestas)")
+                return cached, 0  # Sin llamada al LLM: no se consumen tokens
+
+        response, tokens = await self._get_llm_response(
+            system_prompt=turn.system_prompt,
+            history=turn.history,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            session_id=turn.session_id,
+            agent_mode=agent_mode,
+            use_fallback_on_error=use_fallback_on_error,
+            has_rag=bool(turn.rag_context),
         )
+        if cache_key is not None:
+            self.response_cache.put(prompt_hash, limit, embedding, response)
+        return response, tokens
+
+    def _search_tool_enabled(self) -> bool:
+        """Tool calling activado por configuración y soportado por el proveedor."""
+        from src.adapters.config.settings import settings
+
+        return settings.llm_tool_calling_enabled and self.llm.supports_tools is True
+
+    async def _get_response_with_search_tool(
+        self,
+        turn: _Turn,
+        *,
+        max_tokens: int | None,
+        temperature: float | None,
+        agent_mode: str,
+        use_fallback_on_error: bool,
+    ) -> tuple[str, Any, list[PythonSource]]:
+        """
+        Respuesta del turno ofreciendo la búsqueda web como herramienta.
 
+        Un solo round trip si el modelo no busca; dos si invoca la herramienta.
+        Pasa por el caché de respuestas y el single-flight como el camino
+        clásico. Si el proveedor falla responde el LLM de respaldo, sin volver
+        a llamar al principal.
+        """
+        cache_key = await self._response_cache_key(turn, max_tokens, temperature)
+        if cache_key is not None:
+            prompt_hash, limit, embedding = cache_key
+            cached = self.response_cache.get(prompt_hash, limit, embedding)
+            if cached is not None:
+                logger.info("♻️ Respuesta reutilizada (caché semántico de respuestas)")
+                return cached, 0, []
+
+        call_key = "tools:" + _llm_call_key(
+            turn.system_prompt,
+            turn.history,
+            max_tokens,
+            temperature,
+            agent_mode,
+            has_rag=False,
+        )
         try:
-            # Intentar obtener el prompt del módulo prompts.py
-            # get_system_prompt acepta tanto enum como string
-            base_prompt = get_system_prompt(agent_mode)
-            # Agregar las reglas de conocimiento
-            return base_prompt + knowledge_cutoff
-        except (KeyError, ValueError) as e:
-            # Fallback: usar prompt por defecto del arquitecto
-            logger.warning(
-                f"⚠️ No se encontró prompt para modo '{agent_mode}', usando Arquitecto por defecto. Error: {e}"
+            response, (tokens, sources) = await self._single_flight(
+                call_key,
+                lambda: self._call_llm_with_search_tool(
+                    turn,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    agent_mode=agent_mode,
+                ),
             )
-            base_prompt = get_system_prompt(AgentMode.PYTHON_ARCHITECT)
-            return base_prompt + knowledge_cutoff
+        except Exception as e:
+            if not (use_fallback_on_error and self.fallback_llm):
+                raise
+            logger.warning(f"⚠️ Tool calling falló, usando fallback. Error: {e}")
+            response, tokens = await self.fallback_llm.get_chat_completion(
+                system_prompt=turn.system_prompt,
+                messages=turn.history,
+                max_tokens=max_tokens,
+                temperature=temperature,
+            )
+            return response, tokens, []
 
-    def _should_search_internet(self, user_message: str, kimi_response: str) -> bool:
-        """Detecta si Kimi no pudo resolver el problema y necesita búsqueda."""
-        if "voy a buscar información actualizada sobre esto" in kimi_response.lower():
-            return True
+        if sources:
+            self.last_search_sources = sources
+        elif cache_key is not None:
+            # Las respuestas con fuentes web no se cachean (igual que el camino clásico)
+            self.response_cache.put(prompt_hash, limit, embedding, response)
+        return response, tokens, sources
 
-        if "voy a buscarlo en internet" in kimi_response.lower():
-            return True
+    async def _call_llm_with_search_tool(
+        self,
+        turn: _Turn,
+        *,
+        max_tokens: int | None,
+        temperature: float | None,
+        agent_mode: str,
+    ) -> tuple[str, tuple[Any, list[PythonSource]]]:
+        """Llamada con la herramienta de búsqueda: (respuesta, (tokens, fuentes))."""
+        sources: list[PythonSource] = []
+
+        async def handle_tool(name: str, arguments: dict[str, Any]) -> str:
+            query = arguments.get("query") or turn.user_message
+            found = await self._search_python_sources(query)
+            sources.extend(found)
+            if not found:
+                return "Sin resultados."
+            logger.info(f"📚 Herramienta de búsqueda: {len(found)} fuentes para {query!r}")
+            return self._build_internet_context(found)
+
+        response, tokens = await self.llm.get_chat_completion_with_tools(
+            system_prompt=turn.system_prompt,
+            messages=turn.history,
+            tools=[_SEARCH_TOOL],
+            tool_handler=handle_tool,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            session_id=turn.session_id,
+            agent_mode=agent_mode,
+        )
+        return response, (tokens, sources)
 
-        uncertainty_signals = [
-            r"\bno tengo información suficiente\b",
-            r"\bno (tengo|cuento con|puedo proporcionar)\b",
-            r"\b(desconozco|ignoro|no estoy seguro)\b",
-            r"\bno puedo\b",
-            r"\bno tengo\b",
-            r"\bno dispongo\b",
-            r"\bpodrías consultar\b",
-            r"\bpodrías buscar\b",
-            r"\berror.*desconocido\b",
-            r"\bno encuentro\b",
-            r"\bno tengo acceso\b",
-            r"\bno puedo ver\b",
-            r"\bno disponible\b",
-            r"\bcomo modelo de lenguaje\b",
-            r"\bno tengo la capacidad\b",
-            r"\bno puedo navegar\b",
-            r"\bno puedo acceder\b",
-        ]
+    async def _response_cache_key(
+        self, turn: _Turn, max_tokens: int | None, temperature: float | None
+    ) -> tuple[str, str, Any] | None:
+        """(hash del prompt, max_tokens, embedding del mensaje) o None si no aplica."""
+        if (
+            self.response_cache is None
+            or self.embeddings is None
+            or len(turn.history) != 1  # Solo el mensaje actual
+            or temperature not in (None, 0.0)
+        ):
+            return None
+        try:
+            embedding = await self.embeddings.embed_query(turn.user_message)
+        except Exception as e:
+            logger.warning(f"⚠️ Caché de respuestas omitido (embedding falló): {e}")
+            return None
+        prompt_hash = hashlib.sha256(turn.system_prompt.encode()).hexdigest()
+        return prompt_hash, str(max_tokens), embedding
 
-        kimis_uncertain = any(
-            re.search(pattern, kimi_response, re.IGNORECASE)
-            for pattern in uncertainty_signals
-        )
+    def _get_system_prompt(self, agent_mode: str) -> str:
+        """
+        Obtiene el system prompt para un modo de agente.
 
-        traceback_mentioned = bool(
-            re.search(r"Traceback|Error|Exception", user_message, re.IGNORECASE)
-        )
+        Args:
+            agent_mode: Modo del agente (puede ser el valor del enum o el nombre)
 
-        is_general_query = bool(
-            re.search(
-                r"\b(clima|temperatura|hora|dólar|euro|noticias|recetas)\b",
-                user_message,
-                re.IGNORECASE,
-            )
-        )
+        Returns:
+            System prompt
+        """
+        return _build_system_prompt(agent_mode)
 
-        return (kimis_uncertain or traceback_mentioned) and not is_general_query
+    def _should_search_internet(self, user_message: str, kimi_response: str) -> bool:
+        """Detecta si Kimi no pudo resolver el problema y necesita búsqueda."""
+        # Regla: intención explícita, o (incertidumbre o traceback) salvo
+        # consultas generales. Se evalúa primero el mensaje del usuario (corto)
+        # para escanear la respuesta (larga) una sola vez en cualquier caso.
+        # IGNORECASE en lugar de kimi_response.lower(): sin copiar la respuesta
+        if _GENERAL_QUERY_RE.search(user_message):
+            return _SEARCH_INTENT_RE.search(kimi_response) is not None
+        if _TRACEBACK_RE.search(user_message):
+            return True
+        return _RESPONSE_SIGNAL_RE.search(kimi_response) is not None
 
     async def _search_python_sources(self, user_message: str) -> list[PythonSource]:
         """Ejecuta búsqueda Bear para cualquier pregunta Python válida."""
@@ -678,21 +1232,14 @@ class ChatServiceV2:
             return []
 
         # Determinar tipo de búsqueda basado en el contenido
-
         if "Traceback" in user_message:
             return await self.python_search.search_python_bug(user_message)
-        elif re.search(
-            r"\b(cómo usar|ejemplo|funciona)\b.*\w+\.\w+", user_message, re.IGNORECASE
-        ):
-            api_match = re.search(r"(\w+)\.(\w+)", user_message)
+        if _API_USAGE_RE.search(user_message):
+            api_match = _API_NAME_RE.search(user_message)
             if api_match:
                 module, attr = api_match.groups()
                 return await self.python_search.search_python_api(module, attr)
-        elif re.search(
-            r"\b(nueva versión|última versión|actualización|lanzamiento|release)\b.*\bpython\b",
-            user_message,
-            re.IGNORECASE,
-        ):
+        elif _VERSION_QUERY_RE.search(user_message):
             return await self.python_search.search_python_best_practice(
                 "latest python version release"
             )
@@ -702,15 +1249,7 @@ class ChatServiceV2:
 
     def _build_internet_context(self, sources: list[PythonSource]) -> str:
         """Construye el contexto para el LLM con las fuentes encontradas."""
-        lines = []
-        for source in sources:
-            lines.append(
-                f"📚 **{source.title}** ({source.source_type}, confiabilidad: {source.reliability}/10)"
-            )
-            lines.append(f"🔗 {source.url}")
-            lines.append(f"💡 {source.snippet}")
-            lines.append("")
-        return "\n".join(lines)
+        return "\n".join(_format_source(source) for source in sources)
 
     async def _get_llm_response(
         self,
@@ -722,6 +1261,64 @@ class ChatServiceV2:
         agent_mode: str,
         use_fallback_on_error: bool,
         has_rag: bool,
+    ) -> tuple[str, int | None]:
+        """
+        Respuesta del LLM, compartiendo una llamada idéntica que ya esté en curso.
+
+        La llamada corre como tarea propia protegida con `shield`: si quien la
+        lanzó se cancela (p. ej. el cliente se desconecta), los demás siguen
+        esperándola.
+        """
+        key = _llm_call_key(
+            system_prompt, history, max_tokens, temperature, agent_mode, has_rag
+        )
+        return await self._single_flight(
+            key,
+            lambda: self._call_llm(
+                system_prompt=system_prompt,
+                history=history,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                session_id=session_id,
+                agent_mode=agent_mode,
+                use_fallback_on_error=use_fallback_on_error,
+                has_rag=has_rag,
+            ),
+        )
+
+    async def _single_flight(
+        self,
+        key: str,
+        make_call: Callable[[], Coroutine[Any, Any, tuple[str, Any]]],
+    ) -> tuple[str, Any]:
+        """Espera la llamada en curso con la misma clave o lanza una nueva."""
+        call = _INFLIGHT_LLM_CALLS.get(key)
+        if call is not None:
+            logger.info("🔁 Llamada al LLM idéntica en curso: se reutiliza")
+        else:
+            call = asyncio.create_task(make_call())
+            _INFLIGHT_LLM_CALLS[key] = call
+            call.add_done_callback(lambda task: self._forget_llm_call(key, task))
+        return await asyncio.shield(call)
+
+    @staticmethod
+    def _forget_llm_call(key: str, task: asyncio.Task[tuple[str, Any]]) -> None:
+        """Saca la llamada del mapa al terminar (sus esperas ya tienen el resultado)."""
+        if _INFLIGHT_LLM_CALLS.get(key) is task:
+            del _INFLIGHT_LLM_CALLS[key]
+        if not task.cancelled():
+            task.exception()  # Marcar como recuperada aunque nadie la espere ya
+
+    async def _call_llm(
+        self,
+        system_prompt: str,
+        history: list,  # list[ChatMessage] pero evitamos import circular
+        max_tokens: int | None,
+        temperature: float | None,
+        session_id: str,
+        agent_mode: str,
+        use_fallback_on_error: bool,
+        has_rag: bool,
     ) -> tuple[str, int | None]:
         """Helper para obtener respuesta del LLM con lógica de fallback."""
         # IMPORTANTE: Sistema híbrido
@@ -9,11 +9,15 @@ Tipado estricto para mypy --strict con Python 3.12+
 
 from __future__ import annotations
 
+import logging
 from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
     from src.domain.models.file_models import FileDocument, FileSection
     from src.domain.ports import EmbeddingsPort
+    from src.domain.ports.embeddings_port import EmbeddingVector
+
+logger = logging.getLogger(__name__)
 
 
 class EmbeddingsServiceV2:
@@ -84,11 +88,34 @@ class EmbeddingsServiceV2:
         """
         Busca secciones similares a una query.
         """
+        query_embedding = await self.embed_query(query)
+        return await self.search_by_embedding(
+            query_embedding, file_id, top_k=top_k, min_similarity=min_similarity
+        )
+
+    async def embed_query(self, query: str) -> EmbeddingVector:
+        """
+        Genera el embedding de una query de búsqueda.
+
+        Separado de la búsqueda para que el llamador pueda reutilizarlo
+        (p. ej. para consultar un caché semántico antes de buscar).
+        """
         if not query or not query.strip():
             raise ValueError("La query no puede estar vacía")
 
-        query_embedding = await self.embeddings.generate_embedding(query)
+        return await self.embeddings.generate_embedding(query)
 
+    async def search_by_embedding(
+        self,
+        query_embedding: EmbeddingVector,
+        file_id: str | None,
+        *,
+        top_k: int = 10,
+        min_similarity: float = 0.0,
+    ) -> list[dict[str, Any]]:
+        """
+        Busca secciones similares a un embedding ya calculado.
+        """
         results = await self.embeddings.search_similar(
             query_embedding=query_embedding,
             file_id=file_id,
@@ -96,15 +123,22 @@ class EmbeddingsServiceV2:
             min_similarity=min_similarity,
         )
 
-        return [
-            {
-                "text": result.text,
-                "similarity": result.similarity,
-                "section_id": result.section.id,
-                "chunk_index": result.section.chunk_index,
-            }
-            for result in results
-        ]
+        # Contrato para los consumidores (prompt RAG, MMR, caché): las cuatro
+        # claves siempre presentes y 'text' nunca vacío
+        hits = []
+        for result in results:
+            if not result.text:
+                logger.warning(f"⚠️ Chunk {result.section.chunk_index} sin contenido, omitido")
+                continue
+            hits.append(
+                {
+                    "text": result.text,
+                    "similarity": result.similarity,
+                    "section_id": result.section.id,
+                    "chunk_index": result.section.chunk_index,
+                }
+            )
+        return hits
 
     async def delete_document_embeddings(self, file_id: str) -> int:
         """
@@ -3,25 +3,69 @@ Servicio de aplicación para procesar y indexar archivos.
 """
 from __future__ import annotations
 
-import io
+import asyncio
 import logging
 import os
-from typing import TYPE_CHECKING
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any
 from uuid import uuid4
 
 from fastapi import UploadFile
 from pathvalidate import sanitize_filename
 from pypdf import PdfReader
 
+try:
+    import pymupdf  # PyMuPDF: extracción de texto varias veces más rápida que pypdf
+except ImportError:
+    pymupdf = None
+
 from src.adapters.config.settings import settings
+from src.application.services.rag.context_cache import invalidate_rag_context
 from src.domain.models.file_models import FileDocument, FileStatus
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+
     from src.application.services.embeddings_service import EmbeddingsServiceV2
+    from src.application.services.rag.semantic_cache import SemanticRetrievalCache
+    from src.domain.models.file_models import FileSection
     from src.domain.ports.file_repository_port import FileRepositoryPort
 
 logger = logging.getLogger(__name__)
 
+
+@contextmanager
+def _open_pdf(path: str) -> Iterator[Any]:
+    """
+    Documento PDF abierto solo durante el bloque `with`.
+
+    Usa PyMuPDF si está instalado y pypdf si no. El documento lee del archivo
+    a demanda (no se carga entero en memoria), así que el descriptor se cierra
+    al salir del bloque: nada queda abierto entre llamadas ni se comparte
+    entre hilos (PyMuPDF no es thread-safe).
+    """
+    if pymupdf is not None:
+        with pymupdf.open(path) as doc:
+            yield doc
+        return
+    with open(path, "rb", buffering=1024 * 1024) as stream:
+        yield PdfReader(stream)
+
+
+def _page_count(doc: Any) -> int:
+    """Cantidad de páginas del documento."""
+    if isinstance(doc, PdfReader):
+        return len(doc.pages)
+    return doc.page_count
+
+
+def _page_text(doc: Any, index: int) -> str:
+    """Texto de la página `index` (base 0)."""
+    if isinstance(doc, PdfReader):
+        return doc.pages[index].extract_text() or ""
+    return doc.load_page(index).get_text("text")
+
+
 class FileProcessingService:
     """Orquesta el procesamiento, extracción de texto e indexación de archivos."""
 
@@ -29,11 +73,19 @@ class FileProcessingService:
         self,
         file_repo: FileRepositoryPort,
         embeddings_service: EmbeddingsServiceV2,
-        max_pdf_size_mb: int = 50
+        max_pdf_size_mb: int = 50,
+        semantic_cache: SemanticRetrievalCache | None = None,
     ):
         self.file_repo = file_repo
         self.embeddings_service = embeddings_service
         self.max_pdf_size_mb = max_pdf_size_mb
+        self.semantic_cache = semantic_cache
+
+    def _invalidate_rag_caches(self, file_id: int) -> None:
+        """Los chunks del archivo cambiaron o ya no existen: descartar lo cacheado."""
+        invalidate_rag_context(file_id)
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate_file(file_id)
 
     async def upload_and_save_file(self, file: UploadFile) -> FileDocument:
         filename_original = sanitize_filename(file.filename or "uploaded.pdf")
@@ -63,20 +115,23 @@ class FileProcessingService:
 
         try:
             self.file_repo.update_file_status(file_id, FileStatus.PROCESSING)
-            with open(file_doc.file_path, "rb") as f:
-                reader = PdfReader(io.BytesIO(f.read()))
-
-            total_pages = len(reader.pages)
-            self.file_repo.update_file_pages(file_id, total_pages=total_pages, pages_processed=0)
-
-            window = max(1, settings.file_chapter_max_pages)
-            sections_data = []
-            for start in range(0, total_pages, window):
-                end = min(total_pages - 1, start + window - 1)
-                text_parts = [reader.pages[i].extract_text() or "" for i in range(start, end + 1)]
-                char_count = len("\n".join(text_parts))
-                sections_data.append({"start_page": start, "end_page": end, "char_count": char_count})
-                self.file_repo.update_file_pages(file_id, total_pages, pages_processed=end + 1)
+            with _open_pdf(file_doc.file_path) as doc:
+                total_pages = _page_count(doc)
+                self.file_repo.update_file_pages(file_id, total_pages=total_pages, pages_processed=0)
+
+                window = max(1, settings.file_chapter_max_pages)
+                sections_data = []
+                for start in range(0, total_pages, window):
+                    end = min(total_pages - 1, start + window - 1)
+                    text_parts = [_page_text(doc, i) for i in range(start, end + 1)]
+                    section_text = "\n".join(text_parts).strip()
+                    sections_data.append({
+                        "start_page": start,
+                        "end_page": end,
+                        "char_count": len(section_text),  # 0 = sección sin texto
+                        "text": section_text,  # Se persiste: indexar no re-extrae
+                    })
+                    self.file_repo.update_file_pages(file_id, total_pages, pages_processed=end + 1)
 
             self.file_repo.add_sections_to_file(file_id, sections_data)
             self.file_repo.update_file_status(file_id, FileStatus.READY)
@@ -92,19 +147,21 @@ class FileProcessingService:
         if not file_doc or file_doc.status not in [FileStatus.READY, FileStatus.INDEXED]:
             raise ValueError(f"Archivo {file_id} no está listo para indexar (estado: {file_doc.status if file_doc else 'N/A'}).")
 
-        try:
-            with open(file_doc.file_path, "rb") as f:
-                reader = PdfReader(io.BytesIO(f.read()))
-        except Exception as e:
-            raise OSError(f"No se pudo leer el archivo físico {file_doc.file_path}: {e}") from e
-
         sections = self.file_repo.get_file_sections(file_id)
         if not sections:
             raise ValueError(f"El archivo {file_id} no tiene secciones para procesar.")
 
-        for section in sections:
-            text_parts = [reader.pages[i].extract_text() or "" for i in range(section.page_number, section.page_number + 1)]
-            section.text = "\n".join(text_parts).strip()
+        # El texto se extrajo al seccionar; solo las secciones anteriores a esa
+        # columna (sin texto guardado) obligan a abrir y parsear el PDF. Con
+        # char_count 0 no hay nada que extraer (p. ej. páginas escaneadas)
+        legacy_sections = [sec for sec in sections if not sec.text and sec.char_count > 0]
+        if legacy_sections:
+            # Parseo y extracción son CPU: en un hilo para no bloquear el event loop.
+            # Uno solo: ni pypdf (Python puro) ni PyMuPDF (no thread-safe) ganan
+            # repartiendo páginas del mismo documento entre hilos
+            await asyncio.to_thread(
+                self._extract_legacy_sections, file_doc.file_path, legacy_sections
+            )
 
         valid_sections = [sec for sec in sections if sec.text]
         if not valid_sections:
@@ -120,6 +177,20 @@ class FileProcessingService:
             self.file_repo.update_file_status(file_id, FileStatus.ERROR, str(e))
             logger.error(f"Error al indexar el archivo {file_id}: {e}", exc_info=True)
             raise
+        finally:
+            # Los chunks cambiaron: el contexto RAG cacheado del archivo ya no vale
+            self._invalidate_rag_caches(file_id)
+
+    @staticmethod
+    def _extract_legacy_sections(path: str, sections: list[FileSection]) -> None:
+        """Completa el texto de secciones sin texto guardado leyendo el PDF."""
+        try:
+            with _open_pdf(path) as doc:
+                for section in sections:
+                    text_parts = [_page_text(doc, i) for i in range(section.page_number, section.page_number + 1)]
+                    section.text = "\n".join(text_parts).strip()
+        except Exception as e:
+            raise OSError(f"No se pudo leer el archivo físico {path}: {e}") from e
 
     def get_file_status(self, file_id: int) -> FileDocument | None:
         return self.file_repo.get_file(file_id)
@@ -147,6 +218,7 @@ class FileProcessingService:
             logger.info(f"Embeddings eliminados para file_id={file_id}")
         except Exception as e:
             logger.warning(f"Error al eliminar embeddings de file_id={file_id}: {e}")
+        self._invalidate_rag_caches(file_id)
 
         # Eliminar archivo físico si existe
         file_doc = self.file_repo.get_file(file_id)
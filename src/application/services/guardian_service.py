@@ -10,7 +10,7 @@ Esto evita bloquear el chat si la API de terceros falla.
 import hashlib
 import logging
 import time
-from collections import deque
+from collections import OrderedDict, deque
 
 from src.domain.exceptions.guardian_exceptions import (
     MessageBlockedException,
@@ -25,7 +25,7 @@ class GuardianService:
     Servicio de aplicación que gestiona el Guardian con:
     - Heurísticas rápidas (pre-filtrado) — Siempre activo
     - LLM check opcional — Solo si guardian_llm_enabled=True
-    - Caché local
+    - Caché local (LRU + TTL; los veredictos fallback no se cachean)
     - Rate limiting
     - Métricas detalladas
 
@@ -67,14 +67,16 @@ class GuardianService:
         cache_ttl: int = 3600,
         min_length_to_check: int = 20,
         llm_enabled: bool = False,
+        cache_max_entries: int = 10_000,
     ):
         self.client = guardian_client
         self.max_calls = max_calls_per_minute
         self.cache_ttl = cache_ttl
+        self.cache_max_entries = cache_max_entries
         self.min_length = min_length_to_check
         self.llm_enabled = llm_enabled
 
-        self.cache: dict[str, tuple[GuardianResult, float]] = {}
+        self.cache: OrderedDict[str, tuple[GuardianResult, float]] = OrderedDict()
         self.call_timestamps: deque[float] = deque(maxlen=max_calls_per_minute)
 
         self.metrics = {
@@ -93,6 +95,17 @@ class GuardianService:
     def _is_cache_valid(self, timestamp: float) -> bool:
         return (time.time() - timestamp) < self.cache_ttl
 
+    def _store_in_cache(self, cache_key: str, result: GuardianResult) -> None:
+        """Guarda un veredicto, evictando el menos usado si se supera el límite."""
+        if result.confidence <= 0.0:
+            # Fallback del cliente (API caída, circuito abierto): el próximo
+            # intento debe volver a consultar en vez de quedar aprobado por el TTL
+            return
+        self.cache[cache_key] = (result, time.time())
+        self.cache.move_to_end(cache_key)
+        while len(self.cache) > self.cache_max_entries:
+            self.cache.popitem(last=False)
+
     def _can_call_llm(self) -> bool:
         now = time.time()
         while self.call_timestamps and now - self.call_timestamps[0] > 60:
@@ -147,14 +160,16 @@ class GuardianService:
             result, timestamp = self.cache[cache_key]
             if self._is_cache_valid(timestamp):
                 self.metrics["cache_hits"] += 1
+                self.cache.move_to_end(cache_key)
                 return result
+            del self.cache[cache_key]  # Expirada: liberar la entrada
 
         self.metrics["cache_misses"] += 1
 
         # Heurísticas siempre activas
         heuristic_result = self._check_heuristics(text)
         if heuristic_result and not heuristic_result.is_safe:
-            self.cache[cache_key] = (heuristic_result, time.time())
+            self._store_in_cache(cache_key, heuristic_result)
             return heuristic_result
 
         # Si LLM está deshabilitado, heurísticas bastan → permitir
@@ -183,7 +198,7 @@ class GuardianService:
         try:
             logger.info(f"Guardian LLM check (user: {user_id})")
             result = await self.client.check_message(text, user_id)
-            self.cache[cache_key] = (result, time.time())
+            self._store_in_cache(cache_key, result)
             return result
         except Exception as e:
             self.metrics["llm_errors"] += 1
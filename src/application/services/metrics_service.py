@@ -1,21 +1,44 @@
 """Servicio para registrar y consultar métricas de agentes."""
+import asyncio
+import logging
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from src.domain.ports.metrics_port import MetricsRepositoryPort
 
+logger = logging.getLogger(__name__)
+
 
 class MetricsService:
     """Servicio para gestión de métricas."""
 
-    def __init__(self, repository: MetricsRepositoryPort):
+    def __init__(
+        self,
+        repository: MetricsRepositoryPort,
+        *,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_pending: int = 10_000,
+    ):
         """
         Inicializar servicio de métricas.
 
         Args:
             repository: Implementación del repositorio de métricas
+            batch_size: Máximo de métricas encoladas por escritura en lote
+            flush_interval: Segundos máximos que una métrica espera en la cola
+            max_pending: Tamaño máximo de la cola (al llenarse se descartan)
         """
         self.repository = repository
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        # Cola y worker se crean con el primer `enqueue_agent_usage`,
+        # ligados al event loop en el que se usan
+        self._queue: asyncio.Queue[dict[str, Any]] | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self._worker_loop: asyncio.AbstractEventLoop | None = None
 
     def record_agent_usage(
         self,
@@ -52,26 +75,15 @@ class MetricsService:
         """
         total_tokens = prompt_tokens + completion_tokens
 
-        # Calcular costo estimado (precios aproximados)
-        # Kimi: $0.0003 / 1K tokens
-        # Gemini: $0.00015 / 1K tokens (input), $0.0006 / 1K tokens (output)
-        if "kimi" in model_name.lower():
-            estimated_cost = (total_tokens / 1000) * 0.0003
-        elif "gemini" in model_name.lower():
-            estimated_cost = (
-                (prompt_tokens / 1000) * 0.00015 +
-                (completion_tokens / 1000) * 0.0006
-            )
-        else:
-            estimated_cost = (total_tokens / 1000) * 0.0005  # Default
-
         saved_metric = self.repository.create_and_save_metric(
             session_id=session_id,
             agent_mode=agent_mode,
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
             total_tokens=total_tokens,
-            estimated_cost=estimated_cost,
+            estimated_cost=self._estimate_cost(
+                model_name, prompt_tokens, completion_tokens
+            ),
             response_time=response_time,
             model_name=model_name,
             has_rag_context=has_rag_context,
@@ -87,6 +99,134 @@ class MetricsService:
 
         return saved_metric
 
+    def enqueue_agent_usage(
+        self,
+        session_id: str,
+        agent_mode: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        response_time: float,
+        model_name: str,
+        has_rag_context: bool = False,
+        rag_chunks_used: int = 0,
+        file_id: str | None = None,
+        used_bear_search: bool = False,
+        bear_sources_count: int = 0
+    ) -> None:
+        """
+        Encolar el uso de un agente para registrarlo en segundo plano.
+
+        Mismos argumentos que `record_agent_usage`, pero no toca la BD: un
+        worker agrupa las métricas y las guarda con `record_agent_usage_bulk`
+        (un INSERT por lote y un único recálculo del resumen diario).
+        Debe llamarse desde un event loop en ejecución.
+        """
+        queue = self._ensure_worker()
+        total_tokens = prompt_tokens + completion_tokens
+        try:
+            queue.put_nowait({
+                "session_id": session_id,
+                "agent_mode": agent_mode,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": total_tokens,
+                "estimated_cost": self._estimate_cost(
+                    model_name, prompt_tokens, completion_tokens
+                ),
+                "response_time": response_time,
+                "model_name": model_name,
+                "has_rag_context": has_rag_context,
+                "rag_chunks_used": rag_chunks_used,
+                "file_id": file_id,
+                "used_bear_search": used_bear_search,
+                "bear_sources_count": bear_sources_count,
+                # Hora de la petición, no la de la escritura del lote
+                "created_at": datetime.now(UTC),
+            })
+        except asyncio.QueueFull:
+            logger.warning(
+                f"⚠️ Cola de métricas llena ({self.max_pending}): métrica descartada"
+            )
+
+    def record_agent_usage_bulk(self, metrics: list[dict[str, Any]]) -> None:
+        """
+        Guardar un lote de métricas ya calculadas y actualizar sus resúmenes diarios.
+
+        Args:
+            metrics: Campos de cada métrica (los que arma `enqueue_agent_usage`)
+        """
+        if not metrics:
+            return
+        self.repository.save_metrics_bulk(metrics)
+        # Un recálculo por día afectado, no uno por métrica
+        for day in sorted({m["created_at"].strftime("%Y-%m-%d") for m in metrics}):
+            self.repository.update_daily_summary(day)
+
+    async def aclose(self) -> None:
+        """Escribir las métricas pendientes y detener el worker."""
+        if self._worker is None or self._worker_loop is not asyncio.get_running_loop():
+            return
+        assert self._queue is not None
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._queue = self._worker = self._worker_loop = None
+
+    def _ensure_worker(self) -> "asyncio.Queue[dict[str, Any]]":
+        """Crea la cola y el worker en el loop actual si aún no existen."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._worker_loop is not loop or self._worker.done():
+            if self._worker_loop is not loop:
+                self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._worker_loop = loop
+            self._worker = loop.create_task(self._metrics_worker())
+        return self._queue
+
+    async def _metrics_worker(self) -> None:
+        """Agrupa métricas hasta `batch_size` o `flush_interval` y las escribe juntas."""
+        assert self._queue is not None
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(self.record_agent_usage_bulk, batch)
+                logger.debug(f"📊 Lote de métricas guardado: {len(batch)}")
+            except Exception as e:
+                logger.exception(f"❌ Error guardando lote de métricas: {e}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    @staticmethod
+    def _estimate_cost(
+        model_name: str, prompt_tokens: int, completion_tokens: int
+    ) -> float:
+        """Costo estimado en USD (precios aproximados)."""
+        total_tokens = prompt_tokens + completion_tokens
+        # Kimi: $0.0003 / 1K tokens
+        # Gemini: $0.00015 / 1K tokens (input), $0.0006 / 1K tokens (output)
+        if "kimi" in model_name.lower():
+            return (total_tokens / 1000) * 0.0003
+        if "gemini" in model_name.lower():
+            return (
+                (prompt_tokens / 1000) * 0.00015 +
+                (completion_tokens / 1000) * 0.0006
+            )
+        return (total_tokens / 1000) * 0.0005  # Default
+
     def record_error(
         self,
         error_type: str,
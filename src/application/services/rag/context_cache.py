@@ -0,0 +1,60 @@
+"""
+Caché del contexto RAG ya armado, compartido entre requests.
+
+Clave: (archivo, hash de la consulta normalizada, top_k, límite). Una pregunta
+repetida sobre el mismo documento (otra sesión, un reintento) no paga
+embedding, búsqueda vectorial, rerank ni selección de snippets. Vive a nivel
+de módulo porque ChatServiceV2 se crea por request; LRU + TTL, y las entradas
+de un archivo se descartan al reindexarlo o borrarlo.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+
+RagContextKey = tuple[str, str, int, int]
+
+_RAG_CONTEXT_CACHE: OrderedDict[RagContextKey, tuple[str, int, float]] = OrderedDict()
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def rag_context_key(
+    file_id: int, user_message: str, top_k: int, limit: int
+) -> RagContextKey:
+    """Clave exacta: hash del mensaje completo con espacios colapsados y en minúsculas."""
+    normalized = _WHITESPACE_RE.sub(" ", user_message.strip().lower())
+    digest = hashlib.sha256(normalized.encode()).hexdigest()
+    return str(file_id), digest, top_k, limit
+
+
+def get_cached_rag_context(key: RagContextKey, ttl: float) -> tuple[str, int] | None:
+    """(contexto, cantidad de chunks) si la entrada sigue vigente."""
+    entry = _RAG_CONTEXT_CACHE.get(key)
+    if entry is None:
+        return None
+    context, chunks_count, stored_at = entry
+    if time.monotonic() - stored_at >= ttl:
+        del _RAG_CONTEXT_CACHE[key]
+        return None
+    _RAG_CONTEXT_CACHE.move_to_end(key)
+    return context, chunks_count
+
+
+def store_rag_context(
+    key: RagContextKey, context: str, chunks_count: int, max_entries: int
+) -> None:
+    """Guarda un contexto, evictando el menos usado si se supera el límite."""
+    _RAG_CONTEXT_CACHE[key] = (context, chunks_count, time.monotonic())
+    _RAG_CONTEXT_CACHE.move_to_end(key)
+    while len(_RAG_CONTEXT_CACHE) > max_entries:
+        _RAG_CONTEXT_CACHE.popitem(last=False)
+
+
+def invalidate_rag_context(file_id: int) -> None:
+    """Descarta los contextos de un archivo (sus chunks cambiaron o ya no existen)."""
+    file_key = str(file_id)
+    for key in [k for k in _RAG_CONTEXT_CACHE if k[0] == file_key]:
+        del _RAG_CONTEXT_CACHE[key]
@@ -0,0 +1,70 @@
+"""
+Rerank MMR (Maximal Marginal Relevance) de los chunks recuperados.
+
+Se recupera un conjunto amplio de candidatos y se eligen los `final_k` que
+maximizan `λ·relevancia − (1−λ)·redundancia`, así los chunks casi duplicados
+no gastan el presupuesto de contexto. La relevancia es la similitud coseno
+con la consulta que ya devuelve la búsqueda vectorial; la redundancia entre
+chunks es la similitud de Jaccard de sus vocabularios (no hace falta traer
+los embeddings de la BD).
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _vocabulary(text: str) -> frozenset[str]:
+    """Conjunto de palabras (en minúsculas) de un chunk."""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+def _jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    """Similitud de Jaccard entre dos vocabularios."""
+    if not a or not b:
+        return 0.0
+    intersection = len(a & b)
+    return intersection / (len(a) + len(b) - intersection)
+
+
+def rerank_mmr(
+    results: list[dict[str, Any]],
+    *,
+    final_k: int,
+    lambda_: float = 0.7,
+) -> list[dict[str, Any]]:
+    """
+    Selecciona hasta `final_k` chunks relevantes y diversos.
+
+    Args:
+        results: Chunks con 'text' y 'similarity' (coseno con la consulta)
+        final_k: Cantidad máxima de chunks a conservar
+        lambda_: Peso de la relevancia frente a la diversidad (1.0 = solo relevancia)
+
+    Returns:
+        Chunks elegidos en orden de selección
+    """
+    if len(results) <= final_k:
+        return results
+
+    vocabularies = [_vocabulary(r["text"]) for r in results]
+    relevance = [float(r["similarity"]) for r in results]
+    # Máxima similitud de cada candidato con los ya elegidos (se actualiza incrementalmente)
+    redundancy = [0.0] * len(results)
+    remaining = set(range(len(results)))
+    selected: list[int] = []
+
+    while remaining and len(selected) < final_k:
+        best = max(
+            remaining,
+            key=lambda i: (lambda_ * relevance[i] - (1 - lambda_) * redundancy[i], -i),
+        )
+        remaining.discard(best)
+        selected.append(best)
+        for i in remaining:
+            redundancy[i] = max(redundancy[i], _jaccard(vocabularies[i], vocabularies[best]))
+
+    return [results[i] for i in selected]
@@ -0,0 +1,185 @@
+"""
+Caché semántico por embedding.
+
+Reutiliza un valor calculado para consultas casi idénticas (coseno >= umbral)
+dentro del mismo ámbito: los chunks recuperados por sesión y documento
+(`SemanticRetrievalCache`) o las respuestas del LLM por system prompt. Usa LSH
+con hiperplanos aleatorios (varias tablas de pocos bits) para que cada consulta
+solo se compare contra los candidatos de sus buckets, no contra todo el caché.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+logger = logging.getLogger(__name__)
+
+type Scope = tuple[str, str]  # p. ej. (session_id, file_id)
+type BucketKey = tuple[Scope, int, int]  # (ámbito, tabla, firma)
+
+
+@dataclass(slots=True)
+class _Entry[T]:
+    """Valor cacheado con su embedding normalizado."""
+
+    scope: Scope
+    embedding: npt.NDArray[np.float32]
+    value: T
+    stored_at: float
+    buckets: tuple[BucketKey, ...]  # Para desindexarla al evictarla o expirar
+
+
+class SemanticCache[T]:
+    """
+    Caché LSH de valores indexados por embedding.
+
+    Cada tabla hashea el embedding con `bits_per_table` hiperplanos; dos
+    consultas con coseno alto colisionan en al menos una tabla con alta
+    probabilidad, y la similitud exacta se verifica antes de reutilizar.
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.95,
+        ttl: float = 600.0,
+        max_entries: int = 1024,
+        num_tables: int = 4,
+        bits_per_table: int = 8,
+        seed: int = 0,
+    ) -> None:
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.num_tables = num_tables
+        self.bits_per_table = bits_per_table
+
+        self._rng = np.random.default_rng(seed)
+        self._planes: npt.NDArray[np.float32] | None = None  # Se crean con la 1ª dimensión vista
+        self._bit_weights = 1 << np.arange(bits_per_table)
+        self._entries: OrderedDict[int, _Entry[T]] = OrderedDict()
+        self._buckets: dict[BucketKey, list[int]] = {}
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scope_a: str, scope_b: str, embedding: npt.ArrayLike) -> T | None:
+        """Devuelve el valor de una consulta casi idéntica del ámbito, si lo hay."""
+        vector = self._normalize(embedding)
+        scope = (scope_a, scope_b)
+        now = time.monotonic()
+
+        live: list[_Entry[T]] = []
+        for entry_id in self._candidates(scope, vector):
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                continue
+            if now - entry.stored_at >= self.ttl:
+                self._discard(entry_id)
+                continue
+            live.append(entry)
+
+        if not live:
+            self.misses += 1
+            return None
+
+        # Vectores unitarios: todos los cosenos en un solo producto matriz-vector
+        similarities = np.stack([entry.embedding for entry in live]) @ vector
+        best_index = int(similarities.argmax())
+        best_similarity = float(similarities[best_index])
+        if best_similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        logger.debug(f"Caché semántico: hit (coseno={best_similarity:.3f})")
+        return live[best_index].value
+
+    def put(
+        self, scope_a: str, scope_b: str, embedding: npt.ArrayLike, value: T
+    ) -> None:
+        """Guarda un valor indexado por su embedding dentro del ámbito."""
+        vector = self._normalize(embedding)
+        scope = (scope_a, scope_b)
+        entry_id = self._next_id
+        self._next_id += 1
+
+        buckets = tuple(
+            (scope, table, signature)
+            for table, signature in enumerate(self._signatures(vector))
+        )
+        self._entries[entry_id] = _Entry(scope, vector, value, time.monotonic(), buckets)
+        for key in buckets:
+            self._buckets.setdefault(key, []).append(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+
+    def discard_where(self, predicate: Callable[[Scope], bool]) -> None:
+        """Descarta las entradas cuyo ámbito cumple `predicate`."""
+        for entry_id in [i for i, e in self._entries.items() if predicate(e.scope)]:
+            self._discard(entry_id)
+
+    def clear(self) -> None:
+        """Vacía el caché."""
+        self._entries.clear()
+        self._buckets.clear()
+
+    def _discard(self, entry_id: int) -> None:
+        """Quita una entrada y su id de cada bucket (los buckets vacíos se borran)."""
+        entry = self._entries.pop(entry_id)
+        for key in entry.buckets:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            bucket.remove(entry_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def _candidates(self, scope: Scope, vector: npt.NDArray[np.float32]) -> set[int]:
+        """Ids de las entradas que comparten bucket en alguna tabla."""
+        candidates: set[int] = set()
+        for table, signature in enumerate(self._signatures(vector)):
+            candidates.update(self._buckets.get((scope, table, signature), ()))
+        return candidates
+
+    def _signatures(self, vector: npt.NDArray[np.float32]) -> list[int]:
+        """Firma LSH (un entero de `bits_per_table` bits) por tabla."""
+        if self._planes is None or self._planes.shape[1] != vector.shape[0]:
+            if self._planes is not None:
+                self.clear()  # Cambió el modelo de embeddings: firmas incompatibles
+            self._planes = self._rng.standard_normal(
+                (self.num_tables * self.bits_per_table, vector.shape[0])
+            ).astype(np.float32)
+        bits = (self._planes @ vector > 0).reshape(self.num_tables, self.bits_per_table)
+        return [int(signature) for signature in bits @ self._bit_weights]
+
+    @staticmethod
+    def _normalize(embedding: npt.ArrayLike) -> npt.NDArray[np.float32]:
+        """Vector unitario float32 (el coseno pasa a ser un producto punto)."""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+
+class SemanticRetrievalCache(SemanticCache[list[dict[str, Any]]]):
+    """
+    Caché de resultados de búsqueda vectorial RAG.
+
+    Ámbito `(session_id, file_id)`: una recuperación solo se reutiliza en la
+    misma sesión y el mismo documento.
+    """
+
+    def invalidate_file(self, file_id: int | str) -> None:
+        """Descarta las recuperaciones de un documento reindexado o borrado."""
+        file_key = str(file_id)
+        self.discard_where(lambda scope: scope[1] == file_key)
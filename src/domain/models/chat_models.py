@@ -24,7 +24,7 @@ class MessageRole(str, Enum):
     TOOL = "tool"
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessage:
     """Representa un mensaje en una conversación."""
 
@@ -38,7 +38,7 @@ class ChatMessage:
 
     def __post_init__(self) -> None:
         """Validación después de inicialización."""
-        if not self.content.strip():
+        if not self.content or self.content.isspace():
             raise ValueError("El contenido del mensaje no puede estar vacío")
 
         if len(self.content) > 100000:  # Límite razonable
@@ -88,7 +88,7 @@ class ChatSession:
 
     def __post_init__(self) -> None:
         """Validación después de inicialización."""
-        if not self.user_id.strip():
+        if not self.user_id or self.user_id.isspace():
             raise ValueError("El ID de usuario no puede estar vacío")
 
         if self.session_name and len(self.session_name) > 200:
@@ -156,7 +156,7 @@ class ChatSession:
 # ============================================================================
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatSessionCreate:
     """DTO para crear una nueva sesión de chat."""
 
@@ -166,14 +166,14 @@ class ChatSessionCreate:
 
     def __post_init__(self) -> None:
         """Validación después de inicialización."""
-        if not self.title.strip():
+        if not self.title or self.title.isspace():
             raise ValueError("El título no puede estar vacío")
 
         if len(self.title) > 200:
             raise ValueError("El título es demasiado largo")
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessageCreate:
     """DTO para crear un nuevo mensaje."""
 
@@ -185,7 +185,7 @@ class ChatMessageCreate:
 
     def __post_init__(self) -> None:
         """Validación después de inicialización."""
-        if not self.content.strip():
+        if not self.content or self.content.isspace():
             raise ValueError("El contenido no puede estar vacío")
 
         if len(self.content) > 100000:
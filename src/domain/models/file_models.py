@@ -63,6 +63,7 @@ class FileSection:
     text: str
     page_number: int | None = None
     chunk_index: int = 0
+    char_count: int = 0  # Caracteres extraídos al seccionar (0 = sin texto)
 
     def __post_init__(self) -> None:
         """Validación después de inicialización."""
@@ -4,6 +4,7 @@ Modelo de dominio para usuarios del sistema.
 Define la entidad User con sus atributos y validaciones.
 """
 
+from dataclasses import dataclass
 from datetime import UTC, datetime
 
 from sqlmodel import Field, SQLModel
@@ -86,3 +87,36 @@ class TokenResponse(SQLModel):
     access_token: str
     token_type: str = "bearer"
     user: UserResponse
+
+
+@dataclass(slots=True, frozen=True)
+class AuthUserDTO:
+    """Datos públicos del usuario devueltos por los casos de uso de auth."""
+
+    id: int
+    email: str
+    full_name: str | None
+    is_active: bool
+    is_superuser: bool
+    created_at: datetime | None
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthUserDTO":
+        """Proyecta la entidad User (sin contraseña)."""
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            is_active=user.is_active,
+            is_superuser=user.is_superuser,
+            created_at=user.created_at,
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class AuthResponseDTO:
+    """Resultado de registro/login: usuario y token de acceso."""
+
+    user: AuthUserDTO
+    access_token: str
+    token_type: str = "bearer"
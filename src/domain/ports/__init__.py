@@ -10,12 +10,14 @@ from __future__ import annotations
 from .embeddings_port import EmbeddingsPort
 from .file_repository_port import FileRepositoryPort
 from .guardian_port import GuardianPort, GuardianResult, ThreatLevel
-from .llm_port import LLMPort
+from .llm_port import LLMPort, ToolHandler, ToolSpec
 from .python_search_port import PythonSearchPort, PythonSource
 from .repository_port import ChatRepositoryPort
 
 __all__ = [
     "LLMPort",
+    "ToolHandler",
+    "ToolSpec",
     "ChatRepositoryPort",
     "EmbeddingsPort",
     "FileRepositoryPort",
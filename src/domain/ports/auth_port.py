@@ -69,6 +69,13 @@ class UserRepositoryPort(ABC):
         """Crea un nuevo usuario."""
         pass
 
+    @abstractmethod
+    def create_if_absent(
+        self, email: str, hashed_password: str, full_name: str | None = None
+    ) -> User | None:
+        """Crea un usuario de forma atómica; retorna None si el email ya existe."""
+        pass
+
     @abstractmethod
     def get_by_email(self, email: str) -> User | None:
         """Obtiene un usuario por email."""
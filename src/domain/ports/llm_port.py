@@ -8,12 +8,27 @@ de LLM (Groq, Gemini, OpenAI, etc.).
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
 
 if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
     from ..models.chat_models import ChatMessage
 
 type TokenCount = int
+# Ejecuta una herramienta pedida por el modelo: (nombre, argumentos) -> resultado
+type ToolHandler = Callable[[str, dict[str, Any]], Awaitable[str]]
+
+
+@dataclass(frozen=True, slots=True)
+class ToolSpec:
+    """Herramienta que el modelo puede invocar durante la generación."""
+
+    name: str
+    description: str
+    parameters: dict[str, Any]  # JSON Schema de los argumentos
 
 
 class LLMPort(ABC):
@@ -29,6 +44,9 @@ class LLMPort(ABC):
         - OpenAIAdapter: Usa la API de OpenAI
     """
 
+    # Los adaptadores que implementan `get_chat_completion_with_tools` lo activan
+    supports_tools: bool = False
+
     @abstractmethod
     async def get_chat_completion(
         self,
@@ -62,26 +80,65 @@ class LLMPort(ABC):
         """
         ...
 
+    async def get_chat_completion_with_tools(
+        self,
+        system_prompt: str,
+        messages: list[ChatMessage],
+        *,
+        tools: list[ToolSpec],
+        tool_handler: ToolHandler,
+        max_tokens: int | None = None,
+        temperature: float | None = None,
+        session_id: str | None = None,
+        agent_mode: str | None = None,
+    ) -> tuple[str, TokenCount | None]:
+        """
+        Obtiene una respuesta dejando que el modelo invoque herramientas.
+
+        Si el modelo pide herramientas, se ejecutan con `tool_handler` y sus
+        resultados vuelven al modelo para la respuesta final. Opcional: solo
+        los adaptadores con `supports_tools = True` lo implementan.
+
+        Args:
+            system_prompt: Prompt del sistema
+            messages: Historial de mensajes
+            tools: Herramientas disponibles
+            tool_handler: Ejecutor de las herramientas pedidas
+            max_tokens: Número máximo de tokens
+            temperature: Temperatura del modelo
+            session_id: ID de sesión para caché de prompts
+            agent_mode: Modo del agente (architect, code_generator, etc.)
+
+        Returns:
+            Tupla con (respuesta_final, tokens_consumidos)
+
+        Raises:
+            NotImplementedError: Si el proveedor no soporta herramientas
+        """
+        raise NotImplementedError(f"{type(self).__name__} no soporta herramientas")
+
     @abstractmethod
-    async def get_chat_completion_stream(
+    def get_chat_completion_stream(
         self,
         system_prompt: str,
         messages: list[ChatMessage],
         *,
         max_tokens: int | None = None,
         temperature: float | None = None,
-    ) -> str:  # AsyncIterator[str] en el futuro
+    ) -> AsyncIterator[str]:
         """
         Obtiene una respuesta del modelo en modo streaming.
 
+        Las implementaciones son generadores asíncronos (`async def` + `yield`).
+
         Args:
             system_prompt: Prompt del sistema
             messages: Historial de mensajes
             max_tokens: Número máximo de tokens
             temperature: Temperatura del modelo
 
-        Returns:
-            Respuesta completa del LLM (streaming en futuro)
+        Yields:
+            Fragmentos de la respuesta a medida que el proveedor los genera
 
         Raises:
             LLMError: Si hay un error en la comunicación
@@ -32,6 +32,11 @@ class MetricsRepositoryPort(ABC):
         """Guardar una métrica."""
         pass
 
+    @abstractmethod
+    def save_metrics_bulk(self, metrics: list[dict[str, Any]]) -> None:
+        """Guardar varias métricas (campos de `create_and_save_metric`) en una transacción."""
+        pass
+
     @abstractmethod
     def create_and_save_error(
         self,
@@ -21,3 +21,7 @@ class PythonSearchPort(ABC):
     async def search_python_best_practice(self, topic: str) -> list[PythonSource]:
         """Busca best-practices / PEPs / guías oficiales."""
         pass
+
+    async def aclose(self) -> None:
+        """Libera los recursos del adaptador (p. ej. conexiones HTTP). Por defecto, nada."""
+        return None
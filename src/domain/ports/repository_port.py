@@ -56,6 +56,16 @@ class ChatRepositoryPort(ABC):
         """
         ...
 
+    @abstractmethod
+    def list_sessions_with_counts(
+        self,
+        user_id: str,
+        *,
+        limit: int = 50,
+    ) -> list[tuple[ChatSession, int]]:
+        """Lista las sesiones (con mensajes) de un usuario y su conteo, más recientes primero."""
+        ...
+
     @abstractmethod
     def update_session(
         self,
@@ -86,6 +96,13 @@ class ChatRepositoryPort(ABC):
         """Obtiene los mensajes de una sesión."""
         ...
 
+    @abstractmethod
+    def get_recent_session_messages(
+        self, session_id: str, *, limit: int
+    ) -> list[ChatMessage]:
+        """Obtiene los últimos `limit` mensajes de una sesión en orden cronológico."""
+        ...
+
     @abstractmethod
     def get_message(self, message_id: int) -> ChatMessage | None:
         """Obtiene un mensaje por su ID."""
@@ -95,3 +112,8 @@ class ChatRepositoryPort(ABC):
     def count_session_messages(self, session_id: str) -> int:
         """Cuenta los mensajes de una sesión."""
         ...
+
+    @abstractmethod
+    def count_messages_for_sessions(self, session_ids: list[str]) -> dict[str, int]:
+        """Cuenta los mensajes de varias sesiones en una sola consulta."""
+        ...
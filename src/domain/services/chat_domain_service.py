@@ -118,9 +118,10 @@ class ChatDomainService:
 
         total_sessions = len(user_sessions)
         active_sessions = len([s for s in user_sessions if s.is_active])
-        total_messages = sum(
-            self.chat_repository.count_session_messages(s.id) for s in user_sessions
+        counts = self.chat_repository.count_messages_for_sessions(
+            [str(s.id) for s in user_sessions]
         )
+        total_messages = sum(counts.values())
 
         return {
             "user_id": user_id,
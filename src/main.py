@@ -26,7 +26,12 @@ from src.adapters.api.exception_handlers import register_exception_handlers
 from src.adapters.api.middleware.guardian_middleware import GuardianMiddleware
 from src.adapters.config.settings import settings
 from src.adapters.db.database import create_db_and_tables
-from src.adapters.dependencies import get_guardian_service_for_middleware
+from src.adapters.dependencies import (
+    get_guardian_client,
+    get_guardian_service_for_middleware,
+    get_metrics_service,
+    get_python_search_tool,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -48,6 +53,9 @@ async def lifespan(app: FastAPI):
 
     yield
     logger.info("Apagando aplicación...")
+    await get_metrics_service().aclose()  # Escribir métricas aún encoladas
+    await get_python_search_tool().aclose()
+    await get_guardian_client().close()
 
 
 # Configurar Rate Limiter
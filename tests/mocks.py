@@ -50,6 +50,15 @@ class MockRepositoryPort(ChatRepositoryPort):
     
     def list_sessions(self, limit: int = 50) -> List[ChatSession]:
         return list(self.sessions.values())[:limit]
+
+    def list_sessions_with_counts(
+        self, user_id: str, *, limit: int = 50
+    ) -> list[tuple[ChatSession, int]]:
+        return [
+            (s, len(self.messages.get(str(s.id), [])))
+            for s in self.sessions.values()
+            if s.user_id == user_id and self.messages.get(str(s.id))
+        ][:limit]
     
     def add_message(self, message_data) -> ChatMessage:
         message = ChatMessage(
@@ -70,6 +79,9 @@ class MockRepositoryPort(ChatRepositoryPort):
             return messages[-limit:]
         return messages
 
+    def get_recent_session_messages(self, session_id: str, *, limit: int) -> list[ChatMessage]:
+        return self.messages.get(session_id, [])[-limit:]
+
     def update_session(self, session_id: str, *, title: str | None = None) -> ChatSession:
         session = self.sessions[session_id]
         if title:
@@ -91,3 +103,6 @@ class MockRepositoryPort(ChatRepositoryPort):
 
     def count_session_messages(self, session_id: str) -> int:
         return len(self.messages.get(session_id, []))
+
+    def count_messages_for_sessions(self, session_ids: list[str]) -> dict[str, int]:
+        return {sid: len(self.messages.get(sid, [])) for sid in session_ids}
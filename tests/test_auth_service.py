@@ -0,0 +1,157 @@
+"""Test suite para AuthService (registro y login asíncronos)."""
+from datetime import UTC, datetime
+
+import pytest
+
+from src.adapters.security.argon2_hasher import Argon2PasswordHasher
+from src.adapters.security.jwt_token_service import JWTTokenService
+from src.application.services.auth_service import AuthService
+from src.domain.models.user import User
+from src.domain.ports.auth_port import UserRepositoryPort
+
+
+class InMemoryUserRepository(UserRepositoryPort):
+    """Repositorio de usuarios en memoria para tests."""
+
+    def __init__(self) -> None:
+        self.users: dict[str, User] = {}
+        self.updates = 0
+
+    def create(
+        self, email: str, hashed_password: str, full_name: str | None = None
+    ) -> User:
+        user = User(
+            id=len(self.users) + 1,
+            email=email,
+            hashed_password=hashed_password,
+            full_name=full_name,
+            created_at=datetime.now(UTC),
+        )
+        self.users[email] = user
+        return user
+
+    def create_if_absent(
+        self, email: str, hashed_password: str, full_name: str | None = None
+    ) -> User | None:
+        if email in self.users:
+            return None
+        return self.create(email, hashed_password, full_name)
+
+    def get_by_email(self, email: str) -> User | None:
+        return self.users.get(email)
+
+    def get_by_id(self, user_id: int) -> User | None:
+        return next((u for u in self.users.values() if u.id == user_id), None)
+
+    def exists_by_email(self, email: str) -> bool:
+        return email in self.users
+
+    def update(self, user: User) -> User:
+        self.updates += 1
+        self.users[user.email] = user
+        return user
+
+
+@pytest.fixture
+def auth_service():
+    """AuthService con hasher barato y repositorio en memoria."""
+    return AuthService(
+        password_hasher=Argon2PasswordHasher(time_cost=1, memory_cost=1024, parallelism=1),
+        token_service=JWTTokenService(secret_key="test_secret_key_123"),
+        user_repository=InMemoryUserRepository(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_register_y_login(auth_service):
+    """Registro seguido de login devuelve tokens válidos."""
+    registered = await auth_service.register_user("user@example.com", "password123")
+    assert registered.user.email == "user@example.com"
+
+    logged = await auth_service.login_user("user@example.com", "password123")
+    decoded = auth_service.verify_token(logged.access_token)
+    assert decoded["email"] == "user@example.com"
+
+
+@pytest.mark.asyncio
+async def test_register_email_duplicado(auth_service):
+    """Un email ya registrado se rechaza."""
+    await auth_service.register_user("dup@example.com", "password123")
+    with pytest.raises(ValueError):
+        await auth_service.register_user("dup@example.com", "password123")
+
+
+@pytest.mark.asyncio
+async def test_login_password_incorrecta(auth_service):
+    """Una contraseña incorrecta produce credenciales inválidas."""
+    await auth_service.register_user("user@example.com", "password123")
+    with pytest.raises(ValueError, match="Credenciales inválidas"):
+        await auth_service.login_user("user@example.com", "wrong-password")
+
+
+@pytest.mark.asyncio
+async def test_login_email_inexistente_verifica_hash_ficticio(auth_service, monkeypatch):
+    """Un email desconocido también ejecuta una verificación de contraseña."""
+    calls = []
+    original = auth_service.password_hasher.verify_password
+    monkeypatch.setattr(
+        auth_service.password_hasher,
+        "verify_password",
+        lambda pw, hashed: calls.append(hashed) or original(pw, hashed),
+    )
+    with pytest.raises(ValueError, match="Credenciales inválidas"):
+        await auth_service.login_user("nobody@example.com", "password123")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_rehash_se_persiste_antes_de_responder(auth_service, monkeypatch):
+    """El hash se actualiza dentro del login (la sesión de BD es del request)."""
+    await auth_service.register_user("user@example.com", "password123")
+    monkeypatch.setattr(auth_service.password_hasher, "needs_rehash", lambda hashed: True)
+
+    await auth_service.login_user("user@example.com", "password123")
+
+    assert auth_service.user_repository.updates == 1
+
+
+def test_create_if_absent_sqlmodel_detecta_duplicado():
+    """El repositorio SQLModel resuelve el email duplicado en un solo INSERT."""
+    from sqlalchemy.pool import StaticPool
+    from sqlmodel import Session, SQLModel, create_engine
+
+    from src.adapters.db.user_repository import SQLModelUserRepository
+
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine, tables=[User.__table__])
+    with Session(engine) as session:
+        repo = SQLModelUserRepository(session)
+        assert repo.create_if_absent("a@example.com", "hash") is not None
+        assert repo.create_if_absent("a@example.com", "hash") is None
+        assert repo.get_by_email("a@example.com") is not None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("email", "password"),
+    [("sin-arroba.example.com", "password123"), ("user@example.com", "corta")],
+)
+async def test_register_valida_antes_de_io(auth_service, email, password):
+    """Email mal formado o contraseña corta se rechazan sin tocar el repositorio."""
+    with pytest.raises(ValueError):
+        await auth_service.register_user(email, password)
+    assert auth_service.user_repository.users == {}
+
+
+@pytest.mark.asyncio
+async def test_dto_se_serializa_como_user_response(auth_service):
+    """El DTO devuelto se valida directamente contra el schema de respuesta."""
+    from src.domain.models.user import UserResponse
+
+    result = await auth_service.register_user("dto@example.com", "password123")
+    response = UserResponse.model_validate(result.user)
+
+    assert response.email == "dto@example.com"
+    assert response.created_at == result.user.created_at
@@ -1,6 +1,7 @@
 """Test suite para BearPythonTool (filtro Python-only)."""
 import pytest
 import asyncio
+from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, patch
 from src.adapters.tools.bear_python_tool import BearPythonTool, PythonSource
 
@@ -207,6 +208,13 @@ def test_is_general_query_detecta_consultas_no_python(tool):
         assert tool._is_general_query(query), f"Debe rechazar: {query}"
 
 
+def test_clean_query_elimina_ruido(tool):
+    """La limpieza debe quitar prefijos, frases meta, keywords y acentos."""
+    assert tool._clean_query("kimi-k2: puedes buscar esto ¿Qué es asyncio?") == "Que es asyncio"
+    assert tool._clean_query("busca información sobre decoradores best practices guide") == "decoradores"
+    assert tool._clean_query("??") == "??"  # fallback si queda vacío
+
+
 # --------------- Tests de confiabilidad ---------------
 def test_calculate_reliability_github_alta(tool):
     """GitHub debe tener alta confiabilidad."""
@@ -220,11 +228,132 @@ def test_calculate_reliability_docs_python_maxima(tool):
     assert reliability == 10
 
 
+# --------------- Tests de caché ---------------
+@pytest.mark.asyncio
+async def test_cache_lru_acotado(tool):
+    """El caché debe evictar la entrada menos usada al superar el límite."""
+    tool.CACHE_MAX_ENTRIES = 2
+    await tool._set_cache(("api", "a"), [])
+    await tool._set_cache(("api", "b"), [])
+    assert await tool._get_from_cache(("api", "a")) == []  # "a" pasa a ser la más reciente
+    await tool._set_cache(("api", "c"), [])
+
+    assert await tool._get_from_cache(("api", "b")) is None
+    assert await tool._get_from_cache(("api", "a")) == []
+    assert tool.get_cache_stats()["total_entries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_persistente_sobrevive_reinicio(tmp_path):
+    """Con cache_path, una instancia nueva debe leer lo cacheado por la anterior."""
+    cache_path = str(tmp_path / "bear_cache.db")
+    source = PythonSource(
+        url="https://docs.python.org/3/", title="Docs", snippet="def f():",
+        source_type="official_docs", reliability=10,
+    )
+    async with BearPythonTool(api_key="k", cache_path=cache_path) as first:
+        await first._set_cache(("api", "key"), [source])
+
+    async with BearPythonTool(api_key="k", cache_path=cache_path) as restarted:
+        assert await restarted._get_from_cache(("api", "key")) == [source]
+
+
+@pytest.mark.asyncio
+async def test_hit_en_memoria_no_sale_del_loop(tmp_path):
+    """Con cache_path, solo SQLite va a un hilo: el LRU en memoria se lee en el loop."""
+    async with BearPythonTool(api_key="k", cache_path=str(tmp_path / "c.db")) as tool:
+        await tool._set_cache(("api", "key"), [])
+
+        with patch("asyncio.to_thread", side_effect=AssertionError("no debe usar hilos")):
+            assert await tool._get_from_cache(("api", "key")) == []
+
+
+@pytest.mark.asyncio
+async def test_clear_cache_vacia_el_disco(tmp_path):
+    """clear_cache borra también lo persistido en SQLite."""
+    cache_path = str(tmp_path / "bear_cache.db")
+    async with BearPythonTool(api_key="k", cache_path=cache_path) as tool:
+        await tool._set_cache(("api", "key"), [])
+        await tool.clear_cache()
+
+    async with BearPythonTool(api_key="k", cache_path=cache_path) as restarted:
+        assert await restarted._get_from_cache(("api", "key")) is None
+
+
+@pytest.mark.asyncio
+async def test_busquedas_concurrentes_identicas_comparten_llamada(tool):
+    """Búsquedas idénticas en vuelo deben resolverse con una sola llamada HTTP."""
+    calls = 0
+
+    @asynccontextmanager
+    async def slow_stream(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise Exception("API Error")
+        yield
+
+    with patch('httpx.AsyncClient.stream', side_effect=slow_stream):
+        results = await asyncio.gather(
+            *(tool.search_python_api("asyncio", "gather") for _ in range(3))
+        )
+
+    assert calls == 1
+    assert results[0] == results[1] == results[2]
+    assert tool._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_parsea_respuesta_brave(tool):
+    """Los resultados de Brave (web.results, 'description') deben filtrarse y cachearse."""
+    import httpx
+
+    payload = {"web": {"results": [
+        {"title": "asyncio", "url": "https://docs.python.org/3/library/asyncio.html",
+         "description": "import asyncio"},
+        {"title": "clima", "url": "https://weather.com/x", "description": "25 grados"},
+    ]}}
+    tool.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+    )
+
+    results = await tool.search_python_api("asyncio", "run")
+
+    assert [r.url for r in results] == ["https://docs.python.org/3/library/asyncio.html"]
+    assert results[0].snippet == "import asyncio"
+    assert tool.get_cache_stats()["valid_entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_en_disco_desde_la_busqueda(tmp_path):
+    """Con cache_path la búsqueda guarda en SQLite y otra instancia lo reutiliza."""
+    import httpx
+
+    cache_path = str(tmp_path / "bear_cache.db")
+    payload = {"web": {"results": [
+        {"title": "asyncio", "url": "https://docs.python.org/3/library/asyncio.html",
+         "description": "import asyncio"},
+    ]}}
+    first = BearPythonTool(api_key="k", cache_path=cache_path)
+    first.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+    )
+    await first.search_python_api("asyncio", "run")
+
+    restarted = BearPythonTool(api_key="k", cache_path=cache_path)
+    restarted.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(500))
+    )
+    results = await restarted.search_python_api("asyncio", "run")
+
+    assert [r.url for r in results] == ["https://docs.python.org/3/library/asyncio.html"]
+
+
 # --------------- Tests de manejo de errores ---------------
 @pytest.mark.asyncio
 async def test_api_error_usa_fallback(tool):
     """Si la API falla, debe usar el fallback y retornar resultados hardcodeados."""
-    with patch('httpx.AsyncClient.get', side_effect=Exception("API Error")):
+    with patch('httpx.AsyncClient.stream', side_effect=Exception("API Error")):
         results = await tool.search_python_bug("test error")
         assert len(results) > 0
         assert "Python Official Documentation" in [r.title for r in results]
@@ -8,6 +8,22 @@ from src.application.services.chat_service import ChatServiceV2
 from src.domain.models.chat_models import MessageRole, ChatSession, ChatMessage, ChatSessionCreate, ChatMessageCreate
 
 
+@pytest.fixture(autouse=True)
+def _groq_api_key(monkeypatch):
+    """conftest borra GROQ_API_KEY; el servicio lee Settings al responder."""
+    monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+
+
+@pytest.fixture(autouse=True)
+def _limpiar_cache_contexto_rag():
+    """El caché de contexto RAG es de módulo: cada test parte vacío."""
+    from src.application.services.rag import context_cache
+
+    context_cache._RAG_CONTEXT_CACHE.clear()
+    yield
+    context_cache._RAG_CONTEXT_CACHE.clear()
+
+
 @pytest.mark.unit
 class TestChatServiceBasic:
     """Tests básicos del servicio de chat."""
@@ -81,3 +97,485 @@ class TestChatServiceErrorHandling:
 
         with pytest.raises(Exception, match="API Error"):
             await service.handle_message(session_id="1", user_message="test")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("user_message", "kimi_response", "expected"),
+    [
+        ("¿Cómo uso asyncio?", "No estoy seguro de la respuesta.", True),
+        ("Tengo un Traceback en mi script", "Revisa la línea 3.", True),
+        ("¿Qué clima hace hoy?", "No tengo acceso a internet.", False),
+        ("¿Qué es un decorador?", "Un decorador envuelve una función.", False),
+        ("¿Novedades de Python 3.14?", "Voy a buscarlo en Internet.", True),
+    ],
+)
+def test_should_search_internet(user_message, kimi_response, expected):
+    """Las señales de incertidumbre precompiladas deciden la búsqueda en internet."""
+    service = ChatServiceV2(
+        llm_client=AsyncMock(), repository=AsyncMock(), metrics_service=Mock()
+    )
+
+    assert service._should_search_internet(user_message, kimi_response) is expected
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_history_se_lee_una_sola_vez():
+    """El historial se carga una vez y el mensaje nuevo se añade en memoria."""
+    mock_llm = AsyncMock()
+    mock_llm.get_chat_completion.return_value = ("Respuesta", 10)
+
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+    mock_repo.add_message.side_effect = lambda data: ChatMessage(
+        session_id=1,
+        role=data.role,
+        content=data.content,
+        timestamp=None,
+        message_index=0,
+    )
+
+    service = ChatServiceV2(
+        llm_client=mock_llm, repository=mock_repo, metrics_service=Mock()
+    )
+    await service.handle_message(session_id="1", user_message="Hola", use_internet=False)
+
+    from src.adapters.config.settings import settings
+
+    # Solo la ventana reciente, nunca la conversación completa
+    mock_repo.get_recent_session_messages.assert_called_once_with(
+        "1", limit=settings.chat_history_window
+    )
+    mock_repo.get_session_messages.assert_not_called()
+    sent_history = mock_llm.get_chat_completion.call_args.kwargs["messages"]
+    assert [m.content for m in sent_history] == ["Hola"]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_history_se_lee_en_paralelo_con_rag():
+    """La búsqueda RAG no espera al historial; lectura y guardado van en serie."""
+    import asyncio
+    import threading
+
+    history_started = threading.Event()
+    release_history = threading.Event()
+
+    def slow_history(session_id, *, limit):
+        history_started.set()
+        release_history.wait(timeout=5)
+        return []
+
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.side_effect = slow_history
+
+    async def retrieve(*args):
+        # RAG arranca mientras la lectura del historial sigue en curso
+        await asyncio.to_thread(history_started.wait, 5)
+        assert not mock_repo.add_message.called
+        release_history.set()
+        return []
+
+    service = ChatServiceV2(
+        llm_client=AsyncMock(get_chat_completion=AsyncMock(return_value=("ok", 1))),
+        repository=mock_repo,
+        embeddings_service=Mock(),
+        metrics_service=Mock(),
+    )
+    service._retrieve_chunks = retrieve
+    await service.handle_message(session_id="1", user_message="Hola", file_id=1)
+
+    assert [c[0] for c in mock_repo.mock_calls if c[0] != "get_session"] == [
+        "get_recent_session_messages",
+        "add_message",
+        "add_message",
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_history_recortado_en_turnos_rag():
+    """Con contexto RAG solo viaja la ventana corta de historial."""
+    from src.adapters.config.settings import settings
+
+    previous = [
+        ChatMessage(
+            session_id=1,
+            role=MessageRole.USER,
+            content=f"m{i}",
+            timestamp=None,
+            message_index=i,
+        )
+        for i in range(settings.chat_history_window)
+    ]
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = previous
+    mock_fallback_llm = AsyncMock()
+    mock_fallback_llm.get_chat_completion.return_value = ("Respuesta con RAG", 10)
+
+    service = ChatServiceV2(
+        llm_client=AsyncMock(),
+        repository=mock_repo,
+        fallback_llm=mock_fallback_llm,
+        embeddings_service=Mock(),
+        metrics_service=Mock(),
+    )
+    service._retrieve_chunks = AsyncMock(
+        return_value=[{"text": "contenido", "similarity": 0.9, "chunk_index": 0}]
+    )
+    await service.handle_message(session_id="1", user_message="Pregunta", file_id=1)
+
+    sent_history = mock_fallback_llm.get_chat_completion.call_args.kwargs["messages"]
+    assert len(sent_history) == settings.chat_history_window_rag
+    assert sent_history[-1].content == "Pregunta"
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_contexto_rag_cacheado_por_archivo_y_consulta():
+    """La misma pregunta sobre el mismo archivo (otra sesión) no vuelve a buscar."""
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+    mock_fallback_llm = AsyncMock()
+    mock_fallback_llm.get_chat_completion.return_value = ("Respuesta con RAG", 10)
+    retrieve = AsyncMock(
+        return_value=[{"text": "contenido", "similarity": 0.9, "chunk_index": 0}]
+    )
+
+    for session_id, message in (("1", "¿Qué es un GIL?"), ("2", "  ¿qué es un  GIL? ")):
+        service = ChatServiceV2(
+            llm_client=AsyncMock(),
+            repository=mock_repo,
+            fallback_llm=mock_fallback_llm,
+            embeddings_service=Mock(),
+            metrics_service=Mock(),
+        )
+        service._retrieve_chunks = retrieve
+        await service.handle_message(
+            session_id=session_id, user_message=message, file_id=7
+        )
+
+    retrieve.assert_awaited_once()
+    prompts = [c.kwargs["system_prompt"] for c in mock_fallback_llm.get_chat_completion.call_args_list]
+    assert len(prompts) == 2 and prompts[0] == prompts[1]
+    assert "contenido" in prompts[1]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_response_cache_reutiliza_primer_mensaje():
+    """Un primer mensaje casi idéntico en otra sesión no vuelve a llamar al LLM."""
+    import numpy as np
+
+    from src.application.services.rag.semantic_cache import SemanticCache
+
+    mock_llm = AsyncMock()
+    mock_llm.get_chat_completion.return_value = ("Usa asyncio.gather", 42)
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+    mock_embeddings = Mock()
+    mock_embeddings.embed_query = AsyncMock(
+        return_value=np.ones(8, dtype=np.float32)
+    )
+
+    service = ChatServiceV2(
+        llm_client=mock_llm,
+        repository=mock_repo,
+        embeddings_service=mock_embeddings,
+        metrics_service=Mock(),
+        response_cache=SemanticCache(threshold=0.92),
+    )
+    first = await service.handle_message("1", "¿Cómo paralelizo?", use_internet=False)
+    second = await service.handle_message("2", "¿Cómo paralelizo?", use_internet=False)
+    # Con temperatura explícita no se usa el caché
+    await service.handle_message(
+        "3", "¿Cómo paralelizo?", use_internet=False, temperature=0.7
+    )
+
+    assert first == second == "Usa asyncio.gather"
+    assert mock_llm.get_chat_completion.call_count == 2
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_llamadas_identicas_concurrentes_se_comparten():
+    """Dos llamadas idénticas en curso al mismo tiempo hacen un solo round trip."""
+    import asyncio
+
+    release = asyncio.Event()
+
+    async def slow_completion(**kwargs):
+        await release.wait()
+        return ("Respuesta", 10)
+
+    mock_llm = AsyncMock()
+    mock_llm.get_chat_completion.side_effect = slow_completion
+    service = ChatServiceV2(
+        llm_client=mock_llm, repository=Mock(), metrics_service=Mock()
+    )
+    history = [
+        ChatMessage(
+            session_id=1,
+            role=MessageRole.USER,
+            content="Hola",
+            timestamp=None,
+            message_index=0,
+        )
+    ]
+    kwargs = {
+        "system_prompt": "prompt",
+        "history": history,
+        "max_tokens": None,
+        "temperature": None,
+        "session_id": "1",
+        "agent_mode": "architect",
+        "use_fallback_on_error": False,
+        "has_rag": False,
+    }
+
+    first = asyncio.create_task(service._get_llm_response(**kwargs))
+    second = asyncio.create_task(service._get_llm_response(**kwargs))
+    await asyncio.sleep(0)
+    first.cancel()  # Quien lanzó la llamada se va; el otro sigue esperándola
+    release.set()
+
+    assert await second == ("Respuesta", 10)
+    assert mock_llm.get_chat_completion.call_count == 1
+
+
+@pytest.mark.unit
+def test_select_rag_snippets_respeta_limite():
+    """El corte acumulado trunca el último chunk y omite los que no caben."""
+    from src.application.services.chat_service import _select_rag_snippets
+
+    results = [
+        {"text": "a" * 300, "chunk_index": 0, "similarity": 0.9},
+        {"text": "b" * 300, "chunk_index": 2, "similarity": 0.7},
+        {"text": "c" * 300, "chunk_index": 3, "similarity": 0.6},
+    ]
+
+    parts = _select_rag_snippets(results, limit=500)
+
+    assert parts == [
+        "[chunk 0, score=0.900]\n" + "a" * 300,
+        "[chunk 2, score=0.700]\n" + "b" * 200,
+    ]
+
+
+@pytest.mark.unit
+def test_select_rag_snippets_presupuesto_en_bytes():
+    """Texto multibyte consume su tamaño en UTF-8 y no se corta a mitad de carácter."""
+    from src.application.services.chat_service import _select_rag_snippets
+
+    results = [
+        {"text": "漢" * 100, "chunk_index": 0, "similarity": 0.9},  # 300 bytes
+        {"text": "字" * 200, "chunk_index": 1, "similarity": 0.8},
+    ]
+
+    parts = _select_rag_snippets(results, limit=500)
+
+    assert parts == [
+        "[chunk 0, score=0.900]\n" + "漢" * 100,
+        "[chunk 1, score=0.800]\n" + "字" * 66,  # 200 bytes restantes -> 66 caracteres
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("user_message", "method", "args"),
+    [
+        ("ejemplo de os.path con Traceback", "search_python_bug", None),
+        ("dame un ejemplo de asyncio.run", "search_python_api", ("asyncio", "run")),
+        ("¿Hay nueva versión de python?", "search_python_best_practice", ("latest python version release",)),
+        ("¿Qué es un decorador?", "search_python_best_practice", None),
+    ],
+)
+async def test_search_python_sources_enruta(user_message, method, args):
+    """Traceback > API > versión: la prioridad de siempre decide la búsqueda."""
+    python_search = AsyncMock()
+    service = ChatServiceV2(
+        llm_client=AsyncMock(),
+        repository=AsyncMock(),
+        python_search=python_search,
+        metrics_service=Mock(),
+    )
+
+    await service._search_python_sources(user_message)
+
+    called = getattr(python_search, method)
+    called.assert_awaited_once_with(*(args or (user_message,)))
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_handle_message_stream_emite_y_persiste():
+    """Los fragmentos se emiten en orden y la respuesta completa se guarda al final."""
+
+    async def stream(*args, **kwargs):
+        for chunk in ("Hola", ", ", "mundo"):
+            yield chunk
+
+    mock_llm = Mock()
+    mock_llm.get_chat_completion_stream = stream
+    mock_llm.estimate_tokens.side_effect = lambda text: len(text) // 4
+
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+    saved = []
+    mock_repo.add_message.side_effect = lambda data: saved.append(data) or ChatMessage(
+        session_id=1,
+        role=data.role,
+        content=data.content,
+        timestamp=None,
+        message_index=len(saved),
+    )
+
+    service = ChatServiceV2(
+        llm_client=mock_llm, repository=mock_repo, metrics_service=Mock()
+    )
+    chunks = [c async for c in service.handle_message_stream("1", "Saluda")]
+
+    assert chunks == ["Hola", ", ", "mundo"]
+    assert [(m.role, m.content) for m in saved] == [
+        (MessageRole.USER, "Saluda"),
+        (MessageRole.ASSISTANT, "Hola, mundo"),
+    ]
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_error_del_llm_conserva_el_mensaje_del_usuario():
+    """Si el LLM falla, el mensaje del usuario ya quedó guardado en el historial."""
+    mock_llm = AsyncMock()
+    mock_llm.get_chat_completion.side_effect = RuntimeError("proveedor caído")
+
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+
+    service = ChatServiceV2(
+        llm_client=mock_llm, repository=mock_repo, metrics_service=Mock()
+    )
+    with pytest.raises(RuntimeError):
+        await service.handle_message(
+            session_id="1",
+            user_message="Hola",
+            use_internet=False,
+            use_fallback_on_error=False,
+        )
+
+    (saved,), _ = mock_repo.add_message.call_args
+    assert (saved.role, saved.content) == (MessageRole.USER, "Hola")
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_busqueda_como_herramienta_en_una_sola_pasada(monkeypatch):
+    """Con tool calling la búsqueda la decide el modelo, sin re-llamada heurística."""
+    from src.adapters.config.settings import settings
+
+    monkeypatch.setattr(settings, "llm_tool_calling_enabled", True)
+
+    async def with_tools(system_prompt, messages, *, tools, tool_handler, **kwargs):
+        assert [t.name for t in tools] == ["search_python_sources"]
+        context = await tool_handler(tools[0].name, {"query": "python 3.14"})
+        assert "PEP 745" in context
+        return "Python 3.14 salió en octubre", 120
+
+    mock_llm = Mock()
+    mock_llm.supports_tools = True
+    mock_llm.get_chat_completion_with_tools = with_tools
+    mock_llm.get_chat_completion = AsyncMock()
+    mock_llm.estimate_tokens.side_effect = lambda text: len(text) // 4
+
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+
+    python_search = AsyncMock()
+    python_search.search_python_best_practice.return_value = [
+        Mock(
+            title="PEP 745",
+            source_type="pep",
+            reliability=10,
+            url="https://peps.python.org/pep-0745/",
+            snippet="Calendario de 3.14",
+        )
+    ]
+
+    service = ChatServiceV2(
+        llm_client=mock_llm,
+        repository=mock_repo,
+        python_search=python_search,
+        metrics_service=Mock(),
+    )
+    with patch.object(service, "_finish_turn", new=AsyncMock()) as finish:
+        response = await service.handle_message("1", "¿Qué trae python 3.14?")
+
+    assert response == "Python 3.14 salió en octubre"
+    mock_llm.get_chat_completion.assert_not_called()
+    python_search.search_python_best_practice.assert_awaited_once_with("python 3.14")
+    assert finish.await_args.kwargs["used_bear"] is True
+    assert finish.await_args.kwargs["bear_sources_count"] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_tool_calling_desactivado_por_defecto():
+    """Sin activarlo en settings se usa el camino clásico (caché, single-flight)."""
+    mock_llm = Mock()
+    mock_llm.supports_tools = True
+    mock_llm.get_chat_completion_with_tools = AsyncMock()
+    mock_llm.get_chat_completion = AsyncMock(return_value=("Respuesta", 10))
+
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+
+    service = ChatServiceV2(
+        llm_client=mock_llm,
+        repository=mock_repo,
+        python_search=AsyncMock(),
+        metrics_service=Mock(),
+    )
+    with patch.object(service, "_finish_turn", new=AsyncMock()):
+        response = await service.handle_message("1", "Hola")
+
+    assert response == "Respuesta"
+    mock_llm.get_chat_completion_with_tools.assert_not_called()
+    mock_llm.get_chat_completion.assert_awaited_once()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+async def test_tool_calling_fallido_usa_el_respaldo_sin_repetir_el_principal(
+    monkeypatch,
+):
+    """Si falla la llamada con herramientas responde el fallback, una sola vez."""
+    from src.adapters.config.settings import settings
+
+    monkeypatch.setattr(settings, "llm_tool_calling_enabled", True)
+    mock_llm = Mock()
+    mock_llm.supports_tools = True
+    mock_llm.get_chat_completion_with_tools = AsyncMock(
+        side_effect=RuntimeError("proveedor caído")
+    )
+    mock_llm.get_chat_completion = AsyncMock()
+    fallback = Mock()
+    fallback.get_chat_completion = AsyncMock(return_value=("Respaldo", 5))
+
+    mock_repo = Mock()
+    mock_repo.get_recent_session_messages.return_value = []
+
+    service = ChatServiceV2(
+        llm_client=mock_llm,
+        repository=mock_repo,
+        fallback_llm=fallback,
+        python_search=AsyncMock(),
+        metrics_service=Mock(),
+    )
+    with patch.object(service, "_finish_turn", new=AsyncMock()):
+        response = await service.handle_message("1", "Hola")
+
+    assert response == "Respaldo"
+    mock_llm.get_chat_completion.assert_not_called()
+    fallback.get_chat_completion.assert_awaited_once()
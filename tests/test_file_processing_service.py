@@ -0,0 +1,90 @@
+"""Test suite para la indexación de archivos de FileProcessingService."""
+from contextlib import nullcontext
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.application.services.file_processing_service import FileProcessingService
+from src.domain.models.file_models import FileSection, FileStatus
+
+
+def _service(sections: list[FileSection]) -> tuple[FileProcessingService, Mock]:
+    repo = Mock()
+    repo.get_file.return_value = Mock(status=FileStatus.READY, file_path="/tmp/doc.pdf")
+    repo.get_file_sections.return_value = sections
+    embeddings = Mock()
+    embeddings.index_document = AsyncMock(side_effect=lambda doc, secs: len(secs))
+    return FileProcessingService(repo, embeddings), embeddings
+
+
+@pytest.mark.asyncio
+async def test_index_file_usa_texto_guardado_sin_abrir_el_pdf():
+    """Secciones con texto guardado o sin texto (char_count 0) no parsean el PDF."""
+    service, embeddings = _service([
+        FileSection(id=1, file_id="1", text="capítulo 1", page_number=0, char_count=10),
+        FileSection(id=2, file_id="1", text="", page_number=12, char_count=0),
+    ])
+
+    with patch("src.application.services.file_processing_service._open_pdf") as open_pdf:
+        assert await service.index_file(1) == 1
+
+    open_pdf.assert_not_called()
+    (_, indexed), _ = embeddings.index_document.call_args
+    assert [s.text for s in indexed] == ["capítulo 1"]
+
+
+@pytest.mark.asyncio
+async def test_index_file_extrae_secciones_antiguas():
+    """Filas previas a la columna de texto (char_count > 0, sin texto) leen el PDF."""
+    service, embeddings = _service([
+        FileSection(id=1, file_id="1", text="", page_number=3, char_count=500),
+    ])
+    doc = Mock()
+
+    with (
+        patch(
+            "src.application.services.file_processing_service._open_pdf",
+            return_value=nullcontext(doc),
+        ),
+        patch(
+            "src.application.services.file_processing_service._page_text",
+            return_value=" texto de la página 3 ",
+        ) as page_text,
+    ):
+        assert await service.index_file(1) == 1
+
+    page_text.assert_called_once_with(doc, 3)
+    (_, indexed), _ = embeddings.index_document.call_args
+    assert indexed[0].text == "texto de la página 3"
+
+
+@pytest.mark.asyncio
+async def test_index_file_invalida_el_cache_semantico():
+    """Tras reindexar, el caché semántico no sirve chunks viejos del archivo."""
+    service, _ = _service([
+        FileSection(id=1, file_id="1", text="capítulo 1", page_number=0, char_count=10),
+    ])
+    service.semantic_cache = Mock()
+
+    await service.index_file(1)
+
+    service.semantic_cache.invalidate_file.assert_called_once_with(1)
+
+
+def test_open_pdf_cierra_el_archivo(tmp_path):
+    """El documento no queda abierto (ni cacheado) al salir del bloque."""
+    from pypdf import PdfWriter
+
+    from src.application.services import file_processing_service
+
+    path = tmp_path / "doc.pdf"
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    writer.write(path)
+
+    with patch.object(file_processing_service, "pymupdf", None):
+        with file_processing_service._open_pdf(str(path)) as doc:
+            assert file_processing_service._page_count(doc) == 1
+            stream = doc.stream
+
+    assert stream.closed
@@ -0,0 +1,55 @@
+"""Test suite para el caché de veredictos de GuardianService."""
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.application.services.guardian_service import GuardianService
+from src.domain.ports.guardian_port import GuardianResult, ThreatLevel
+
+SAFE = GuardianResult(is_safe=True, threat_level=ThreatLevel.SAFE, confidence=0.9)
+FALLBACK = GuardianResult(
+    is_safe=True, threat_level=ThreatLevel.SAFE, reason="Fallback: Timeout", confidence=0.0
+)
+
+
+def _service(*results: GuardianResult, **kwargs) -> tuple[GuardianService, AsyncMock]:
+    client = AsyncMock()
+    client.check_message.side_effect = list(results)
+    return GuardianService(client, llm_enabled=True, **kwargs), client
+
+
+@pytest.mark.asyncio
+async def test_veredicto_repetido_sale_del_cache():
+    """Un mensaje ya analizado no vuelve a consultar al LLM."""
+    service, client = _service(SAFE)
+    message = "¿Cómo configuro un pool de conexiones en SQLAlchemy?"
+
+    await service.check_message(message)
+    await service.check_message(message)
+
+    assert client.check_message.await_count == 1
+    assert service.get_metrics()["cache_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_no_se_cachea():
+    """Con el Guardian caído el siguiente intento vuelve a consultar."""
+    service, client = _service(FALLBACK, SAFE)
+    message = "¿Cómo configuro un pool de conexiones en SQLAlchemy?"
+
+    first = await service.check_message(message)
+    second = await service.check_message(message)
+
+    assert first.confidence == 0.0 and second.confidence == 0.9
+    assert client.check_message.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_acotado_evicta_el_menos_usado():
+    """El caché no crece más allá de cache_max_entries."""
+    service, _ = _service(SAFE, SAFE, SAFE, cache_max_entries=2)
+
+    for topic in ("asyncio", "pydantic", "pytest"):
+        await service.check_message(f"Explícame cómo funciona {topic} en Python")
+
+    assert service.get_metrics()["cache_size"] == 2
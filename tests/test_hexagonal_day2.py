@@ -9,6 +9,7 @@ Valida:
 """
 
 import pytest
+from collections.abc import AsyncIterator
 from unittest.mock import AsyncMock, Mock
 
 from src.domain.ports import LLMPort, ChatRepositoryPort
@@ -50,8 +51,8 @@ class MockLLMPort(LLMPort):
         *,
         max_tokens: int | None = None,
         temperature: float | None = None,
-    ) -> str:
-        return self.response
+    ) -> AsyncIterator[str]:
+        yield self.response
     
     def estimate_tokens(self, text: str) -> int:
         return len(text) // 4
@@ -84,6 +85,15 @@ class MockRepositoryPort(ChatRepositoryPort):
     
     def list_sessions(self, *, limit: int = 50, offset: int = 0) -> list[ChatSession]:
         return list(self.sessions.values())
+
+    def list_sessions_with_counts(
+        self, user_id: str, *, limit: int = 50
+    ) -> list[tuple[ChatSession, int]]:
+        return [
+            (s, len(self.messages.get(str(s.id), [])))
+            for s in self.sessions.values()
+            if s.user_id == user_id and self.messages.get(str(s.id))
+        ][:limit]
     
     def update_session(self, session_id: str, *, title: str | None = None) -> ChatSession:
         session = self.sessions[session_id]
@@ -132,6 +142,9 @@ class MockRepositoryPort(ChatRepositoryPort):
         if limit:
             return messages[-limit:]
         return messages
+
+    def get_recent_session_messages(self, session_id: str, *, limit: int) -> list[ChatMessage]:
+        return self.messages.get(session_id, [])[-limit:]
     
     def get_message(self, message_id: int) -> ChatMessage | None:
         for messages in self.messages.values():
@@ -143,6 +156,9 @@ class MockRepositoryPort(ChatRepositoryPort):
     def count_session_messages(self, session_id: str) -> int:
         return len(self.messages.get(session_id, []))
 
+    def count_messages_for_sessions(self, session_ids: list[str]) -> dict[str, int]:
+        return {sid: len(self.messages.get(sid, [])) for sid in session_ids}
+
 
 class TestChatServiceV2:
     """Tests para ChatServiceV2 con arquitectura hexagonal."""
@@ -245,11 +261,202 @@ class TestAdapters:
         adapter = GeminiAdapter(client=AsyncMock())
         assert adapter is not None
     
+    @pytest.mark.asyncio
+    async def test_groq_adapter_stream_sse(self, monkeypatch) -> None:
+        """Test que GroqAdapter emite los deltas SSE a medida que llegan."""
+        import httpx
+
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+
+        from src.adapters.agents.groq_adapter import GroqAdapter
+
+        sse = (
+            'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":"Hola"}}]}\n\n'
+            'data: {"choices":[{"delta":{"content":" mundo"}}]}\n\n'
+            "data: [DONE]\n\n"
+        )
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert b'"stream":true' in request.content.replace(b" ", b"")
+            return httpx.Response(200, text=sse)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            adapter = GroqAdapter(client=client)
+            chunks = [
+                c async for c in adapter.get_chat_completion_stream("system", [])
+            ]
+
+        assert chunks == ["Hola", " mundo"]
+
+    @pytest.mark.asyncio
+    async def test_groq_adapter_tool_calling(self, monkeypatch) -> None:
+        """Test que GroqAdapter ejecuta la herramienta pedida y reenvía su resultado."""
+        import json
+
+        import httpx
+
+        monkeypatch.setenv("GROQ_API_KEY", "gsk_test")
+
+        from src.adapters.agents.groq_adapter import GroqAdapter
+        from src.domain.ports import ToolSpec
+
+        bodies: list[dict] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            bodies.append(json.loads(request.content))
+            if len(bodies) == 1:
+                message = {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": "call_1",
+                        "type": "function",
+                        "function": {"name": "buscar", "arguments": '{"query": "pep 8"}'},
+                    }],
+                }
+                return httpx.Response(200, json={
+                    "choices": [{"message": message}],
+                    "usage": {"total_tokens": 30},
+                })
+            return httpx.Response(200, json={
+                "choices": [{"message": {"role": "assistant", "content": "Usa 4 espacios"}}],
+                "usage": {"total_tokens": 50},
+            })
+
+        async def tool_handler(name: str, arguments: dict) -> str:
+            return f"{name}: {arguments['query']}"
+
+        tool = ToolSpec(name="buscar", description="Busca", parameters={"type": "object"})
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            adapter = GroqAdapter(client=client)
+            content, tokens = await adapter.get_chat_completion_with_tools(
+                "system", [], tools=[tool], tool_handler=tool_handler
+            )
+
+        assert (content, tokens) == ("Usa 4 espacios", 80)
+        assert bodies[0]["tool_choice"] == "auto"
+        assert bodies[1]["tool_choice"] == "none"
+        assert bodies[1]["messages"][-1] == {
+            "role": "tool", "tool_call_id": "call_1", "content": "buscar: pep 8"
+        }
+
+    @pytest.mark.asyncio
+    async def test_tool_calls_se_ejecutan_en_paralelo(self) -> None:
+        """Test que varias herramientas pedidas juntas corren a la vez y en orden."""
+        import asyncio
+
+        from src.adapters.agents.openai_tools import complete_with_tools
+        from src.domain.ports import ToolSpec
+
+        calls = [
+            {"id": f"call_{i}", "function": {"name": "buscar", "arguments": f'{{"query": "q{i}"}}'}}
+            for i in range(3)
+        ]
+        responses = [
+            {"choices": [{"message": {"content": None, "tool_calls": calls}}]},
+            {"choices": [{"message": {"content": "listo"}}]},
+        ]
+        bodies: list[dict] = []
+
+        async def post_json(payload: dict) -> dict:
+            bodies.append(payload)
+            return responses[len(bodies) - 1]
+
+        started = asyncio.Event()
+        running = 0
+
+        async def tool_handler(name: str, arguments: dict) -> str:
+            nonlocal running
+            running += 1
+            if running == len(calls):
+                started.set()
+            await asyncio.wait_for(started.wait(), timeout=1)  # Serie: timeout
+            return arguments["query"]
+
+        tool = ToolSpec(name="buscar", description="Busca", parameters={"type": "object"})
+        content, _ = await complete_with_tools(
+            post_json, {"messages": []}, [tool], tool_handler
+        )
+
+        assert content == "listo"
+        assert [m["content"] for m in bodies[1]["messages"][1:]] == ["q0", "q1", "q2"]
+
     def test_repository_adapter_import(self) -> None:
         """Test que SQLChatRepositoryAdapter se puede importar."""
         from src.adapters.db.chat_repository_adapter import SQLChatRepositoryAdapter
         assert SQLChatRepositoryAdapter is not None
 
+    def test_count_messages_for_sessions(self) -> None:
+        """Test que el conteo masivo de mensajes usa un solo GROUP BY correcto."""
+        from sqlalchemy.pool import StaticPool
+        from sqlmodel import Session, SQLModel, create_engine
+
+        from src.adapters.db.chat import ChatSession as ChatSessionDB
+        from src.adapters.db.chat_repository_adapter import SQLChatRepositoryAdapter
+        from src.adapters.db.message import ChatMessage as ChatMessageDB
+
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(
+            engine, tables=[ChatSessionDB.__table__, ChatMessageDB.__table__]
+        )
+        with Session(engine) as session:
+            first, second = ChatSessionDB(user_id="u"), ChatSessionDB(user_id="u")
+            session.add_all([first, second])
+            session.commit()
+            session.add_all(
+                ChatMessageDB(
+                    session_id=first.id, role="user", content="hola", message_index=i
+                )
+                for i in range(3)
+            )
+            session.commit()
+
+            session.add(ChatSessionDB(user_id="otro"))
+            session.commit()
+
+            repo = SQLChatRepositoryAdapter(session)
+            counts = repo.count_messages_for_sessions([str(first.id), str(second.id)])
+            user_sessions = repo.list_sessions_with_counts("u")
+
+        assert counts == {str(first.id): 3, str(second.id): 0}
+        # Solo sesiones del usuario con mensajes, con su conteo en la misma consulta
+        assert [(s.id, count) for s, count in user_sessions] == [(first.id, 3)]
+
+    def test_get_recent_session_messages(self) -> None:
+        """Test que la ventana de historial trae los últimos N en orden cronológico."""
+        from sqlalchemy.pool import StaticPool
+        from sqlmodel import Session, SQLModel, create_engine
+
+        from src.adapters.db.chat import ChatSession as ChatSessionDB
+        from src.adapters.db.chat_repository_adapter import SQLChatRepositoryAdapter
+        from src.adapters.db.message import ChatMessage as ChatMessageDB
+
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(
+            engine, tables=[ChatSessionDB.__table__, ChatMessageDB.__table__]
+        )
+        with Session(engine) as session:
+            chat = ChatSessionDB(user_id="u")
+            session.add(chat)
+            session.commit()
+            session.add_all(
+                ChatMessageDB(
+                    session_id=chat.id, role="user", content=f"m{i}", message_index=i
+                )
+                for i in range(5)
+            )
+            session.commit()
+
+            repo = SQLChatRepositoryAdapter(session)
+            recent = repo.get_recent_session_messages(str(chat.id), limit=2)
+
+        assert [m.content for m in recent] == ["m3", "m4"]
+
 class TestDependencies:
     """Tests para el sistema de inyección de dependencias."""
     
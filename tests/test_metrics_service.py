@@ -0,0 +1,52 @@
+"""Test suite para el registro de métricas en lote de MetricsService."""
+from unittest.mock import Mock
+
+import pytest
+
+from src.application.services.metrics_service import MetricsService
+
+
+def _usage(service: MetricsService, session_id: str = "1") -> None:
+    service.enqueue_agent_usage(
+        session_id=session_id,
+        agent_mode="architect",
+        prompt_tokens=100,
+        completion_tokens=200,
+        response_time=0.5,
+        model_name="kimi-k2",
+    )
+
+
+@pytest.mark.asyncio
+async def test_enqueue_agrupa_en_un_lote():
+    """Varias métricas encoladas se guardan en una sola escritura."""
+    repository = Mock()
+    service = MetricsService(repository, batch_size=10, flush_interval=0.05)
+
+    for i in range(3):
+        _usage(service, session_id=str(i))
+    repository.save_metrics_bulk.assert_not_called()  # Fuera del camino crítico
+
+    await service.aclose()
+
+    repository.save_metrics_bulk.assert_called_once()
+    (batch,), _ = repository.save_metrics_bulk.call_args
+    assert [m["session_id"] for m in batch] == ["0", "1", "2"]
+    assert batch[0]["total_tokens"] == 300
+    assert batch[0]["estimated_cost"] == pytest.approx(0.3 * 0.0003)
+    repository.update_daily_summary.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_error_de_escritura_no_detiene_el_worker():
+    """Un lote fallido se registra en el log y los siguientes se siguen guardando."""
+    repository = Mock()
+    repository.save_metrics_bulk.side_effect = [RuntimeError("db caída"), None]
+    service = MetricsService(repository, batch_size=1, flush_interval=0.01)
+
+    _usage(service)
+    _usage(service)
+    await service.aclose()
+
+    assert repository.save_metrics_bulk.call_count == 2
+    repository.update_daily_summary.assert_called_once()
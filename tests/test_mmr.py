@@ -0,0 +1,35 @@
+"""Test suite para el rerank MMR de chunks RAG."""
+from src.application.services.rag.mmr import rerank_mmr
+
+
+def _chunk(text: str, similarity: float, index: int) -> dict:
+    return {"text": text, "similarity": similarity, "chunk_index": index}
+
+
+def test_descarta_casi_duplicados():
+    """Un chunk casi idéntico a otro ya elegido cede su lugar a uno distinto."""
+    results = [
+        _chunk("asyncio gather ejecuta corrutinas en paralelo", 0.92, 0),
+        _chunk("asyncio gather ejecuta corrutinas en paralelo.", 0.91, 1),
+        _chunk("los context managers liberan recursos con with", 0.80, 2),
+    ]
+
+    chosen = rerank_mmr(results, final_k=2)
+
+    assert [r["chunk_index"] for r in chosen] == [0, 2]
+
+
+def test_lambda_uno_ordena_solo_por_relevancia():
+    """Con lambda=1 la diversidad no pesa: queda el top-k por similitud."""
+    results = [_chunk("mismo texto", s, i) for i, s in enumerate((0.7, 0.9, 0.8))]
+
+    chosen = rerank_mmr(results, final_k=2, lambda_=1.0)
+
+    assert [r["chunk_index"] for r in chosen] == [1, 2]
+
+
+def test_sin_rerank_si_caben_todos():
+    """Si hay final_k o menos resultados se devuelven tal cual."""
+    results = [_chunk("a", 0.9, 0), _chunk("a", 0.8, 1)]
+
+    assert rerank_mmr(results, final_k=5) is results
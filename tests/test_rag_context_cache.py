@@ -0,0 +1,39 @@
+"""Test suite para el caché de contexto RAG compartido entre requests."""
+import pytest
+
+from src.application.services.rag import context_cache
+from src.application.services.rag.context_cache import (
+    get_cached_rag_context,
+    invalidate_rag_context,
+    rag_context_key,
+    store_rag_context,
+)
+
+
+@pytest.fixture(autouse=True)
+def _cache_vacio():
+    context_cache._RAG_CONTEXT_CACHE.clear()
+    yield
+    context_cache._RAG_CONTEXT_CACHE.clear()
+
+
+def test_preguntas_largas_con_el_mismo_prefijo_no_comparten_entrada():
+    """La clave cubre el mensaje completo, no solo sus primeros caracteres."""
+    prefix = "Explica en detalle cómo funciona el manejo de memoria del documento " * 3
+    first = rag_context_key(7, prefix + "en CPython", 5, 4000)
+    second = rag_context_key(7, prefix + "en PyPy", 5, 4000)
+    store_rag_context(first, "contexto CPython", 2, max_entries=8)
+
+    assert first != second
+    assert get_cached_rag_context(second, ttl=60) is None
+
+
+def test_invalidar_descarta_solo_el_archivo():
+    """Reindexar o borrar un archivo vacía sus contextos y conserva los demás."""
+    store_rag_context(rag_context_key(7, "gil", 5, 4000), "a", 1, max_entries=8)
+    store_rag_context(rag_context_key(8, "gil", 5, 4000), "b", 1, max_entries=8)
+
+    invalidate_rag_context(7)
+
+    assert get_cached_rag_context(rag_context_key(7, "gil", 5, 4000), ttl=60) is None
+    assert get_cached_rag_context(rag_context_key(8, "gil", 5, 4000), ttl=60) == ("b", 1)
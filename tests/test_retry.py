@@ -0,0 +1,60 @@
+"""Test suite para el retry con backoff de las llamadas a proveedores LLM."""
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+
+from src.adapters.agents.retry import retry_after_seconds, retry_with_backoff
+
+
+def _status_error(status: int, headers: dict[str, str] | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://api.test/chat")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError("error", request=request, response=response)
+
+
+def test_retry_after_segundos_y_fecha():
+    """Retry-After se entiende en segundos y como fecha HTTP (pasada = 0)."""
+    assert retry_after_seconds(_status_error(429, {"Retry-After": "3"})) == 3.0
+    assert retry_after_seconds(
+        _status_error(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    ) == 0.0
+    assert retry_after_seconds(_status_error(429)) is None
+
+
+@pytest.mark.asyncio
+async def test_reintenta_429_respetando_retry_after():
+    """Un 429 transitorio se reintenta tras la espera que pide el servidor."""
+    fn = AsyncMock(side_effect=[_status_error(429, {"Retry-After": "2"}), "ok"])
+
+    with patch("src.adapters.agents.retry.asyncio.sleep", new=AsyncMock()) as sleep:
+        assert await retry_with_backoff(fn, max_retries=3) == "ok"
+
+    sleep.assert_awaited_once_with(2.0)
+
+
+@pytest.mark.asyncio
+async def test_retry_after_largo_pasa_al_fallback():
+    """Si el servidor pide esperar más que max_delay, se falla de inmediato."""
+    fn = AsyncMock(side_effect=_status_error(429, {"Retry-After": "60"}))
+
+    with patch("src.adapters.agents.retry.asyncio.sleep", new=AsyncMock()) as sleep:
+        with pytest.raises(httpx.HTTPStatusError):
+            await retry_with_backoff(fn, max_retries=3, max_delay=10.0)
+
+    assert fn.await_count == 1
+    sleep.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_backoff_con_jitter_acotado():
+    """Sin Retry-After el delay es exponencial con jitter y nunca supera max_delay."""
+    fn = AsyncMock(side_effect=[_status_error(503)] * 3 + ["ok"])
+
+    with patch("src.adapters.agents.retry.asyncio.sleep", new=AsyncMock()) as sleep:
+        await retry_with_backoff(fn, max_retries=3, base_delay=1.0, max_delay=3.0)
+
+    delays = [call.args[0] for call in sleep.await_args_list]
+    assert 1.0 <= delays[0] < 2.0
+    assert 2.0 <= delays[1] < 3.0
+    assert delays[2] == 3.0
@@ -98,9 +98,24 @@ class TestJWTTokenService:
         
         token = service1.create_access_token(user_id="789", email="test@example.com")
         decoded = service2.verify_token(token)
-        
+
         assert decoded is None
 
+    def test_verify_token_cacheado(self, monkeypatch):
+        """Verifica que un token ya verificado no repita la verificación de firma."""
+        from src.adapters.security import jwt_token_service
+
+        service = JWTTokenService(secret_key="test_secret_key_123")
+        token = service.create_access_token(user_id="42", email="cache@example.com")
+        first = service.verify_token(token)
+
+        def fail_decode(*args, **kwargs):
+            raise AssertionError("jwt.decode no debería llamarse")
+
+        monkeypatch.setattr(jwt_token_service.jwt, "decode", fail_decode)
+
+        assert service.verify_token(token) == first
+
 
 @pytest.mark.asyncio
 class TestAuthenticationFlow:
@@ -0,0 +1,86 @@
+"""Test suite para SemanticRetrievalCache (LSH de recuperaciones RAG)."""
+import numpy as np
+
+from src.application.services.rag.semantic_cache import SemanticRetrievalCache
+
+RESULTS = [{"text": "chunk", "similarity": 0.9, "section_id": 1, "chunk_index": 0}]
+
+
+def _vector(seed: int, dim: int = 768) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+def test_hit_con_consulta_casi_identica():
+    """Una consulta con coseno >= umbral reutiliza los resultados."""
+    cache = SemanticRetrievalCache(threshold=0.95)
+    base = _vector(1)
+    cache.put("s1", "7", base, RESULTS)
+
+    near = base + 0.05 * _vector(2)
+
+    assert cache.get("s1", "7", near) == RESULTS
+    assert cache.hits == 1
+
+
+def test_miss_con_consulta_distinta():
+    """Vectores no relacionados no comparten resultados."""
+    cache = SemanticRetrievalCache(threshold=0.95)
+    cache.put("s1", "7", _vector(1), RESULTS)
+
+    assert cache.get("s1", "7", _vector(3)) is None
+    assert cache.misses == 1
+
+
+def test_aislado_por_sesion_y_documento():
+    """El mismo embedding no se reutiliza entre sesiones ni documentos."""
+    cache = SemanticRetrievalCache()
+    vector = _vector(1)
+    cache.put("s1", "7", vector, RESULTS)
+
+    assert cache.get("s2", "7", vector) is None
+    assert cache.get("s1", "8", vector) is None
+    assert cache.get("s1", "7", vector) == RESULTS
+
+
+def test_ttl_expira_entradas():
+    """Las entradas vencidas no se devuelven."""
+    cache = SemanticRetrievalCache(ttl=0.0)
+    vector = _vector(1)
+    cache.put("s1", "7", vector, RESULTS)
+
+    assert cache.get("s1", "7", vector) is None
+
+
+def test_evictar_libera_los_buckets():
+    """Entradas evictadas por max_entries no dejan claves de bucket huérfanas."""
+    cache = SemanticRetrievalCache(max_entries=10)
+    for i in range(500):
+        cache.put(f"s{i}", "7", _vector(i), RESULTS)
+
+    assert len(cache._entries) == 10
+    assert len(cache._buckets) <= 10 * cache.num_tables
+
+
+def test_expirar_libera_los_buckets():
+    """Una entrada vencida se desindexa al encontrarla."""
+    cache = SemanticRetrievalCache(ttl=0.0)
+    vector = _vector(1)
+    cache.put("s1", "7", vector, RESULTS)
+
+    assert cache.get("s1", "7", vector) is None
+    assert cache._entries == {} and cache._buckets == {}
+
+
+def test_invalidar_documento_descarta_sus_recuperaciones():
+    """Reindexar o borrar un archivo descarta sus chunks cacheados en todas las sesiones."""
+    cache = SemanticRetrievalCache()
+    vector = _vector(1)
+    cache.put("s1", "7", vector, RESULTS)
+    cache.put("s2", "7", vector, RESULTS)
+    cache.put("s1", "8", vector, RESULTS)
+
+    cache.invalidate_file(7)
+
+    assert cache.get("s1", "7", vector) is None
+    assert cache.get("s2", "7", vector) is None
+    assert cache.get("s1", "8", vector) == RESULTS